@@ -40,6 +40,17 @@ REST_API_VERSION_HISTORY = """REST API Version History:
 
     * 1.0 - Initial version.
     * 1.1 - Add support for getting notification progress details
+    * 1.2 - Add next links with cursor markers to the segments, hosts and
+            notifications list responses
+    * 1.3 - Add the archived filter to the notifications list to query the
+            archived notifications
+    * 1.4 - Add the fields parameter to the notifications list to return
+            only the given fields of the notifications
+    * 1.5 - Add the host, reserved host, on maintenance host and active
+            notification counts to the segments of the segments list
+    * 1.6 - Allow to create several notifications by a single request
+    * 1.7 - Allow to create several hosts by a single request and add the
+            PUT /segments/{segment_id}/hosts API to update several hosts
 """
 
 # The minimum and maximum versions of the API supported
@@ -48,7 +59,7 @@ REST_API_VERSION_HISTORY = """REST API Version History:
 # Note: This only applies for the v1 API once microversions
 # support is fully merged.
 _MIN_API_VERSION = "1.0"
-_MAX_API_VERSION = "1.1"
+_MAX_API_VERSION = "1.7"
 DEFAULT_API_VERSION = _MIN_API_VERSION
 
 
@@ -127,13 +127,21 @@ class ViewBuilder(object):
                               request,
                               items,
                               collection_name,
-                              id_key="uuid"):
+                              id_key="uuid",
+                              sort_keys=None):
         """Retrieve 'next' link, if applicable. This is included if:
         1) 'limit' param is specified and equals the number of items.
         2) 'limit' param is specified but it exceeds CONF.osapi_max_limit,
         in this case the number of items is CONF.osapi_max_limit.
         3) 'limit' param is NOT specified but the number of items is
         CONF.osapi_max_limit.
+
+        If sort_keys is given, the marker of the link is a cursor holding
+        the values of these keys, and of the 'created_at' and 'id' keys
+        always used by the db api to sort items, for the last item. The next
+        page is then read without looking up the marker item first. Items
+        having a null value for one of these keys are still referred to by
+        their id.
         """
         links = []
         max_items = min(
@@ -141,7 +149,13 @@ class ViewBuilder(object):
             CONF.osapi_max_limit)
         if max_items and max_items == len(items):
             last_item = items[-1]
-            if id_key in last_item:
+            cursor_keys = set(sort_keys or []) | {'created_at', 'id'}
+            if (sort_keys is not None and
+                    all(key in last_item and last_item[key] is not None
+                        for key in cursor_keys)):
+                last_item_id = utils.encode_cursor(
+                    {key: last_item[key] for key in cursor_keys})
+            elif id_key in last_item:
                 last_item_id = last_item[id_key]
             elif 'id' in last_item:
                 last_item_id = last_item["id"]
@@ -189,7 +203,8 @@ def get_pagination_params(request):
 
     :param request: `wsgi.Request` possibly containing 'marker' and 'limit'
                     GET variables. 'marker' is the id of the last element
-                    the client has seen, and 'limit' is the maximum number
+                    the client has seen or the cursor of a 'next' link,
+                    and 'limit' is the maximum number
                     of items to return. If 'limit' is not specified, 0, or
                     > max_limit, we default to max_limit. Negative values
                     for either marker or limit will cause
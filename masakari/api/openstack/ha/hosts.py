@@ -21,6 +21,7 @@ from oslo_utils import encodeutils
 from oslo_utils import strutils
 from webob import exc
 
+from masakari.api import api_version_request
 from masakari.api.openstack import common
 from masakari.api.openstack import extensions
 from masakari.api.openstack.ha.schemas import hosts as schema
@@ -97,19 +98,29 @@ class HostsController(wsgi.Controller):
             raise exc.HTTPNotFound(explanation=ex.format_message())
 
         builder = views_hosts.get_view_builder(req)
-        return builder.build_hosts(hosts)
+        response = builder.build_hosts(hosts)
+        if api_version_request.is_supported(req, min_version='1.2'):
+            response['hosts_links'] = builder._get_collection_links(
+                req, response['hosts'], 'segments/%s/hosts' % segment_id,
+                id_key='id', sort_keys=sort_keys)
+        return response
 
     @wsgi.response(http.CREATED)
     @extensions.expected_errors((http.BAD_REQUEST, http.FORBIDDEN,
                                  http.NOT_FOUND, http.CONFLICT))
-    @validation.schema(schema.create)
+    @validation.schema(schema.create, '1.0', '1.6')
+    @validation.schema(schema.create_v17, '1.7')
     def create(self, req, segment_id, body):
-        """Creates a host."""
+        """Creates a host, or several ones since 1.7."""
         context = req.environ['masakari.context']
         context.can(host_policies.HOSTS % 'create')
-        host_data = body.get('host')
         try:
-            host = self.api.create_host(context, segment_id, host_data)
+            if 'hosts' in body:
+                hosts = self.api.create_hosts(context, segment_id,
+                                              body['hosts'])
+            else:
+                host = self.api.create_host(context, segment_id,
+                                            body['host'])
         except exception.ComputeNotFoundByName as e:
             raise exc.HTTPBadRequest(explanation=e.message)
         except exception.FailoverSegmentNotFound as e:
@@ -118,6 +129,8 @@ class HostsController(wsgi.Controller):
             raise exc.HTTPConflict(explanation=e.format_message())
 
         builder = views_hosts.get_view_builder(req)
+        if 'hosts' in body:
+            return builder.build_hosts(hosts)
         return {'host': builder.build_host(host)}
 
     @extensions.expected_errors((http.FORBIDDEN, http.NOT_FOUND))
@@ -157,6 +170,30 @@ class HostsController(wsgi.Controller):
         builder = views_hosts.get_view_builder(req)
         return {'host': builder.build_host(host)}
 
+    @wsgi.Controller.api_version('1.7')
+    @extensions.expected_errors((http.BAD_REQUEST, http.FORBIDDEN,
+                                 http.NOT_FOUND, http.CONFLICT))
+    @validation.schema(schema.update_all)
+    def update_all(self, req, segment_id, body):
+        """Updates several hosts of a segment at once."""
+        context = req.environ['masakari.context']
+        context.can(host_policies.HOSTS % 'update')
+        try:
+            hosts = self.api.update_hosts(context, segment_id, body['hosts'])
+        except exception.ComputeNotFoundByName as e:
+            raise exc.HTTPBadRequest(explanation=e.message)
+        except exception.Invalid as e:
+            raise exc.HTTPBadRequest(explanation=e.format_message())
+        except exception.HostNotFound as e:
+            raise exc.HTTPNotFound(explanation=e.format_message())
+        except exception.FailoverSegmentNotFound as e:
+            raise exc.HTTPNotFound(explanation=e.format_message())
+        except (exception.HostExists, exception.Conflict) as e:
+            raise exc.HTTPConflict(explanation=e.format_message())
+
+        builder = views_hosts.get_view_builder(req)
+        return builder.build_hosts(hosts)
+
     @wsgi.response(http.NO_CONTENT)
     @extensions.expected_errors((http.FORBIDDEN, http.NOT_FOUND,
                                  http.CONFLICT))
@@ -184,10 +221,14 @@ class Hosts(extensions.V1APIExtensionBase):
     def get_resources(self):
         parent = {'member_name': 'segment',
                   'collection_name': 'segments'}
+        # NOTE: The first non-GET collection action is routed to the
+        # collection itself, i.e. PUT /segments/{segment_id}/hosts.
+        collection_actions = {'update_all': 'PUT'}
         resources = [
             extensions.ResourceExtension(
                 'hosts', HostsController(), parent=parent,
-                member_name='host')]
+                member_name='host',
+                collection_actions=collection_actions)]
 
         return resources
 
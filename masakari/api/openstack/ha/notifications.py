@@ -15,6 +15,8 @@
 
 from http import client as http
 
+from oslo_utils import encodeutils
+from oslo_utils import strutils
 from oslo_utils import timeutils
 from webob import exc
 
@@ -28,7 +30,9 @@ from masakari.api import validation
 from masakari import exception
 from masakari.ha import api as notification_api
 from masakari.i18n import _
+from masakari import objects
 from masakari.objects import fields
+from masakari.objects import notification as notification_obj
 from masakari.policies import notifications as notifications_policies
 
 ALIAS = 'notifications'
@@ -39,6 +43,7 @@ class NotificationsController(wsgi.Controller):
 
     def __init__(self):
         self.api = notification_api.NotificationAPI()
+        self._view_builder = common.ViewBuilder()
 
     @validation.schema(payload_schema.create_process_payload)
     def _validate_process_payload(self, req, body):
@@ -52,16 +57,7 @@ class NotificationsController(wsgi.Controller):
     def _validate_comp_host_payload(self, req, body):
         pass
 
-    @wsgi.response(http.ACCEPTED)
-    @extensions.expected_errors((http.BAD_REQUEST, http.FORBIDDEN,
-                                 http.CONFLICT))
-    @validation.schema(schema.create)
-    def create(self, req, body):
-        """Creates a new notification."""
-        context = req.environ['masakari.context']
-        context.can(notifications_policies.NOTIFICATIONS % 'create')
-
-        notification_data = body['notification']
+    def _validate_payload(self, req, notification_data):
         if notification_data['type'] == fields.NotificationType.PROCESS:
             self._validate_process_payload(req,
                                            body=notification_data['payload'])
@@ -73,6 +69,23 @@ class NotificationsController(wsgi.Controller):
             self._validate_comp_host_payload(req,
                                              body=notification_data['payload'])
 
+    @wsgi.response(http.ACCEPTED)
+    @extensions.expected_errors((http.BAD_REQUEST, http.FORBIDDEN,
+                                 http.CONFLICT))
+    @validation.schema(schema.create, '1.0', '1.5')
+    @validation.schema(schema.create_v16, '1.6')
+    def create(self, req, body):
+        """Creates a new notification, or several ones since 1.6."""
+        context = req.environ['masakari.context']
+        context.can(notifications_policies.NOTIFICATIONS % 'create')
+
+        if 'notifications' in body:
+            return self._create_notifications(req, context,
+                                              body['notifications'])
+
+        notification_data = body['notification']
+        self._validate_payload(req, notification_data)
+
         try:
             notification = self.api.create_notification(
                 context, notification_data)
@@ -84,6 +97,58 @@ class NotificationsController(wsgi.Controller):
 
         return {'notification': notification}
 
+    def _create_notifications(self, req, context, notifications_data):
+        """Creates the notifications of a bulk request.
+
+        The payloads of all the notifications are validated before any of
+        them is created. The result of each notification is then returned
+        in the order of the request, with the code it would have been
+        answered with if it had been sent alone.
+        """
+        for notification_data in notifications_data:
+            self._validate_payload(req, notification_data)
+
+        results = []
+        for result in self.api.create_notifications(context,
+                                                    notifications_data):
+            if isinstance(result, exception.HostNotFoundByName):
+                results.append({'code': http.BAD_REQUEST,
+                                'message': result.format_message()})
+            elif isinstance(result, (exception.DuplicateNotification,
+                                     exception.HostOnMaintenanceError)):
+                results.append({'code': http.CONFLICT,
+                                'message': result.format_message()})
+            else:
+                results.append({'code': http.ACCEPTED,
+                                'notification': result})
+
+        return {'notifications': results}
+
+    @staticmethod
+    def _get_fields(req):
+        """Returns the notification fields requested by the 'fields' param.
+
+        The fields can be given as a comma separated list and/or by
+        repeating the parameter. None is returned if no field is requested.
+        """
+        requested = []
+        for value in req.params.getall('fields'):
+            for field in value.split(','):
+                field = field.strip()
+                if field and field not in requested:
+                    requested.append(field)
+        if not requested:
+            return None
+
+        valid_fields = (set(objects.Notification.fields) -
+                        set(notification_obj.NOTIFICATION_OPTIONAL_FIELDS))
+        invalid_fields = [field for field in requested
+                          if field not in valid_fields]
+        if invalid_fields:
+            msg = _("Invalid fields: %s") % ', '.join(invalid_fields)
+            raise exc.HTTPBadRequest(explanation=msg)
+        return requested
+
     @extensions.expected_errors((http.BAD_REQUEST, http.FORBIDDEN))
     def index(self, req):
         """Returns a summary list of notifications."""
@@ -108,15 +173,46 @@ class NotificationsController(wsgi.Controller):
                     msg = _('Invalid generated-since value')
                     raise exc.HTTPBadRequest(explanation=msg)
                 filters['generated-since'] = parsed
+            if (api_version_request.is_supported(req, min_version='1.3') and
+                    'archived' in req.params):
+                try:
+                    filters['archived'] = strutils.bool_from_string(
+                        req.params['archived'], strict=True)
+                except ValueError as ex:
+                    msg = _("Invalid value for archived: "
+                            "%s") % encodeutils.exception_to_unicode(ex)
+                    raise exc.HTTPBadRequest(explanation=msg)
+
+            requested_fields = None
+            load_fields = None
+            if api_version_request.is_supported(req, min_version='1.4'):
+                requested_fields = self._get_fields(req)
+            if requested_fields is not None:
+                # NOTE: The fields of the cursor of the next link are read
+                # too, they are only returned if they were requested.
+                load_fields = list(
+                    set(requested_fields) | {'id', 'created_at'} |
+                    (set(sort_keys) & set(objects.Notification.fields)))
 
             notifications = self.api.get_all(context, filters, sort_keys,
-                                             sort_dirs, limit, marker)
+                                             sort_dirs, limit, marker,
+                                             fields=load_fields)
         except exception.MarkerNotFound as err:
             raise exc.HTTPBadRequest(explanation=err.format_message())
         except exception.Invalid as err:
             raise exc.HTTPBadRequest(explanation=err.format_message())
 
-        return {'notifications': notifications}
+        response = {'notifications': notifications}
+        if api_version_request.is_supported(req, min_version='1.2'):
+            response['notifications_links'] = (
+                self._view_builder._get_collection_links(
+                    req, notifications, 'notifications', id_key='id',
+                    sort_keys=sort_keys))
+        if requested_fields is not None:
+            response['notifications'] = [
+                {field: notification[field] for field in requested_fields}
+                for notification in notifications]
+        return response
 
     @extensions.expected_errors((http.FORBIDDEN, http.NOT_FOUND))
     def show(self, req, id):
@@ -49,3 +49,36 @@ update['properties']['host']['anyOf'] = [{'required': ['name']},
                                          {'required': ['reserved']},
                                          {'required': ['on_maintenance']},
                                          ]
+
+
+MAX_HOSTS_PER_REQUEST = 1000
+
+create_v17 = copy.deepcopy(create)
+create_v17['properties']['hosts'] = {
+    'type': 'array',
+    'items': create['properties']['host'],
+    'minItems': 1,
+    'maxItems': MAX_HOSTS_PER_REQUEST,
+}
+del create_v17['required']
+create_v17['oneOf'] = [{'required': ['host']},
+                       {'required': ['hosts']}]
+
+
+_host_update = copy.deepcopy(update['properties']['host'])
+_host_update['properties']['id'] = {'type': 'string', 'format': 'uuid'}
+_host_update['required'] = ['id']
+
+update_all = {
+    'type': 'object',
+    'properties': {
+        'hosts': {
+            'type': 'array',
+            'items': _host_update,
+            'minItems': 1,
+            'maxItems': MAX_HOSTS_PER_REQUEST,
+        }
+    },
+    'required': ['hosts'],
+    'additionalProperties': False
+}
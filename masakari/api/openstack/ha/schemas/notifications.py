@@ -12,30 +12,48 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import copy
+
 from masakari.api.validation import parameter_types
 from masakari.objects import fields
 
+# Maximum number of notifications which can be created by a single request.
+MAX_NOTIFICATIONS_PER_REQUEST = 1000
+
+_notification = {
+    'type': 'object',
+    'properties': {
+        'type': {
+            'type': 'string',
+            'enum': fields.NotificationType.ALL,
+        },
+        'hostname': parameter_types.hostname,
+        'generated_time': {
+            'type': 'string',
+            'format': 'date-time',
+        },
+        'payload': parameter_types.payload,
+    },
+    'required': ['type', 'hostname', 'generated_time', 'payload'],
+    'additionalProperties': False
+}
+
 create = {
     'type': 'object',
     'properties': {
-        'notification': {
-            'type': 'object',
-            'properties': {
-                'type': {
-                    'type': 'string',
-                    'enum': fields.NotificationType.ALL,
-                },
-                'hostname': parameter_types.hostname,
-                'generated_time': {
-                    'type': 'string',
-                    'format': 'date-time',
-                },
-                'payload': parameter_types.payload,
-            },
-            'required': ['type', 'hostname', 'generated_time', 'payload'],
-            'additionalProperties': False
-        }
+        'notification': _notification
     },
     'required': ['notification'],
     'additionalProperties': False
 }
+
+create_v16 = copy.deepcopy(create)
+create_v16['properties']['notifications'] = {
+    'type': 'array',
+    'items': _notification,
+    'minItems': 1,
+    'maxItems': MAX_NOTIFICATIONS_PER_REQUEST,
+}
+del create_v16['required']
+create_v16['oneOf'] = [{'required': ['notification']},
+                       {'required': ['notifications']}]
@@ -17,6 +17,7 @@ from http import client as http
 
 from webob import exc
 
+from masakari.api import api_version_request
 from masakari.api.openstack import common
 from masakari.api.openstack import extensions
 from masakari.api.openstack.ha.schemas import segments as schema
@@ -35,6 +36,7 @@ class SegmentsController(wsgi.Controller):
 
     def __init__(self):
         self.api = segment_api.FailoverSegmentAPI()
+        self._view_builder = common.ViewBuilder()
 
     @extensions.expected_errors((http.BAD_REQUEST, http.FORBIDDEN))
     def index(self, req):
@@ -52,16 +54,24 @@ class SegmentsController(wsgi.Controller):
             if 'service_type' in req.params:
                 filters['service_type'] = req.params['service_type']
 
+            with_stats = api_version_request.is_supported(req,
+                                                          min_version='1.5')
             segments = self.api.get_all(context, filters=filters,
                                         sort_keys=sort_keys,
                                         sort_dirs=sort_dirs, limit=limit,
-                                        marker=marker)
+                                        marker=marker, with_stats=with_stats)
         except exception.MarkerNotFound as e:
             raise exc.HTTPBadRequest(explanation=e.format_message())
         except exception.Invalid as e:
             raise exc.HTTPBadRequest(explanation=e.format_message())
 
-        return {'segments': segments}
+        response = {'segments': segments}
+        if api_version_request.is_supported(req, min_version='1.2'):
+            response['segments_links'] = (
+                self._view_builder._get_collection_links(
+                    req, segments, 'segments', id_key='id',
+                    sort_keys=sort_keys))
+        return response
 
     @extensions.expected_errors((http.FORBIDDEN, http.NOT_FOUND))
     def show(self, req, id):
@@ -13,7 +13,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-import functools
+import bisect
 from http import client as http
 import inspect
 
@@ -799,6 +799,68 @@ def extends(*args, **kwargs):
     return decorator
 
 
+class VersionedMethodDispatcher(object):
+    """Descriptor dispatching a versioned method on the request version.
+
+    The method matching a version is the first one, by descending start
+    version, whose versions match it. The methods starting after the
+    version are skipped by a binary search of the start versions sorted
+    once. As the versions of the methods normally don't intersect, the
+    method found first matches the version, or no method does.
+    """
+
+    def __init__(self, name, versioned_methods):
+        self.name = name
+        # NOTE: versioned_methods is sorted by descending start version, the
+        # methods starting at the same version are kept in the order they
+        # are tried in.
+        self.versioned_methods = sorted(reversed(versioned_methods),
+                                        key=lambda f: f.start_version)
+        self.start_versions = [f.start_version
+                               for f in self.versioned_methods]
+
+    def select(self, ver):
+        """Returns the method matching the given version.
+
+        @raises: VersionNotFoundForAPIMethod if there is no method which
+             matches the version
+        """
+        index = bisect.bisect_right(self.start_versions, ver)
+        for func in reversed(self.versioned_methods[:index]):
+            if ver.matches(func.start_version, func.end_version):
+                return func.func
+
+        raise exception.VersionNotFoundForAPIMethod(version=ver)
+
+    def __get__(self, controller, owner=None):
+        if controller is None:
+            return self
+
+        def version_select(*args, **kwargs):
+            """Calls the method matching the version of the request.
+
+            @return: Returns the result of the method called
+            @raises: VersionNotFoundForAPIMethod if there is no method which
+                 matches the name and version constraints
+            """
+
+            # The first arg to all versioned methods is always the request
+            # object. The version for the request is attached to the
+            # request object
+            if len(args) == 0:
+                ver = kwargs['req'].api_version_request
+            else:
+                ver = args[0].api_version_request
+
+            func = self.select(ver)
+            # Copy the attributes of the method so that other decorator
+            # attributes like wsgi.response are still respected.
+            version_select.__dict__.update(func.__dict__)
+            return func(controller, *args, **kwargs)
+
+        return version_select
+
+
 class ControllerMetaclass(type):
     """Controller metaclass.
 
@@ -841,6 +903,10 @@ class ControllerMetaclass(type):
         cls_dict['wsgi_extensions'] = extensions
         if versioned_methods:
             cls_dict[VER_METHOD_ATTR] = versioned_methods
+            # NOTE: The versioned methods are looked up through dispatchers
+            # built once, the other attributes are accessed as usual.
+            for key, func_list in versioned_methods.items():
+                cls_dict[key] = VersionedMethodDispatcher(key, func_list)
 
         return super(ControllerMetaclass, mcs).__new__(mcs, name, bases,
                                                        cls_dict)
@@ -860,49 +926,6 @@ class Controller(object, metaclass=ControllerMetaclass):
         else:
             self._view_builder = None
 
-    def __getattribute__(self, key):
-
-        def version_select(*args, **kwargs):
-            """Look for the method which matches the name supplied and version
-            constraints and calls it with the supplied arguments.
-
-            @return: Returns the result of the method called
-            @raises: VersionNotFoundForAPIMethod if there is no method which
-                 matches the name and version constraints
-            """
-
-            # The first arg to all versioned methods is always the request
-            # object. The version for the request is attached to the
-            # request object
-            if len(args) == 0:
-                ver = kwargs['req'].api_version_request
-            else:
-                ver = args[0].api_version_request
-
-            func_list = self.versioned_methods[key]
-            for func in func_list:
-                if ver.matches(func.start_version, func.end_version):
-                    # Update the version_select wrapper function so
-                    # other decorator attributes like wsgi.response
-                    # are still respected.
-                    functools.update_wrapper(version_select, func.func)
-                    return func.func(self, *args, **kwargs)
-
-            # No version match
-            raise exception.VersionNotFoundForAPIMethod(version=ver)
-
-        try:
-            version_meth_dict = object.__getattribute__(self, VER_METHOD_ATTR)
-        except AttributeError:
-            # No versioning on this class
-            return object.__getattribute__(self, key)
-
-        if version_meth_dict and key in object.__getattribute__(
-                self, VER_METHOD_ATTR):
-            return version_select
-
-        return object.__getattribute__(self, key)
-
     # NOTE: This decorator MUST appear first (the outermost
     # decorator) on an API method for it to work correctly
     @classmethod
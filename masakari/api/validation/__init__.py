@@ -30,28 +30,33 @@ def schema(request_body_schema, min_version=None, max_version=None):
     Registered schema will be used for validating request body just before
     API method executing.
 
+    The validator of the schema and the version bounds are built once, when
+    the API method is decorated, and reused by all the requests.
+
     :argument dict request_body_schema: a schema to validate request body
+    :argument min_version: the minimum API version the schema applies to
+    :argument max_version: the maximum API version the schema applies to
 
     """
 
     def add_validator(func):
+        min_ver = api_version.APIVersionRequest(min_version)
+        max_ver = api_version.APIVersionRequest(max_version)
+        schema_validator = validators._SchemaValidator(request_body_schema)
+
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            min_ver = api_version.APIVersionRequest(min_version)
-            max_ver = api_version.APIVersionRequest(max_version)
-
             if 'req' in kwargs:
                 ver = kwargs['req'].api_version_request
             else:
                 ver = args[1].api_version_request
 
-            ver.matches(min_ver, max_ver)
             # Only validate against the schema if it lies within
             # the version range specified. Note that if both min
             # and max are not specified the validator will always
             # be run.
-            schema_validator = validators._SchemaValidator(request_body_schema)
-            schema_validator.validate(kwargs['body'])
+            if ver.matches(min_ver, max_ver):
+                schema_validator.validate(kwargs['body'])
 
             return func(*args, **kwargs)
         return wrapper
@@ -19,6 +19,7 @@
 """
 
 
+import itertools
 import logging as python_logging
 import sys
 import time
@@ -32,6 +33,7 @@ from masakari import context
 from masakari import db
 from masakari.db import api as db_api
 from masakari.db.sqlalchemy import migration as db_migration
+from masakari.engine import driver
 from masakari import exception
 from masakari.i18n import _
 from masakari import utils
@@ -58,6 +60,20 @@ def _db_error(caught_exception):
     sys.exit(1)
 
 
+def _validate_age_in_days(age_in_days):
+    try:
+        age_in_days = int(age_in_days)
+    except ValueError:
+        msg = 'Invalid value for age, %(age)s' % {'age': age_in_days}
+        sys.exit(str(msg))
+
+    if age_in_days < 0:
+        sys.exit(_("Must supply a non-negative value for age."))
+    if age_in_days >= (int(time.time()) / 86400):
+        sys.exit(_("Maximal age is count of days since epoch."))
+    return age_in_days
+
+
 class DbCommands(object):
     """Class for managing the database."""
 
@@ -85,29 +101,166 @@ class DbCommands(object):
                '%(default)d)')
     @args('--max_rows', type=int, default=-1,
           help='Limit number of records to delete (default: %(default)d)')
-    def purge(self, age_in_days, max_rows):
+    @args('--batch_size', type=int, default=1000,
+          help='Number of records to delete in each transaction (default: '
+               '%(default)d)')
+    @args('--sleep', type=float, default=0,
+          help='Seconds to wait between two batches of deletion (default: '
+               '%(default)s)')
+    @args('--dry-run', action='store_true', default=False,
+          help='Only print the number of records which would be deleted')
+    def purge(self, age_in_days, max_rows, batch_size=1000, sleep=0,
+              dry_run=False):
         """Purge rows older than a given age from masakari tables."""
         try:
             max_rows = utils.validate_integer(
                 max_rows, 'max_rows', -1, db.MAX_INT)
+            batch_size = utils.validate_integer(
+                batch_size, 'batch_size', 1, db.MAX_INT)
         except exception.Invalid as exc:
             sys.exit(str(exc))
 
+        age_in_days = _validate_age_in_days(age_in_days)
+        if max_rows == 0:
+            sys.exit(_("Must supply value greater than 0 for max_rows."))
+        if sleep < 0:
+            sys.exit(_("Must supply a non-negative value for sleep."))
+        ctx = context.get_admin_context()
+
+        rows_purged = db_api.purge_deleted_rows(
+            ctx, age_in_days, max_rows, batch_size=batch_size,
+            sleep_time=sleep, dry_run=dry_run)
+
+        if dry_run:
+            msg = _("%(rows)d row(s) would be deleted from table %(table)s")
+        else:
+            msg = _("%(rows)d row(s) deleted from table %(table)s")
+        for table, rows in rows_purged.items():
+            print(msg % {'rows': rows, 'table': table})
+
+    @args('--age_in_days', type=int, default=30,
+          help='Archive notifications older than age in days (default: '
+               '%(default)d)')
+    @args('--max_rows', type=int, default=-1,
+          help='Limit number of notifications to archive (default: '
+               '%(default)d)')
+    @args('--batch_size', type=int, default=1000,
+          help='Number of notifications to archive in each transaction '
+               '(default: %(default)d)')
+    @args('--sleep', type=float, default=0,
+          help='Seconds to wait between two batches (default: '
+               '%(default)s)')
+    @args('--dry-run', action='store_true', default=False,
+          help='Only print the number of notifications which would be '
+               'archived')
+    def archive(self, age_in_days, max_rows, batch_size=1000, sleep=0,
+                dry_run=False):
+        """Move processed notifications older than a given age to archive."""
         try:
-            age_in_days = int(age_in_days)
-        except ValueError:
-            msg = 'Invalid value for age, %(age)s' % {'age': age_in_days}
-            sys.exit(str(msg))
+            max_rows = utils.validate_integer(
+                max_rows, 'max_rows', -1, db.MAX_INT)
+            batch_size = utils.validate_integer(
+                batch_size, 'batch_size', 1, db.MAX_INT)
+        except exception.Invalid as exc:
+            sys.exit(str(exc))
 
+        age_in_days = _validate_age_in_days(age_in_days)
         if max_rows == 0:
             sys.exit(_("Must supply value greater than 0 for max_rows."))
-        if age_in_days < 0:
-            sys.exit(_("Must supply a non-negative value for age."))
-        if age_in_days >= (int(time.time()) / 86400):
-            sys.exit(_("Maximal age is count of days since epoch."))
+        if sleep < 0:
+            sys.exit(_("Must supply a non-negative value for sleep."))
         ctx = context.get_admin_context()
 
-        db_api.purge_deleted_rows(ctx, age_in_days, max_rows)
+        rows = db_api.archive_notifications(
+            ctx, age_in_days, max_rows=max_rows, batch_size=batch_size,
+            sleep_time=sleep, dry_run=dry_run)
+
+        if dry_run:
+            msg = _("%(rows)d notification(s) would be archived")
+        else:
+            msg = _("%(rows)d notification(s) archived")
+        print(msg % {'rows': rows})
+
+    @args('--age_in_days', type=int, default=30,
+          help='Purge recovery workflow details of notifications older '
+               'than age in days (default: %(default)d)')
+    @args('--batch_size', type=int, default=1000,
+          help='Number of logbooks to check in each batch (default: '
+               '%(default)d)')
+    @args('--sleep', type=float, default=0,
+          help='Seconds to wait between two batches of deletion (default: '
+               '%(default)s)')
+    @args('--archive', metavar='<file>', default=None,
+          help='Append the purged logbooks to this file, one JSON document '
+               'per line')
+    @args('--dry-run', action='store_true', default=False,
+          help='Only print the number of logbooks which would be deleted')
+    def purge_taskflow(self, age_in_days, batch_size=1000, sleep=0,
+                       archive=None, dry_run=False):
+        """Purge recovery workflow details from the taskflow persistence.
+
+        The logbooks of notifications which have been purged, or which
+        would be purged for the given age, are destroyed.
+        """
+        try:
+            batch_size = utils.validate_integer(
+                batch_size, 'batch_size', 1, db.MAX_INT)
+        except exception.Invalid as exc:
+            sys.exit(str(exc))
+
+        age_in_days = _validate_age_in_days(age_in_days)
+        if sleep < 0:
+            sys.exit(_("Must supply a non-negative value for sleep."))
+        ctx = context.get_admin_context()
+        notification_driver = driver.load_masakari_driver()
+
+        archive_file = None
+        if archive and not dry_run:
+            try:
+                archive_file = open(archive, 'a')
+            except IOError as exc:
+                sys.exit(str(exc))
+
+        try:
+            rows = self._purge_taskflow(ctx, notification_driver,
+                                        age_in_days, batch_size, sleep,
+                                        archive_file, dry_run)
+        finally:
+            if archive_file is not None:
+                archive_file.close()
+
+        if dry_run:
+            msg = _("%(rows)d logbook(s) would be deleted from taskflow "
+                    "persistence")
+        else:
+            msg = _("%(rows)d logbook(s) deleted from taskflow persistence")
+        print(msg % {'rows': rows})
+
+    def _purge_taskflow(self, ctx, notification_driver, age_in_days,
+                        batch_size, sleep, archive_file, dry_run):
+        notification_uuids = (
+            notification_driver.get_recovery_workflow_notification_uuids(
+                ctx, batch_size=batch_size))
+        rows = 0
+        while True:
+            batch = list(itertools.islice(notification_uuids, batch_size))
+            if not batch:
+                break
+
+            batch = db_api.notifications_get_purgeable_uuids(
+                ctx, batch, age_in_days)
+            if dry_run or not batch:
+                rows += len(batch)
+                continue
+
+            rows += (
+                notification_driver.
+                purge_notification_recovery_workflow_details(
+                    ctx, batch, archive=archive_file))
+            if sleep:
+                time.sleep(sleep)
+
+        return rows
 
 
 CATEGORIES = {
@@ -175,7 +328,7 @@ def fetch_func_args(func):
     fn_args = []
     for args, kwargs in getattr(func, 'args', []):
         arg = get_arg_string(args[0])
-        fn_args.append(getattr(CONF.category, arg))
+        fn_args.append(getattr(CONF.category, arg.replace('-', '_')))
 
     return fn_args
 
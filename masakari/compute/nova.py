@@ -27,6 +27,8 @@ from novaclient import client as nova_client
 from novaclient import exceptions as nova_exception
 from oslo_log import log as logging
 from oslo_utils import encodeutils
+import requests
+from requests import adapters
 from requests import exceptions as request_exceptions
 
 from masakari import conf
@@ -79,27 +81,40 @@ def translate_nova_exception(method):
     return wrapper
 
 
-def novaclient(context, timeout=None):
-    """Returns a Nova client
+# Keystone sessions shared by all the nova clients of this process, keyed by
+# the credentials and endpoint they are created for.
+_SESSION_CACHE = {}
 
-    @param timeout: Number of seconds to wait for an answer before raising a
-        Timeout exception (None to disable)
-    """
-    nova_catalog_info = CONF.nova_catalog_admin_info
-    service_type, service_name, endpoint_type = nova_catalog_info.split(':')
 
-    context = ctx.RequestContext(
-        CONF.os_privileged_user_name, None,
-        auth_token=CONF.os_privileged_user_password,
-        project_name=CONF.os_privileged_user_tenant,
-        service_catalog=context.service_catalog,
-        global_request_id=context.global_id)
+def _get_session_pool_size():
+    # Evacuation threads and the shared instance watcher talk to nova
+    # concurrently, keep enough connections around for all of them.
+    return max(adapters.DEFAULT_POOLSIZE,
+               CONF.host_failure_recovery_threads + 1)
+
 
+def _get_keystone_session(context):
+    """Returns a cached Keystone session for the privileged user.
+
+    The session keeps the authentication plugin, which reuses the issued
+    token until it expires, and a pool of HTTP connections, so that they
+    are not recreated for every request sent to nova.
+    """
     # User needs to authenticate to Keystone before querying Nova, so we set
     # auth_url to the identity service endpoint
     url = CONF.os_privileged_user_auth_url
 
-    LOG.debug('Creating a Nova client using "%s" user',
+    session_key = (url, context.user_id, context.auth_token,
+                   context.project_name, CONF.os_user_domain_name,
+                   CONF.os_project_domain_name, CONF.os_region_name,
+                   CONF.keystone_authtoken.auth_type,
+                   CONF.nova_ca_certificates_file, CONF.nova_api_insecure)
+
+    keystone_session = _SESSION_CACHE.get(session_key)
+    if keystone_session is not None:
+        return keystone_session
+
+    LOG.debug('Creating a Keystone session for "%s" user',
               CONF.os_privileged_user_name)
 
     # Now that we have the correct auth_url, username, password and
@@ -113,10 +128,49 @@ def novaclient(context, timeout=None):
         project_name=context.project_name,
         user_domain_name=CONF.os_user_domain_name,
         project_domain_name=CONF.os_project_domain_name)
+
+    pool_size = _get_session_pool_size()
+    http_session = requests.Session()
+    for scheme in ('https://', 'http://'):
+        http_session.mount(scheme, adapters.HTTPAdapter(
+            pool_connections=pool_size, pool_maxsize=pool_size))
+
     session_loader = keystoneauth1.loading.session.Session()
     keystone_session = session_loader.load_from_options(
         auth=auth, cacert=CONF.nova_ca_certificates_file,
-        insecure=CONF.nova_api_insecure)
+        insecure=CONF.nova_api_insecure, session=http_session)
+
+    _SESSION_CACHE[session_key] = keystone_session
+    return keystone_session
+
+
+def reset_session_cache():
+    """Drops the cached Keystone sessions."""
+    _SESSION_CACHE.clear()
+
+
+def novaclient(context, timeout=None):
+    """Returns a Nova client
+
+    @param timeout: Number of seconds to wait for an answer before raising a
+        Timeout exception (None to disable)
+    """
+    nova_catalog_info = CONF.nova_catalog_admin_info
+    service_type, service_name, endpoint_type = nova_catalog_info.split(':')
+
+    context = ctx.RequestContext(
+        CONF.os_privileged_user_name, None,
+        auth_token=CONF.os_privileged_user_password,
+        project_name=CONF.os_privileged_user_tenant,
+        service_catalog=context.service_catalog,
+        global_request_id=context.global_id)
+
+    LOG.debug('Creating a Nova client using "%s" user',
+              CONF.os_privileged_user_name)
+
+    # NOTE: The client itself is cheap to build and carries the global
+    # request id of the caller, only the session below it is shared.
+    keystone_session = _get_keystone_session(context)
 
     client_obj = nova_client.Client(
         api_versions.APIVersion(NOVA_API_VERSION),
@@ -148,6 +202,20 @@ class API(object):
         LOG.info('Fetch Server list on %s', host)
         return nova.servers.list(detailed=True, search_opts=opts)
 
+    @translate_nova_exception
+    def get_servers_changed_since(self, context, changes_since):
+        """Get a list of servers changed since the specified time."""
+        opts = {
+            'changes-since': changes_since,
+            'all_tenants': True
+        }
+        nova = novaclient(context)
+        LOG.debug('Fetch Server list changed since %s', changes_since)
+        # NOTE: The servers of the whole cloud may have changed, e.g. during
+        # the evacuation of several hosts, limit=-1 reads all the pages of
+        # the list instead of the first one only.
+        return nova.servers.list(detailed=True, search_opts=opts, limit=-1)
+
     @translate_nova_exception
     def enable_disable_service(self, context, host_name, enable=False,
                                reason=None):
@@ -172,6 +240,14 @@ class API(object):
         service = nova.services.list(host=host_name, binary=binary)[0]
         return service.status == 'disabled'
 
+    @translate_nova_exception
+    def is_compute_service_reported_down(self, context, host_name):
+        """Check whether nova reports the compute service on host as down."""
+        nova = novaclient(context)
+        service = nova.services.list(host=host_name, binary='nova-compute')[0]
+        return service.state == 'down' or bool(
+            getattr(service, 'forced_down', False))
+
     @translate_nova_exception
     def evacuate_instance(self, context, uuid, target=None):
         """Evacuate an instance from failed host to specified host."""
@@ -221,6 +297,14 @@ class API(object):
         LOG.info('Call aggregate-list command to get list of all aggregates.')
         return nova.aggregates.list()
 
+    @translate_nova_exception
+    def get_hypervisor_list(self, context):
+        """Get all hypervisors along with their resource usage."""
+        nova = novaclient(context)
+        LOG.info('Call hypervisor-list command to get list of all '
+                 'hypervisors.')
+        return nova.hypervisors.list()
+
     @translate_nova_exception
     def add_host_to_aggregate(self, context, host, aggregate):
         """Add host to given aggregate."""
@@ -246,6 +330,16 @@ class API(object):
         LOG.info(msg, {'uuid': uuid})
         return nova.servers.unlock(uuid)
 
+    @translate_nova_exception
+    def get_compute_service_hosts(self, context):
+        """Get the names of all the hosts running a compute service."""
+        nova = novaclient(context)
+        LOG.info("Call compute service list command to get the names of "
+                 "all the compute hosts")
+
+        return {service.host
+                for service in nova.services.list(binary='nova-compute')}
+
     @translate_nova_exception
     def find_compute_service(self, context, compute_name):
         """Find compute service with case sensitive hostname."""
@@ -57,6 +57,27 @@ You should only enable this if you have an HTML sanitizing proxy.
 * Related options:
 
     None
+"""),
+    cfg.IntOpt("policy_cache_size",
+               default=1024,
+               min=0,
+               help="""
+Maximum number of policy authorization decisions kept in memory. Only the
+decisions of rules which depend solely on the credentials and the target
+(role, is_admin and generic checks) are cached; the cache is emptied whenever
+the policy rules are reloaded.
+
+* Possible values:
+
+    0 disables the cache. Any positive integer, default is 1024.
+
+* Services that use this:
+
+    ``masakari-api``
+
+* Related options:
+
+    [oslo_policy] policy_file
 """),
 ]
 
@@ -97,6 +97,25 @@ notification_opts = [
                     "generated_time, then it is considered that notification "
                     "is ignored by the messaging queue and will be processed "
                     "by 'process_unfinished_notifications' periodic task."),
+    cfg.IntOpt('notification_lease_time',
+               default=60,
+               min=3,
+               help="Number of seconds an engine holds the lease of the "
+                    "notification it is processing. The lease is renewed "
+                    "while the recovery workflow runs, if the engine stops "
+                    "renewing it the notification is taken over by another "
+                    "engine once the lease has expired."),
+    cfg.IntOpt('notifications_processing_threads',
+               default=64,
+               min=1,
+               help="Maximum number of notifications sent together by the "
+                    "'process_notifications' RPC method which are processed "
+                    "at the same time by an engine. The other ones wait "
+                    "until the processing of one of them is over."),
+    cfg.IntOpt('check_notification_leases_interval',
+               default=10,
+               help='Interval in seconds for taking over running '
+                    'notifications whose lease has expired.'),
     cfg.IntOpt('check_expired_notifications_interval',
                default=600,
                help='Interval in seconds for checking running notifications.'),
@@ -104,6 +123,26 @@ notification_opts = [
                default=86400,
                help='Interval in seconds for identifying running '
                     'notifications expired.'),
+    cfg.IntOpt('archive_notifications_interval',
+               default=-1,
+               help="Interval in seconds for moving the notifications which "
+                    "are not going to be processed anymore to the "
+                    "shadow_notifications table. A negative value disables "
+                    "this periodic task, notifications can still be "
+                    "archived with the 'masakari-manage db archive' "
+                    "command."),
+    cfg.IntOpt('archive_notifications_age_in_days',
+               default=30,
+               min=0,
+               help="Number of days after their last update after which "
+                    "finished, failed and ignored notifications are "
+                    "archived by the 'archive_notifications' periodic "
+                    "task."),
+    cfg.IntOpt('archive_notifications_batch_size',
+               default=1000,
+               min=1,
+               help="Number of notifications archived in each transaction "
+                    "by the 'archive_notifications' periodic task."),
     cfg.IntOpt('host_failure_recovery_threads',
                default=3,
                min=1,
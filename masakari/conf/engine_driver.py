@@ -80,6 +80,29 @@ Operators can decide whether reserved_host should be added to aggregate group
 of failed compute host. When set to True, reserved host will be added to the
 aggregate group of failed compute host. When set to False, the reserved_host
 will not be added to the aggregate group of failed compute host."""),
+
+    cfg.BoolOpt("wait_for_compute_service_down",
+                default=False,
+                help="""
+Operators can decide whether recovery should wait for nova to report the
+nova-compute service of the failed host as down instead of always sleeping
+for ``wait_period_after_service_update`` seconds after disabling it. When set
+to True, the state of the service is polled with an exponential backoff
+starting from ``verify_interval`` seconds and evacuation starts as soon as
+nova reports the service down, or after ``wait_period_after_service_update``
+seconds at the latest. When set to False, recovery always sleeps for
+``wait_period_after_service_update`` seconds."""),
+
+    cfg.BoolOpt("spread_across_reserved_hosts",
+                default=False,
+                help="""
+Operators can decide whether the instances of a failed compute host should be
+spread across all the available reserved hosts of the failover segment by the
+reserved_host recovery workflow. When set to True, instances are placed on
+the reserved hosts according to the free memory nova reports for them, and
+the evacuations to the different reserved hosts run concurrently. When set to
+False, reserved hosts are tried one at a time and all the instances are
+evacuated to a single reserved host."""),
 ]
 
 instance_failure_options = [
@@ -40,7 +40,7 @@ def get_engine():
 
 def failover_segment_get_all_by_filters(
         context, filters=None, sort_keys=None, sort_dirs=None,
-        limit=None, marker=None):
+        limit=None, marker=None, use_slave=False, with_stats=False):
     """Get all failover segments that match all filters.
 
     :param context: context to query under
@@ -52,6 +52,11 @@ def failover_segment_get_all_by_filters(
     :param limit: maximum number of items to return
     :param marker: the last item of the previous page, used to determine the
                   next page of results to return
+    :param use_slave: read from the slave connection, for callers which
+                      tolerate slightly stale data
+    :param with_stats: if True, the host_count, reserved_host_count,
+                       on_maintenance_host_count and active_notification_count
+                       statistics are set on each failover segment
 
     :returns: list of dictionary-like objects containing all failover segments
     """
@@ -59,7 +64,9 @@ def failover_segment_get_all_by_filters(
                                                     sort_keys=sort_keys,
                                                     sort_dirs=sort_dirs,
                                                     limit=limit,
-                                                    marker=marker)
+                                                    marker=marker,
+                                                    use_slave=use_slave,
+                                                    with_stats=with_stats)
 
 
 def failover_segment_get_by_id(context, segment_id):
@@ -171,7 +178,7 @@ def is_failover_segment_under_recovery(context, failover_segment_id,
 
 def host_get_all_by_filters(
         context, filters=None, sort_keys=None, sort_dirs=None,
-        limit=None, marker=None):
+        limit=None, marker=None, use_slave=False):
     """Get all hosts that match all filters.
 
     :param context: context to query under
@@ -183,27 +190,32 @@ def host_get_all_by_filters(
     :param limit: maximum number of items to return
     :param marker: the last item of the previous page, used to determine the
                    next page of results to return
+    :param use_slave: read from the slave connection, for callers which
+                      tolerate slightly stale data
 
     :returns: list of dictionary-like objects containing all hosts
     """
     return IMPL.host_get_all_by_filters(context, filters=filters,
                                         sort_keys=sort_keys,
                                         sort_dirs=sort_dirs, limit=limit,
-                                        marker=marker)
+                                        marker=marker, use_slave=use_slave)
 
 
-def host_get_by_uuid(context, host_uuid, segment_uuid=None):
+def host_get_by_uuid(context, host_uuid, segment_uuid=None, use_slave=False):
     """Get host information by uuid.
 
     :param context: context to query under
     :param host_uuid: uuid of host
     :param segment_uuid: uuid of failover_segment
+    :param use_slave: read from the slave connection, for callers which
+                      tolerate slightly stale data
 
     :returns: dictionary-like object containing host
 
     :raises: exception.HostNotFound if host with 'host_uuid' doesn't exist
     """
-    return IMPL.host_get_by_uuid(context, host_uuid, segment_uuid=segment_uuid)
+    return IMPL.host_get_by_uuid(context, host_uuid, segment_uuid=segment_uuid,
+                                 use_slave=use_slave)
 
 
 def host_get_by_id(context, host_id):
@@ -259,6 +271,38 @@ def host_update(context, host_uuid, values):
     return IMPL.host_update(context, host_uuid, values)
 
 
+def hosts_create(context, values_list):
+    """Create several hosts in a single transaction.
+
+    :param context: context to query under
+    :param values_list: list of dictionaries of host attributes to create
+
+    :returns: list of dictionary-like objects containing the created hosts,
+              in the order of values_list
+
+    :raises: exception.HostExists if a host with one of the given names
+             already exists
+    """
+    return IMPL.hosts_create(context, values_list)
+
+
+def hosts_update(context, values_by_uuid):
+    """Update several hosts in a single transaction.
+
+    :param context: context to query under
+    :param values_by_uuid: dictionary mapping the uuids of the hosts to be
+                           updated to the dictionaries of their attributes
+
+    :returns: list of dictionary-like objects containing the updated hosts,
+              in the order of values_by_uuid
+
+    :raises: exception.HostNotFound if one of the hosts doesn't exist
+             exception.HostExists if a host with one of the given names
+             already exists
+    """
+    return IMPL.hosts_update(context, values_by_uuid)
+
+
 def host_delete(context, host_uuid):
     """Delete the host.
 
@@ -275,7 +319,7 @@ def host_delete(context, host_uuid):
 
 def notifications_get_all_by_filters(
         context, filters=None, sort_keys=None, sort_dirs=None,
-        limit=None, marker=None):
+        limit=None, marker=None, use_slave=False, columns=None):
     """Get all notifications that match all filters.
 
     :param context: context to query under
@@ -287,6 +331,11 @@ def notifications_get_all_by_filters(
     :param limit: maximum number of items to return
     :param marker: the last item of the previous page, used to determine the
                    next page of results to return
+    :param use_slave: read from the slave connection, for callers which
+                      tolerate slightly stale data
+    :param columns: list of the columns to read, the other ones are not
+                    loaded and must not be accessed. All columns are read
+                    if None.
 
     :returns: list of dictionary-like objects containing all notifications
     """
@@ -294,21 +343,26 @@ def notifications_get_all_by_filters(
                                                  sort_keys=sort_keys,
                                                  sort_dirs=sort_dirs,
                                                  limit=limit,
-                                                 marker=marker)
+                                                 marker=marker,
+                                                 use_slave=use_slave,
+                                                 columns=columns)
 
 
-def notification_get_by_uuid(context, notification_uuid):
+def notification_get_by_uuid(context, notification_uuid, use_slave=False):
     """Get notification information by uuid.
 
     :param context: context to query under
     :param notification_uuid: uuid of notification
+    :param use_slave: read from the slave connection, for callers which
+                      tolerate slightly stale data
 
     :returns: dictionary-like object containing notification
 
     :raises: exception.NotificationNotFound if notification with given
              'notification_uuid' doesn't exist
     """
-    return IMPL.notification_get_by_uuid(context, notification_uuid)
+    return IMPL.notification_get_by_uuid(context, notification_uuid,
+                                         use_slave=use_slave)
 
 
 def notification_get_by_id(context, notification_id):
@@ -325,6 +379,28 @@ def notification_get_by_id(context, notification_id):
     return IMPL.notification_get_by_id(context, notification_id)
 
 
+def notification_duplicate_exists(context, source_host_uuid, type,
+                                  payload_hash, generated_since,
+                                  use_slave=False):
+    """Check whether an identical notification was generated recently.
+
+    :param context: context to query under
+    :param source_host_uuid: uuid of the host the notification came from
+    :param type: type of the notification
+    :param payload_hash: hash of the payload of the notification
+    :param generated_since: oldest generated_time of the notifications to
+                            take into account
+    :param use_slave: read from the slave connection, for callers which
+                      tolerate slightly stale data
+
+    :returns: True if such a notification exists
+    """
+    return IMPL.notification_duplicate_exists(context, source_host_uuid,
+                                              type, payload_hash,
+                                              generated_since,
+                                              use_slave=use_slave)
+
+
 def notification_create(context, values):
     """Create a notification.
 
@@ -336,6 +412,41 @@ def notification_create(context, values):
     return IMPL.notification_create(context, values)
 
 
+def notifications_get_generated_since(context, source_host_uuids,
+                                      payload_hashes, generated_since,
+                                      use_slave=False):
+    """Get the notifications which may be duplicated by new ones.
+
+    :param context: context to query under
+    :param source_host_uuids: uuids of the hosts the notifications came from
+    :param payload_hashes: hashes of the payloads of the notifications
+    :param generated_since: oldest generated_time of the notifications to
+                            return
+    :param use_slave: read from the slave connection, for callers which
+                      tolerate slightly stale data
+
+    :returns: list of (source_host_uuid, type, payload_hash, generated_time)
+              tuples of the matching notifications
+    """
+    return IMPL.notifications_get_generated_since(context, source_host_uuids,
+                                                  payload_hashes,
+                                                  generated_since,
+                                                  use_slave=use_slave)
+
+
+def notifications_create(context, values_list):
+    """Create several notifications in a single transaction.
+
+    :param context: context to query under
+    :param values_list: list of dictionaries of notification attributes to
+                        create
+
+    :returns: list of dictionary-like objects containing the created
+              notifications, in the order of values_list
+    """
+    return IMPL.notifications_create(context, values_list)
+
+
 def notification_update(context, notification_uuid, values):
     """Update notification information in the database.
 
@@ -351,6 +462,85 @@ def notification_update(context, notification_uuid, values):
     return IMPL.notification_update(context, notification_uuid, values)
 
 
+def notification_update_status(context, notification_uuid, status,
+                               expected_status, claimed_by=None):
+    """Update the status of a notification only if it has not changed.
+
+    :param context: context to query under
+    :param notification_uuid: uuid of notification to be updated
+    :param status: new status of the notification
+    :param expected_status: status, or list of statuses, the notification
+                            must currently have for the update to happen
+    :param claimed_by: if given, identifier of the engine which must hold
+                       the lease of the notification for the update to
+                       happen
+
+    :returns: True if the status has been updated
+    """
+    return IMPL.notification_update_status(context, notification_uuid,
+                                           status, expected_status,
+                                           claimed_by=claimed_by)
+
+
+def notifications_update_status_by_filters(context, filters, status):
+    """Update the status of all the notifications that match all filters.
+
+    :param context: context to query under
+    :param filters: filters for the query in the form of key/value, same as
+                    for notifications_get_all_by_filters
+    :param status: new status of the notifications
+
+    :returns: list of dictionary-like objects containing the updated
+              notifications
+    """
+    return IMPL.notifications_update_status_by_filters(context, filters,
+                                                       status)
+
+
+def notification_claim(context, notification_uuid, claimed_by, lease_time):
+    """Claim the notification for processing.
+
+    The claim succeeds if the notification isn't claimed, is already claimed
+    by 'claimed_by' or if the lease of its current owner has expired.
+
+    :param context: context to query under
+    :param notification_uuid: uuid of notification to be claimed
+    :param claimed_by: identifier of the engine claiming the notification
+    :param lease_time: number of seconds the lease is granted for
+
+    :returns: True if the notification is claimed by 'claimed_by'
+    """
+    return IMPL.notification_claim(context, notification_uuid, claimed_by,
+                                   lease_time)
+
+
+def notification_renew_lease(context, notification_uuid, claimed_by,
+                             lease_time):
+    """Extend the lease of a notification claimed by 'claimed_by'.
+
+    :param context: context to query under
+    :param notification_uuid: uuid of notification
+    :param claimed_by: identifier of the engine holding the lease
+    :param lease_time: number of seconds the lease is extended for
+
+    :returns: False if the notification isn't claimed by 'claimed_by'
+    """
+    return IMPL.notification_renew_lease(context, notification_uuid,
+                                         claimed_by, lease_time)
+
+
+def notification_release(context, notification_uuid, claimed_by):
+    """Release the lease of a notification claimed by 'claimed_by'.
+
+    :param context: context to query under
+    :param notification_uuid: uuid of notification
+    :param claimed_by: identifier of the engine holding the lease
+
+    :returns: False if the notification isn't claimed by 'claimed_by'
+    """
+    return IMPL.notification_release(context, notification_uuid, claimed_by)
+
+
 def notification_delete(context, notification_uuid):
     """Delete the notification.
 
@@ -363,11 +553,56 @@ def notification_delete(context, notification_uuid):
     return IMPL.notification_delete(context, notification_uuid)
 
 
-def purge_deleted_rows(context, age_in_days, max_rows):
+def purge_deleted_rows(context, age_in_days, max_rows, batch_size=1000,
+                       sleep_time=0, dry_run=False):
     """Purge the soft deleted rows.
 
     :param context: context to query under
     :param age_in_days: Purge deleted rows older than age in days
     :param max_rows: Limit number of records to delete
+    :param batch_size: Number of records deleted in each transaction
+    :param sleep_time: Seconds to wait between two transactions
+    :param dry_run: Only count the records which would be deleted
+
+    :returns: dictionary of the number of records deleted, or which would
+              be deleted, by table name
+    """
+    return IMPL.purge_deleted_rows(context, age_in_days, max_rows,
+                                   batch_size=batch_size,
+                                   sleep_time=sleep_time, dry_run=dry_run)
+
+
+def notifications_get_purgeable_uuids(context, notification_uuids,
+                                      age_in_days):
+    """Filter the notification uuids whose records may be purged.
+
+    :param context: context to query under
+    :param notification_uuids: list of notification uuids to filter
+    :param age_in_days: Age in days of the notifications to purge
+
+    :returns: list of the uuids of the notifications which don't exist
+              anymore or which would be purged by purge_deleted_rows
+    """
+    return IMPL.notifications_get_purgeable_uuids(context,
+                                                  notification_uuids,
+                                                  age_in_days)
+
+
+def archive_notifications(context, age_in_days, max_rows=-1, batch_size=1000,
+                          sleep_time=0, dry_run=False):
+    """Move the notifications not processed anymore to the archive.
+
+    :param context: context to query under
+    :param age_in_days: Archive notifications last updated before age in days
+    :param max_rows: Limit number of notifications to archive
+    :param batch_size: Number of notifications archived in each transaction
+    :param sleep_time: Seconds to wait between two transactions
+    :param dry_run: Only count the notifications which would be archived
+
+    :returns: number of notifications archived, or which would be archived
     """
-    return IMPL.purge_deleted_rows(context, age_in_days, max_rows)
+    return IMPL.archive_notifications(context, age_in_days,
+                                      max_rows=max_rows,
+                                      batch_size=batch_size,
+                                      sleep_time=sleep_time,
+                                      dry_run=dry_run)
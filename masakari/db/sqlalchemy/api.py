@@ -14,8 +14,13 @@
 #    under the License.
 """Implementation of SQLAlchemy backend."""
 
+import collections
 import datetime
+import functools
+import inspect
 import sys
+import time
+import types
 
 from oslo_db import api as oslo_db_api
 from oslo_db import exception as db_exc
@@ -24,22 +29,27 @@ from oslo_db.sqlalchemy import utils as sqlalchemyutils
 from oslo_log import log as logging
 from oslo_utils import timeutils
 from sqlalchemy import or_, and_
-from sqlalchemy.ext.compiler import compiles
-from sqlalchemy import MetaData
+from sqlalchemy import Boolean, DateTime, Integer, String
+from sqlalchemy import orm
 from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import selectinload
 from sqlalchemy import sql
-import sqlalchemy.sql as sa_sql
 from sqlalchemy.sql import func
 
 import masakari.conf
 from masakari.db.sqlalchemy import models
 from masakari import exception
 from masakari.i18n import _
+from masakari import utils
 
 LOG = logging.getLogger(__name__)
 
 CONF = masakari.conf.CONF
 
+# Status of the notifications counted by the active_notifications column of
+# failover segments.
+ACTIVE_NOTIFICATION_STATUSES = ('new', 'running', 'error')
+
 main_context_manager = enginefacade.transaction_context()
 
 
@@ -87,6 +97,37 @@ def create_context_manager(connection=None):
     return ctxt_mgr
 
 
+def select_db_reader_mode(f):
+    """Decorator to select synchronous or asynchronous reader mode.
+
+    The kwarg argument 'use_slave' defines reader mode. Asynchronous reader
+    will be used if 'use_slave' is True and synchronous reader otherwise.
+    If 'use_slave' is not specified default value 'False' will be used.
+
+    The asynchronous reader uses the [database] slave_connection, if set,
+    so it must only be used by callers which tolerate reading slightly
+    stale data.
+
+    Wrapped function must have a context in the arguments.
+    """
+
+    @functools.wraps(f)
+    def wrapper(*args, **kwargs):
+        keyed_args = inspect.getcallargs(f, *args, **kwargs)
+
+        context = keyed_args['context']
+        use_slave = keyed_args.get('use_slave', False)
+
+        if use_slave:
+            reader_mode = main_context_manager.async_
+        else:
+            reader_mode = main_context_manager.reader
+
+        with reader_mode.using(context):
+            return f(*args, **kwargs)
+    return wrapper
+
+
 def model_query(context, model, args=None, read_deleted=None):
     """Query helper that accounts for context's `read_deleted` field.
     :param context:     MasakariContext of the query.
@@ -186,11 +227,109 @@ def _process_sort_params(sort_keys, sort_dirs,
     return result_keys, result_dirs
 
 
+def _get_cursor_value(column, value):
+    """Returns the value of a cursor converted to the type of its column.
+
+    :raises ValueError: if the value doesn't fit the column
+    """
+    if value is None:
+        # NOTE: utils.encode_cursor is not used for the items having a null
+        # sort key value, they are paged by their id.
+        raise ValueError()
+    if isinstance(column.type, DateTime):
+        if not isinstance(value, str):
+            raise ValueError()
+        return timeutils.normalize_time(timeutils.parse_isotime(value))
+    if isinstance(column.type, Boolean):
+        if not isinstance(value, bool):
+            raise ValueError()
+        return value
+    if isinstance(column.type, Integer):
+        if isinstance(value, bool) or not isinstance(value, (int, str)):
+            raise ValueError()
+        return int(value)
+    if isinstance(column.type, String):
+        if not isinstance(value, str):
+            raise ValueError()
+        return value
+    raise ValueError()
+
+
+def _get_marker_values(context, model, sort_keys, marker):
+    """Returns the values of the sort keys at the given marker.
+
+    The marker is either a cursor built by utils.encode_cursor from the last
+    item of the previous page, which already holds these values, or the id
+    of that item, in which case they are read from the database.
+    """
+    try:
+        cursor = utils.decode_cursor(marker)
+    except ValueError:
+        marker_row = model_query(context, model).filter_by(id=marker).first()
+        if not marker_row:
+            raise exception.MarkerNotFound(marker=marker)
+        return [getattr(marker_row, key) for key in sort_keys]
+
+    marker_values = []
+    for key in sort_keys:
+        if key not in cursor:
+            raise exception.MarkerNotFound(marker=marker)
+        try:
+            marker_values.append(_get_cursor_value(getattr(model, key),
+                                                   cursor[key]))
+        except ValueError:
+            raise exception.MarkerNotFound(marker=marker)
+
+    return marker_values
+
+
+def _paginate_query(context, query, model, limit, sort_keys, sort_dirs,
+                    marker=None):
+    """Returns the query sorted and limited to the page after the marker.
+
+    When all the keys are sorted in the same direction, the page is selected
+    with a single row value comparison, e.g. (created_at, id) < (X, Y), which
+    the database resolves with a range scan of the matching index, so that
+    the cost of a page doesn't depend on its position in the collection.
+    Otherwise the criteria built by sqlalchemyutils.paginate_query are used.
+    """
+    for key in sort_keys:
+        if key not in model.__table__.columns:
+            raise exception.InvalidSortKey()
+
+    marker_row = None
+    if marker is not None:
+        marker_values = _get_marker_values(context, model, sort_keys, marker)
+        columns = [getattr(model, key) for key in sort_keys]
+        if (len(set(sort_dirs)) == 1 and None not in marker_values and
+                not any(isinstance(column.type, Boolean)
+                        for column in columns)):
+            keys = sql.tuple_(*columns)
+            values = sql.tuple_(*[sql.literal(value, type_=column.type)
+                                  for column, value in zip(columns,
+                                                           marker_values)])
+            if sort_dirs[0] == 'desc':
+                query = query.filter(keys < values)
+            else:
+                query = query.filter(keys > values)
+        else:
+            marker_row = types.SimpleNamespace(**dict(zip(sort_keys,
+                                                          marker_values)))
+
+    try:
+        return sqlalchemyutils.paginate_query(query, model, limit, sort_keys,
+                                              marker=marker_row,
+                                              sort_dirs=sort_dirs)
+    except db_exc.InvalidSortKey as e:
+        raise exception.InvalidSortKey(e)
+
+
 @oslo_db_api.wrap_db_retry(max_retries=5, retry_on_deadlock=True)
-@main_context_manager.reader
+@select_db_reader_mode
 def failover_segment_get_all_by_filters(
         context, filters=None, sort_keys=None,
-        sort_dirs=None, limit=None, marker=None):
+        sort_dirs=None, limit=None, marker=None, use_slave=False,
+        with_stats=False):
 
     # NOTE(Dinesh_Bhor): If the limit is 0 there is no point in even going
     # to the database since nothing is going to be returned anyway.
@@ -200,7 +339,19 @@ def failover_segment_get_all_by_filters(
     sort_keys, sort_dirs = _process_sort_params(sort_keys,
                                                 sort_dirs)
     filters = filters or {}
-    query = model_query(context, models.FailoverSegment)
+    if with_stats:
+        # NOTE: The host counts of all the segments of the page are read by
+        # the same query, joining the hosts grouped by segment.
+        stats = _failover_segment_host_stats_query(context)
+        query = model_query(
+            context, models.FailoverSegment,
+            (models.FailoverSegment, stats.c.host_count,
+             stats.c.reserved_host_count,
+             stats.c.on_maintenance_host_count)).outerjoin(
+                 stats,
+                 stats.c.failover_segment_id == models.FailoverSegment.uuid)
+    else:
+        query = model_query(context, models.FailoverSegment)
 
     if 'recovery_method' in filters:
         query = query.filter(models.FailoverSegment.recovery_method == filters[
@@ -209,24 +360,38 @@ def failover_segment_get_all_by_filters(
         query = query.filter(models.FailoverSegment.service_type == filters[
             'service_type'])
 
-    marker_row = None
-    if marker is not None:
-        marker_row = model_query(context,
-                                 models.FailoverSegment
-                                 ).filter_by(id=marker).first()
+    query = _paginate_query(context, query, models.FailoverSegment, limit,
+                            sort_keys, sort_dirs, marker=marker)
 
-        if not marker_row:
-            raise exception.MarkerNotFound(marker=marker)
+    if not with_stats:
+        return query.all()
 
-    try:
-        query = sqlalchemyutils.paginate_query(query, models.FailoverSegment,
-                                               limit, sort_keys,
-                                               marker=marker_row,
-                                               sort_dirs=sort_dirs)
-    except db_exc.InvalidSortKey as e:
-        raise exception.InvalidSortKey(e)
+    segments = []
+    for (segment, host_count, reserved_host_count,
+            on_maintenance_host_count) in query.all():
+        segment.host_count = host_count or 0
+        segment.reserved_host_count = reserved_host_count or 0
+        segment.on_maintenance_host_count = on_maintenance_host_count or 0
+        segment.active_notification_count = segment.active_notifications
+        segments.append(segment)
+    return segments
 
-    return query.all()
+
+def _failover_segment_host_stats_query(context):
+    """Returns the subquery counting the hosts of each segment."""
+    def _count_if(criterion):
+        return func.sum(sql.case([(criterion, 1)], else_=0))
+
+    return model_query(
+        context, models.Host,
+        (models.Host.failover_segment_id,
+         func.count(models.Host.id).label('host_count'),
+         _count_if(models.Host.reserved == sql.true()).label(
+             'reserved_host_count'),
+         _count_if(models.Host.on_maintenance == sql.true()).label(
+             'on_maintenance_host_count')),
+        read_deleted='no').group_by(
+            models.Host.failover_segment_id).subquery()
 
 
 @oslo_db_api.wrap_db_retry(max_retries=5, retry_on_deadlock=True)
@@ -320,16 +485,24 @@ def is_failover_segment_under_recovery(context, failover_segment_id,
                                        filters=None):
     filters = filters or {}
 
+    status = filters.get('status')
+    if (isinstance(status, (list, tuple, set, frozenset)) and
+            set(status) == set(ACTIVE_NOTIFICATION_STATUSES)):
+        query = model_query(context, models.FailoverSegment,
+                            (models.FailoverSegment.active_notifications,)
+                            ).filter_by(uuid=failover_segment_id)
+        result = query.first()
+        return result is not None and result[0] > 0
+
     # get all hosts against the failover_segment
     inner_select = model_query(
         context, models.Host, (models.Host.uuid,)).filter(
             models.Host.failover_segment_id == failover_segment_id)
 
-    # check if any host has notification status as new, running or error
+    # check if any host has notification status as given in filters
     query = model_query(context, models.Notification,
                         (func.count(models.Notification.id),))
     if 'status' in filters:
-        status = filters['status']
         if isinstance(status, (list, tuple, set, frozenset)):
             column_attr = getattr(models.Notification, 'status')
             query = query.filter(column_attr.in_(status))
@@ -342,14 +515,56 @@ def is_failover_segment_under_recovery(context, failover_segment_id,
     return query.first()[0] > 0
 
 
+def _update_segments_active_notifications(context, status_changes):
+    """Updates the active notifications counters of failover segments.
+
+    Must be called in the transaction changing the notifications.
+
+    :param status_changes: list of (source_host_uuid, old_status, new_status)
+                           tuples, where old_status is None for a created
+                           notification and new_status is None for a
+                           deleted one.
+    """
+    host_deltas = collections.Counter()
+    for source_host_uuid, old_status, new_status in status_changes:
+        host_deltas[source_host_uuid] += (
+            int(new_status in ACTIVE_NOTIFICATION_STATUSES) -
+            int(old_status in ACTIVE_NOTIFICATION_STATUSES))
+
+    host_deltas = {host_uuid: delta for host_uuid, delta
+                   in host_deltas.items() if delta}
+    if not host_deltas:
+        return
+
+    segment_deltas = collections.Counter()
+    hosts = model_query(context, models.Host,
+                        (models.Host.uuid, models.Host.failover_segment_id)
+                        ).filter(models.Host.uuid.in_(list(host_deltas)))
+    for host_uuid, segment_uuid in hosts:
+        segment_deltas[segment_uuid] += host_deltas[host_uuid]
+
+    # NOTE: Segments are always updated in the same order so that concurrent
+    # transactions don't deadlock on their rows.
+    for segment_uuid in sorted(segment_deltas):
+        delta = segment_deltas[segment_uuid]
+        if not delta:
+            continue
+        model_query(context, models.FailoverSegment).filter_by(
+            uuid=segment_uuid).update(
+            {'active_notifications':
+                models.FailoverSegment.active_notifications + delta,
+             'updated_at': models.FailoverSegment.updated_at},
+            synchronize_session=False)
+
+
 # db apis for host
 
 
 @oslo_db_api.wrap_db_retry(max_retries=5, retry_on_deadlock=True)
-@main_context_manager.reader
+@select_db_reader_mode
 def host_get_all_by_filters(
         context, filters=None, sort_keys=None,
-        sort_dirs=None, limit=None, marker=None):
+        sort_dirs=None, limit=None, marker=None, use_slave=False):
 
     # NOTE(Dinesh_Bhor): If the limit is 0 there is no point in even going
     # to the database since nothing is going to be returned anyway.
@@ -360,8 +575,11 @@ def host_get_all_by_filters(
                                                 sort_dirs)
 
     filters = filters or {}
+    # NOTE: The segments are read by a second query selecting the distinct
+    # segments of the hosts, rather than joined to every host row, as most
+    # hosts of a page usually belong to a few segments.
     query = model_query(context,
-                        models.Host).options(joinedload('failover_segment'))
+                        models.Host).options(selectinload('failover_segment'))
 
     if 'failover_segment_id' in filters:
         query = query.filter(models.Host.failover_segment_id == filters[
@@ -377,28 +595,21 @@ def host_get_all_by_filters(
     if 'reserved' in filters:
         query = query.filter(models.Host.reserved == filters['reserved'])
 
-    marker_row = None
-    if marker is not None:
-        marker_row = model_query(context,
-                                 models.Host
-                                 ).filter_by(id=marker).first()
-        if not marker_row:
-            raise exception.MarkerNotFound(marker=marker)
+    if 'name' in filters:
+        query = query.filter(models.Host.name.in_(filters['name']))
 
-    try:
-        query = sqlalchemyutils.paginate_query(query, models.Host, limit,
-                                               sort_keys,
-                                               marker=marker_row,
-                                               sort_dirs=sort_dirs)
-    except db_exc.InvalidSortKey as e:
-        raise exception.InvalidSortKey(e)
+    if 'uuid' in filters:
+        query = query.filter(models.Host.uuid.in_(filters['uuid']))
+
+    query = _paginate_query(context, query, models.Host, limit,
+                            sort_keys, sort_dirs, marker=marker)
 
     return query.all()
 
 
 @oslo_db_api.wrap_db_retry(max_retries=5, retry_on_deadlock=True)
-@main_context_manager.reader
-def host_get_by_uuid(context, host_uuid, segment_uuid=None):
+@select_db_reader_mode
+def host_get_by_uuid(context, host_uuid, segment_uuid=None, use_slave=False):
     return _host_get_by_uuid(context, host_uuid, segment_uuid=segment_uuid)
 
 
@@ -476,6 +687,57 @@ def host_update(context, host_uuid, values):
     return _host_get_by_uuid(context, host.uuid)
 
 
+def _hosts_get_by_uuids(context, host_uuids):
+    query = model_query(context, models.Host).filter(
+        models.Host.uuid.in_(host_uuids)).options(
+        joinedload('failover_segment'))
+    hosts = {host.uuid: host for host in query}
+
+    for host_uuid in host_uuids:
+        if host_uuid not in hosts:
+            raise exception.HostNotFound(id=host_uuid)
+
+    return [hosts[host_uuid] for host_uuid in host_uuids]
+
+
+@oslo_db_api.wrap_db_retry(max_retries=5, retry_on_deadlock=True)
+@main_context_manager.writer
+def hosts_create(context, values_list):
+    hosts = []
+    for values in values_list:
+        host = models.Host()
+        host.update(values)
+        hosts.append(host)
+
+    context.session.add_all(hosts)
+    try:
+        context.session.flush()
+    except db_exc.DBDuplicateEntry as e:
+        raise exception.HostExists(
+            name=e.value or ', '.join(host.name for host in hosts))
+
+    return _hosts_get_by_uuids(context, [host.uuid for host in hosts])
+
+
+@oslo_db_api.wrap_db_retry(max_retries=5, retry_on_deadlock=True)
+@main_context_manager.writer
+def hosts_update(context, values_by_uuid):
+    host_uuids = list(values_by_uuid)
+    hosts = _hosts_get_by_uuids(context, host_uuids)
+
+    for host in hosts:
+        host.update(values_by_uuid[host.uuid])
+    try:
+        context.session.flush()
+    except db_exc.DBDuplicateEntry as e:
+        raise exception.HostExists(
+            name=e.value or ', '.join(
+                values['name'] for values in values_by_uuid.values()
+                if 'name' in values))
+
+    return _hosts_get_by_uuids(context, host_uuids)
+
+
 @oslo_db_api.wrap_db_retry(max_retries=5, retry_on_deadlock=True)
 @main_context_manager.writer
 def host_delete(context, host_uuid):
@@ -491,73 +753,94 @@ def host_delete(context, host_uuid):
 # db apis for notifications
 
 
-@oslo_db_api.wrap_db_retry(max_retries=5, retry_on_deadlock=True)
-@main_context_manager.reader
-def notifications_get_all_by_filters(
-        context, filters=None, sort_keys=None,
-        sort_dirs=None, limit=None, marker=None):
-
-    # NOTE(Dinesh_Bhor): If the limit is 0 there is no point in even going
-    # to the database since nothing is going to be returned anyway.
-    if limit == 0:
-        return []
-
-    sort_keys, sort_dirs = _process_sort_params(sort_keys,
-                                                sort_dirs)
-
-    filters = filters or {}
-    query = model_query(context, models.Notification)
+def _notifications_filter_query(query, filters, model=models.Notification):
+    if 'notification_uuid' in filters:
+        query = query.filter(model.notification_uuid.in_(
+            filters['notification_uuid']))
 
     if 'source_host_uuid' in filters:
-        query = query.filter(models.Notification.source_host_uuid == filters[
+        query = query.filter(model.source_host_uuid == filters[
             'source_host_uuid'])
 
     if 'type' in filters:
-        query = query.filter(models.Notification.type == filters['type'])
+        query = query.filter(model.type == filters['type'])
 
     if 'status' in filters:
         status = filters['status']
         if isinstance(status, (list, tuple, set, frozenset)):
-            column_attr = getattr(models.Notification, 'status')
+            column_attr = getattr(model, 'status')
             query = query.filter(column_attr.in_(status))
         else:
-            query = query.filter(models.Notification.status == status)
+            query = query.filter(model.status == status)
 
     if 'generated-since' in filters:
         generated_since = timeutils.normalize_time(filters['generated-since'])
         query = query.filter(
-            models.Notification.generated_time >= generated_since)
+            model.generated_time >= generated_since)
 
-    marker_row = None
-    if marker is not None:
-        marker_row = model_query(context,
-                                 models.Notification
-                                 ).filter_by(id=marker).first()
-        if not marker_row:
-            raise exception.MarkerNotFound(marker=marker)
+    if 'generated-before' in filters:
+        generated_before = timeutils.normalize_time(
+            filters['generated-before'])
+        query = query.filter(
+            model.generated_time < generated_before)
 
-    try:
-        query = sqlalchemyutils.paginate_query(query, models.Notification,
-                                               limit,
-                                               sort_keys,
-                                               marker=marker_row,
-                                               sort_dirs=sort_dirs)
-    except db_exc.InvalidSortKey as err:
-        raise exception.InvalidSortKey(err)
+    if 'lease-expired-before' in filters:
+        lease_expired_before = timeutils.normalize_time(
+            filters['lease-expired-before'])
+        query = query.filter(
+            model.lease_expires_at < lease_expired_before)
+
+    return query
+
+
+@oslo_db_api.wrap_db_retry(max_retries=5, retry_on_deadlock=True)
+@select_db_reader_mode
+def notifications_get_all_by_filters(
+        context, filters=None, sort_keys=None,
+        sort_dirs=None, limit=None, marker=None, use_slave=False,
+        columns=None):
+
+    # NOTE(Dinesh_Bhor): If the limit is 0 there is no point in even going
+    # to the database since nothing is going to be returned anyway.
+    if limit == 0:
+        return []
+
+    sort_keys, sort_dirs = _process_sort_params(sort_keys,
+                                                sort_dirs)
+
+    filters = filters or {}
+    # NOTE: The archived notifications are only listed on demand, they are
+    # never looked up by the engine.
+    model = models.Notification
+    if filters.get('archived'):
+        model = models.ShadowNotification
+
+    query = model_query(context, model)
+    query = _notifications_filter_query(query, filters, model=model)
+
+    query = _paginate_query(context, query, model, limit,
+                            sort_keys, sort_dirs, marker=marker)
+    if columns is not None:
+        # NOTE: The sort keys are loaded too, the last notification of a page
+        # holds the cursor of the next one.
+        query = query.options(orm.load_only(*(set(columns) |
+                                              set(sort_keys))))
 
     return query.all()
 
 
 @oslo_db_api.wrap_db_retry(max_retries=5, retry_on_deadlock=True)
-@main_context_manager.reader
-def notification_get_by_uuid(context, notification_uuid):
+@select_db_reader_mode
+def notification_get_by_uuid(context, notification_uuid, use_slave=False):
     return _notification_get_by_uuid(context, notification_uuid)
 
 
-def _notification_get_by_uuid(context, notification_uuid):
+def _notification_get_by_uuid(context, notification_uuid, for_update=False):
     query = model_query(context, models.Notification
                         ).filter_by(notification_uuid=notification_uuid
                                     )
+    if for_update:
+        query = query.with_for_update()
 
     result = query.first()
     if not result:
@@ -580,6 +863,20 @@ def notification_get_by_id(context, notification_id):
     return result
 
 
+@oslo_db_api.wrap_db_retry(max_retries=5, retry_on_deadlock=True)
+@select_db_reader_mode
+def notification_duplicate_exists(context, source_host_uuid, type,
+                                  payload_hash, generated_since,
+                                  use_slave=False):
+    generated_since = timeutils.normalize_time(generated_since)
+    query = model_query(context, models.Notification).filter_by(
+        source_host_uuid=source_host_uuid, type=type,
+        payload_hash=payload_hash).filter(
+        models.Notification.generated_time >= generated_since)
+
+    return context.session.query(query.exists()).scalar()
+
+
 @oslo_db_api.wrap_db_retry(max_retries=5, retry_on_deadlock=True)
 @main_context_manager.writer
 def notification_create(context, values):
@@ -588,101 +885,400 @@ def notification_create(context, values):
 
     notification.save(session=context.session)
 
+    _update_segments_active_notifications(
+        context, [(notification.source_host_uuid, None, notification.status)])
+
     return _notification_get_by_uuid(context, notification.notification_uuid)
 
 
+@oslo_db_api.wrap_db_retry(max_retries=5, retry_on_deadlock=True)
+@select_db_reader_mode
+def notifications_get_generated_since(context, source_host_uuids,
+                                      payload_hashes, generated_since,
+                                      use_slave=False):
+    generated_since = timeutils.normalize_time(generated_since)
+    query = model_query(context, models.Notification,
+                        (models.Notification.source_host_uuid,
+                         models.Notification.type,
+                         models.Notification.payload_hash,
+                         models.Notification.generated_time)).filter(
+        models.Notification.source_host_uuid.in_(list(source_host_uuids)),
+        models.Notification.payload_hash.in_(list(payload_hashes)),
+        models.Notification.generated_time >= generated_since)
+
+    return query.all()
+
+
+@oslo_db_api.wrap_db_retry(max_retries=5, retry_on_deadlock=True)
+@main_context_manager.writer
+def notifications_create(context, values_list):
+    notifications = []
+    for values in values_list:
+        notification = models.Notification()
+        notification.update(values)
+        notifications.append(notification)
+
+    context.session.add_all(notifications)
+    context.session.flush()
+
+    _update_segments_active_notifications(
+        context, [(notification.source_host_uuid, None, notification.status)
+                  for notification in notifications])
+
+    uuids = [notification.notification_uuid
+             for notification in notifications]
+    query = model_query(context, models.Notification).filter(
+        models.Notification.notification_uuid.in_(uuids))
+    created = {notification.notification_uuid: notification
+               for notification in query}
+
+    return [created[uuid] for uuid in uuids]
+
+
 @oslo_db_api.wrap_db_retry(max_retries=5, retry_on_deadlock=True)
 @main_context_manager.writer
 def notification_update(context, notification_uuid, values):
-    notification = _notification_get_by_uuid(context, notification_uuid)
+    notification = _notification_get_by_uuid(context, notification_uuid,
+                                             for_update=True)
+    old_source_host_uuid = notification.source_host_uuid
+    old_status = notification.status
 
     notification.update(values)
 
     notification.save(session=context.session)
 
+    _update_segments_active_notifications(
+        context, [(old_source_host_uuid, old_status, None),
+                  (notification.source_host_uuid, None, notification.status)])
+
     return _notification_get_by_uuid(context, notification.notification_uuid)
 
 
 @oslo_db_api.wrap_db_retry(max_retries=5, retry_on_deadlock=True)
 @main_context_manager.writer
-def notification_delete(context, notification_uuid):
+def notification_update_status(context, notification_uuid, status,
+                               expected_status, claimed_by=None):
+    if not isinstance(expected_status, (list, tuple, set, frozenset)):
+        expected_status = [expected_status]
 
-    count = model_query(context, models.Notification
-                        ).filter_by(notification_uuid=notification_uuid
-                                    ).soft_delete(synchronize_session=False)
+    query = model_query(context, models.Notification).filter_by(
+        notification_uuid=notification_uuid).filter(
+        models.Notification.status.in_(expected_status))
+    if claimed_by is not None:
+        query = query.filter_by(claimed_by=claimed_by)
 
-    if count == 0:
+    # NOTE: The row is locked to know which of the expected status it is
+    # changed from, the status condition is still checked by the UPDATE.
+    notification = query.with_for_update().first()
+    if not notification:
+        return False
+
+    count = query.update({'status': status}, synchronize_session=False)
+    if count != 1:
+        return False
+
+    _update_segments_active_notifications(
+        context, [(notification.source_host_uuid, notification.status,
+                   status)])
+
+    return True
+
+
+@oslo_db_api.wrap_db_retry(max_retries=5, retry_on_deadlock=True)
+@main_context_manager.writer
+def notifications_update_status_by_filters(context, filters, status):
+    query = model_query(context, models.Notification)
+    query = _notifications_filter_query(query, filters)
+
+    # NOTE: Lock the matching rows so that the ones returned are exactly the
+    # ones updated below, whatever the notifications concurrently processed.
+    notifications = query.with_for_update().all()
+    if not notifications:
+        return []
+
+    model_query(context, models.Notification).filter(
+        models.Notification.id.in_([n.id for n in notifications])).update(
+        {'status': status}, synchronize_session=False)
+
+    _update_segments_active_notifications(
+        context, [(n.source_host_uuid, n.status, status)
+                  for n in notifications])
+
+    for notification in notifications:
+        orm.attributes.set_committed_value(notification, 'status', status)
+
+    return notifications
+
+
+@oslo_db_api.wrap_db_retry(max_retries=5, retry_on_deadlock=True)
+@main_context_manager.writer
+def notification_claim(context, notification_uuid, claimed_by, lease_time):
+    now = timeutils.utcnow()
+    lease_expires_at = now + datetime.timedelta(seconds=lease_time)
+
+    # NOTE: The conditions are checked by the UPDATE statement itself so
+    # that only one engine can win the claim of a notification whose lease
+    # is free or has expired.
+    query = model_query(context, models.Notification).filter_by(
+        notification_uuid=notification_uuid).filter(or_(
+            models.Notification.claimed_by.is_(None),
+            models.Notification.claimed_by == claimed_by,
+            models.Notification.lease_expires_at < now))
+
+    count = query.update(
+        {'claimed_by': claimed_by, 'lease_expires_at': lease_expires_at},
+        synchronize_session=False)
+
+    return count == 1
+
+
+@oslo_db_api.wrap_db_retry(max_retries=5, retry_on_deadlock=True)
+@main_context_manager.writer
+def notification_renew_lease(context, notification_uuid, claimed_by,
+                             lease_time):
+    lease_expires_at = timeutils.utcnow() + datetime.timedelta(
+        seconds=lease_time)
+
+    query = model_query(context, models.Notification).filter_by(
+        notification_uuid=notification_uuid, claimed_by=claimed_by)
+
+    count = query.update({'lease_expires_at': lease_expires_at},
+                         synchronize_session=False)
+
+    return count == 1
+
+
+@oslo_db_api.wrap_db_retry(max_retries=5, retry_on_deadlock=True)
+@main_context_manager.writer
+def notification_release(context, notification_uuid, claimed_by):
+    query = model_query(context, models.Notification).filter_by(
+        notification_uuid=notification_uuid, claimed_by=claimed_by)
+
+    count = query.update({'claimed_by': None, 'lease_expires_at': None},
+                         synchronize_session=False)
+
+    return count == 1
+
+
+@oslo_db_api.wrap_db_retry(max_retries=5, retry_on_deadlock=True)
+@main_context_manager.writer
+def notification_delete(context, notification_uuid):
+    query = model_query(context, models.Notification
+                        ).filter_by(notification_uuid=notification_uuid)
+
+    notification = query.with_for_update().first()
+    if not notification:
         raise exception.NotificationNotFound(id=notification_uuid)
 
+    query.soft_delete(synchronize_session=False)
+
+    _update_segments_active_notifications(
+        context, [(notification.source_host_uuid, notification.status,
+                   None)])
+
 
-class DeleteFromSelect(sa_sql.expression.UpdateBase):
-    def __init__(self, table, select, column):
-        self.table = table
-        self.select = select
-        self.column = column
+# Tables purged by purge_deleted_rows, the ones referencing other tables
+# first.
+_PURGE_MODELS = (models.Notification, models.ShadowNotification, models.Host,
+                 models.FailoverSegment)
 
 
-# NOTE(pooja_jadhav): MySQL doesn't yet support subquery with
-# 'LIMIT & IN/ALL/ANY/SOME' We need work around this with nesting select.
-@compiles(DeleteFromSelect)
-def visit_delete_from_select(element, compiler, **kw):
-    return "DELETE FROM %s WHERE %s in (SELECT T1.%s FROM (%s) as T1)" % (
-        compiler.process(element.table, asfrom=True),
-        compiler.process(element.column),
-        element.column.name,
-        compiler.process(element.select))
+def _get_purge_criteria(table, deleted_age):
+    # NOTE: Notifications are never soft deleted, they are purged based on
+    # their last update once they are not going to be processed anymore.
+    if table.name in ('notifications', 'shadow_notifications'):
+        return and_(table.c.updated_at < deleted_age,
+                    table.c.status.in_(('finished', 'failed', 'ignored')))
+
+    return table.c.deleted_at < deleted_age
 
 
 @oslo_db_api.wrap_db_retry(max_retries=5, retry_on_deadlock=True)
 @main_context_manager.writer
-def purge_deleted_rows(context, age_in_days, max_rows):
+def _purge_rows_batch(context, table, criteria, batch_size):
+    # NOTE: The ids are selected first as MySQL doesn't support LIMIT in a
+    # subquery of IN, deleting them by primary key only locks these rows.
+    query = sql.select([table.c.id]).where(criteria).order_by(
+        table.c.id).limit(batch_size)
+    ids = [row[0] for row in context.session.execute(query)]
+    if ids:
+        context.session.execute(table.delete().where(table.c.id.in_(ids)))
+
+    return len(ids)
+
+
+@oslo_db_api.wrap_db_retry(max_retries=5, retry_on_deadlock=True)
+@main_context_manager.reader
+def _count_purge_rows(context, table, criteria):
+    query = sql.select([func.count()]).select_from(table).where(criteria)
+    return context.session.execute(query).scalar()
+
+
+def purge_deleted_rows(context, age_in_days, max_rows, batch_size=1000,
+                       sleep_time=0, dry_run=False):
     """Purges soft deleted rows
 
     Deleted rows get purged from hosts and segment tables based on
     deleted_at column. As notifications table doesn't delete any of
-    the notification records so rows get purged from notifications
-    based on last updated_at and status column.
+    the notification records so rows get purged from notifications,
+    and from the archived ones of shadow_notifications, based on last
+    updated_at and status column.
+
+    Rows are deleted by batches of batch_size rows, each one in its own
+    transaction, waiting sleep_time seconds between two batches so that
+    the tables are never locked for long. With dry_run, the rows which
+    would be purged are only counted.
     """
-    engine = get_engine()
-    conn = engine.connect()
-    metadata = MetaData()
-    metadata.reflect(engine)
     deleted_age = timeutils.utcnow() - datetime.timedelta(days=age_in_days)
     total_rows_purged = 0
-    for table in reversed(metadata.sorted_tables):
-        if 'deleted' not in table.columns.keys():
-            continue
-        LOG.info('Purging deleted rows older than %(age_in_days)d day(s) '
-                 'from table %(tbl)s',
-            {'age_in_days': age_in_days, 'tbl': table})
-        column = table.c.id
-        updated_at_column = table.c.updated_at
-        deleted_at_column = table.c.deleted_at
-
-        if table.name == 'notifications':
-            status_column = table.c.status
-            query_delete = sql.select([column]).where(
-                and_(updated_at_column < deleted_age, or_(
-                    status_column == 'finished', status_column == 'failed',
-                    status_column == 'ignored'))).order_by(status_column)
+    rows_purged = {}
+    for model in _PURGE_MODELS:
+        table = model.__table__
+        criteria = _get_purge_criteria(table, deleted_age)
+        max_table_rows = None
+        if max_rows > 0:
+            max_table_rows = max_rows - total_rows_purged
+
+        if dry_run:
+            rows = _count_purge_rows(context, table, criteria)
+            if max_table_rows is not None:
+                rows = min(rows, max_table_rows)
+            LOG.info('%(rows)d row(s) older than %(age_in_days)d day(s) '
+                     'would be purged from table %(tbl)s',
+                     {'rows': rows, 'age_in_days': age_in_days,
+                      'tbl': table})
         else:
-            query_delete = sql.select(
-                [column], deleted_at_column < deleted_age).order_by(
-                deleted_at_column)
+            LOG.info('Purging deleted rows older than %(age_in_days)d '
+                     'day(s) from table %(tbl)s',
+                     {'age_in_days': age_in_days, 'tbl': table})
+            rows = 0
+            while max_table_rows is None or rows < max_table_rows:
+                limit = batch_size
+                if max_table_rows is not None:
+                    limit = min(batch_size, max_table_rows - rows)
+
+                batch_rows = _purge_rows_batch(context, table, criteria,
+                                               limit)
+                rows += batch_rows
+                LOG.info('Deleted %(rows)d row(s) from table %(tbl)s, '
+                         '%(total)d so far',
+                         {'rows': batch_rows, 'tbl': table, 'total': rows})
+                if batch_rows < limit:
+                    break
+                if sleep_time:
+                    time.sleep(sleep_time)
+
+        rows_purged[table.name] = rows
+        total_rows_purged += rows
+        if max_rows > 0 and total_rows_purged >= max_rows:
+            break
 
-        if max_rows > 0:
-            query_delete = query_delete.limit(max_rows - total_rows_purged)
+    if dry_run:
+        LOG.info('Total rows to purge are %(rows)d',
+                 {'rows': total_rows_purged})
+    else:
+        LOG.info('Total deleted rows are %(rows)d',
+                 {'rows': total_rows_purged})
+    return rows_purged
 
-        delete_statement = DeleteFromSelect(table, query_delete, column)
 
-        result = conn.execute(delete_statement)
+@oslo_db_api.wrap_db_retry(max_retries=5, retry_on_deadlock=True)
+@main_context_manager.reader
+def notifications_get_purgeable_uuids(context, notification_uuids,
+                                      age_in_days):
+    """Filters the notification uuids whose records may be purged
 
-        rows = result.rowcount
-        LOG.info('Deleted %(rows)d row(s) from table %(tbl)s',
-                 {'rows': rows, 'tbl': table})
+    Notifications are purgeable when they don't exist anymore, or when
+    they would be purged by purge_deleted_rows.
+    """
+    deleted_age = timeutils.utcnow() - datetime.timedelta(days=age_in_days)
+    existing = set()
+    expired = set()
+    for model in (models.Notification, models.ShadowNotification):
+        table = model.__table__
+        query = sql.select([table.c.notification_uuid]).where(
+            table.c.notification_uuid.in_(notification_uuids))
+        existing.update(row[0] for row in context.session.execute(query))
+        query = query.where(_get_purge_criteria(table, deleted_age))
+        expired.update(row[0] for row in context.session.execute(query))
+
+    return [notification_uuid for notification_uuid in notification_uuids
+            if notification_uuid not in existing or
+            notification_uuid in expired]
+
+
+def _supports_skip_locked(dialect):
+    """Returns whether the database can skip the rows locked by others."""
+    if dialect.name == 'postgresql':
+        return True
+    if dialect.name == 'mysql' and dialect.server_version_info:
+        if getattr(dialect, '_is_mariadb', False):
+            return dialect.server_version_info >= (10, 6)
+        return dialect.server_version_info >= (8, 0, 1)
+    return False
 
-        total_rows_purged += rows
-        if max_rows > 0 and total_rows_purged == max_rows:
+
+@oslo_db_api.wrap_db_retry(max_retries=5, retry_on_deadlock=True)
+@main_context_manager.writer
+def _archive_notifications_batch(context, criteria, batch_size):
+    table = models.Notification.__table__
+    shadow_table = models.ShadowNotification.__table__
+    # NOTE: Every engine archives the notifications periodically, the rows
+    # of the batch are locked so that they are not copied to the shadow
+    # table by two engines. The rows locked by another engine are skipped
+    # when the database allows it, otherwise the batch waits for them to be
+    # archived and doesn't find them anymore.
+    query = sql.select([table.c.id]).where(criteria).order_by(
+        table.c.id).limit(batch_size).with_for_update(
+        skip_locked=_supports_skip_locked(context.session.bind.dialect))
+    ids = [row[0] for row in context.session.execute(query)]
+    if ids:
+        columns = [column.name for column in table.columns]
+        rows = sql.select([table.c[column] for column in columns]).where(
+            table.c.id.in_(ids))
+        context.session.execute(
+            shadow_table.insert().from_select(columns, rows))
+        context.session.execute(table.delete().where(table.c.id.in_(ids)))
+
+    return len(ids)
+
+
+def archive_notifications(context, age_in_days, max_rows=-1, batch_size=1000,
+                          sleep_time=0, dry_run=False):
+    """Moves notifications not processed anymore to shadow_notifications
+
+    The notifications which would be purged by purge_deleted_rows for the
+    given age are moved by batches of batch_size rows, each one in its own
+    transaction, waiting sleep_time seconds between two batches. With
+    dry_run, the notifications which would be archived are only counted.
+    """
+    deleted_age = timeutils.utcnow() - datetime.timedelta(days=age_in_days)
+    table = models.Notification.__table__
+    criteria = _get_purge_criteria(table, deleted_age)
+    if dry_run:
+        rows = _count_purge_rows(context, table, criteria)
+        if max_rows > 0:
+            rows = min(rows, max_rows)
+        LOG.info('%(rows)d notification(s) older than %(age_in_days)d '
+                 'day(s) would be archived',
+                 {'rows': rows, 'age_in_days': age_in_days})
+        return rows
+
+    LOG.info('Archiving notifications older than %(age_in_days)d day(s)',
+             {'age_in_days': age_in_days})
+    rows = 0
+    while True:
+        limit = batch_size
+        if max_rows > 0:
+            limit = min(batch_size, max_rows - rows)
+
+        batch_rows = _archive_notifications_batch(context, criteria, limit)
+        rows += batch_rows
+        LOG.info('Archived %(rows)d notification(s), %(total)d so far',
+                 {'rows': batch_rows, 'total': rows})
+        if batch_rows < limit or rows == max_rows:
             break
+        if sleep_time:
+            time.sleep(sleep_time)
 
-    LOG.info('Total deleted rows are %(rows)d', {'rows': total_rows_purged})
+    return rows
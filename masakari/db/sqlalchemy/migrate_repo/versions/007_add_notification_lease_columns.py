@@ -0,0 +1,33 @@
+# Copyright 2016 NTT Data.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from sqlalchemy import Column, MetaData, Table
+from sqlalchemy import DateTime, Index, String
+
+
+def upgrade(migrate_engine):
+    meta = MetaData(bind=migrate_engine)
+
+    notifications = Table('notifications', meta, autoload=True)
+
+    claimed_by = Column('claimed_by', String(255), nullable=True)
+    lease_expires_at = Column('lease_expires_at', DateTime, nullable=True)
+
+    notifications.create_column(claimed_by)
+    notifications.create_column(lease_expires_at)
+
+    Index('notifications_status_lease_expires_at_idx',
+          notifications.c.status,
+          notifications.c.lease_expires_at).create(migrate_engine)
@@ -0,0 +1,64 @@
+# Copyright 2016 NTT Data.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from oslo_serialization import jsonutils
+from sqlalchemy import bindparam, select
+from sqlalchemy import Column, MetaData, Table
+from sqlalchemy import Index, String
+
+from masakari import utils
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def _backfill_payload_hash(migrate_engine, notifications):
+    update = notifications.update().where(
+        notifications.c.id == bindparam('_id')).values(
+        payload_hash=bindparam('_payload_hash'))
+
+    last_id = 0
+    while True:
+        rows = migrate_engine.execute(
+            select([notifications.c.id, notifications.c.payload]).where(
+                notifications.c.id > last_id).order_by(
+                notifications.c.id).limit(BACKFILL_BATCH_SIZE)).fetchall()
+        if not rows:
+            break
+
+        values = [{'_id': row.id,
+                   '_payload_hash': utils.get_payload_hash(
+                       jsonutils.loads(row.payload))}
+                  for row in rows if row.payload is not None]
+        if values:
+            migrate_engine.execute(update, values)
+
+        last_id = rows[-1].id
+
+
+def upgrade(migrate_engine):
+    meta = MetaData(bind=migrate_engine)
+
+    notifications = Table('notifications', meta, autoload=True)
+
+    payload_hash = Column('payload_hash', String(64), nullable=True)
+    notifications.create_column(payload_hash)
+
+    _backfill_payload_hash(migrate_engine, notifications)
+
+    Index('notifications_duplicate_detection_idx',
+          notifications.c.source_host_uuid,
+          notifications.c.type,
+          notifications.c.payload_hash,
+          notifications.c.generated_time).create(migrate_engine)
@@ -0,0 +1,38 @@
+# Copyright 2016 NTT Data.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from sqlalchemy import Index, MetaData, Table
+
+
+def upgrade(migrate_engine):
+    meta = MetaData(bind=migrate_engine)
+
+    notifications = Table('notifications', meta, autoload=True)
+
+    # periodic tasks looking for notifications by status and age
+    Index('notifications_status_generated_time_idx',
+          notifications.c.status,
+          notifications.c.generated_time).create(migrate_engine)
+
+    # notifications of a host, optionally by type, and by age
+    Index('notifications_host_type_generated_time_idx',
+          notifications.c.source_host_uuid,
+          notifications.c.type,
+          notifications.c.generated_time).create(migrate_engine)
+
+    # default sort order of the notifications list
+    Index('notifications_created_at_id_idx',
+          notifications.c.created_at,
+          notifications.c.id).create(migrate_engine)
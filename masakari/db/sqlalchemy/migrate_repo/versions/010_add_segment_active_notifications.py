@@ -0,0 +1,45 @@
+# Copyright 2016 NTT Data.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from sqlalchemy import and_, func, select
+from sqlalchemy import Column, MetaData, Table
+from sqlalchemy import Integer
+
+ACTIVE_NOTIFICATION_STATUSES = ('new', 'running', 'error')
+
+
+def upgrade(migrate_engine):
+    meta = MetaData(bind=migrate_engine)
+
+    segments = Table('failover_segments', meta, autoload=True)
+    hosts = Table('hosts', meta, autoload=True)
+    notifications = Table('notifications', meta, autoload=True)
+
+    active_notifications = Column('active_notifications', Integer,
+                                  nullable=False, server_default='0')
+    segments.create_column(active_notifications)
+
+    # Count the notifications of the hosts of each segment which are still
+    # to be processed, as done by is_failover_segment_under_recovery before.
+    count = select([func.count(notifications.c.id)]).where(and_(
+        notifications.c.source_host_uuid == hosts.c.uuid,
+        hosts.c.failover_segment_id == segments.c.uuid,
+        hosts.c.deleted == 0,
+        notifications.c.deleted == 0,
+        notifications.c.status.in_(ACTIVE_NOTIFICATION_STATUSES))
+    ).as_scalar()
+
+    migrate_engine.execute(
+        segments.update().values(active_notifications=count))
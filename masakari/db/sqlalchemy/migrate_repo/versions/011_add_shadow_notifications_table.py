@@ -0,0 +1,40 @@
+# Copyright 2016 NTT Data.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from migrate.changeset import UniqueConstraint
+from sqlalchemy import Index, MetaData, Table
+
+
+def upgrade(migrate_engine):
+    meta = MetaData(bind=migrate_engine)
+
+    notifications = Table('notifications', meta, autoload=True)
+
+    # The archived notifications keep the columns, and the ids, of the
+    # notifications table.
+    columns = [column.copy() for column in notifications.columns]
+    shadow_notifications = Table(
+        'shadow_notifications', meta, *columns,
+        mysql_engine='InnoDB',
+        mysql_charset='utf8')
+    shadow_notifications.create()
+
+    UniqueConstraint('notification_uuid', table=shadow_notifications,
+                     name='uniq_shadow_notifications0uuid').create()
+
+    # default sort order of the notifications list
+    Index('shadow_notifications_created_at_id_idx',
+          shadow_notifications.c.created_at,
+          shadow_notifications.c.id).create(migrate_engine)
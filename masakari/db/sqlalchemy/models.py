@@ -91,6 +91,10 @@ class FailoverSegment(BASE, MasakariAPIBase, models.SoftDeleteMixin):
     recovery_method = Column(Enum('auto', 'reserved_host', 'auto_priority',
                                   'rh_priority',
                                   name='recovery_methods'), nullable=False)
+    # Number of notifications of the hosts of the segment in new, running
+    # or error status, maintained by the db api with their status changes.
+    active_notifications = Column(Integer, nullable=False, default=0,
+                                  server_default='0')
 
 
 class Host(BASE, MasakariAPIBase, models.SoftDeleteMixin):
@@ -129,6 +133,15 @@ class Notification(BASE, MasakariAPIBase, models.SoftDeleteMixin):
     __table_args__ = (
         schema.UniqueConstraint('notification_uuid',
                                 name='uniq_notification0uuid'),
+        Index('notifications_status_lease_expires_at_idx', 'status',
+              'lease_expires_at'),
+        Index('notifications_duplicate_detection_idx', 'source_host_uuid',
+              'type', 'payload_hash', 'generated_time'),
+        Index('notifications_status_generated_time_idx', 'status',
+              'generated_time'),
+        Index('notifications_host_type_generated_time_idx',
+              'source_host_uuid', 'type', 'generated_time'),
+        Index('notifications_created_at_id_idx', 'created_at', 'id'),
     )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
@@ -136,7 +149,40 @@ class Notification(BASE, MasakariAPIBase, models.SoftDeleteMixin):
     generated_time = Column(DateTime, nullable=False)
     type = Column(String(36), nullable=False)
     payload = Column(Text)
+    # sha256 of the canonical JSON of the payload, used to detect duplicates
+    payload_hash = Column(String(64), nullable=True)
     status = Column(Enum('new', 'running', 'error', 'failed',
                          'ignored', 'finished', name='notification_status'),
                     nullable=False)
     source_host_uuid = Column(String(36), nullable=False)
+    # Engine currently processing the notification and the time until which
+    # it holds it, see notification_claim in the db api.
+    claimed_by = Column(String(255), nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True)
+
+
+class ShadowNotification(BASE, MasakariAPIBase, models.SoftDeleteMixin):
+    """Represents an archived notification.
+
+    Notifications which are not going to be processed anymore are moved
+    from the notifications table by the archive_notifications db api.
+    """
+    __tablename__ = 'shadow_notifications'
+    __table_args__ = (
+        schema.UniqueConstraint('notification_uuid',
+                                name='uniq_shadow_notifications0uuid'),
+        Index('shadow_notifications_created_at_id_idx', 'created_at', 'id'),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    notification_uuid = Column(String(36), nullable=False)
+    generated_time = Column(DateTime, nullable=False)
+    type = Column(String(36), nullable=False)
+    payload = Column(Text)
+    payload_hash = Column(String(64), nullable=True)
+    status = Column(Enum('new', 'running', 'error', 'failed',
+                         'ignored', 'finished', name='notification_status'),
+                    nullable=False)
+    source_host_uuid = Column(String(36), nullable=False)
+    claimed_by = Column(String(255), nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True)
@@ -50,12 +50,40 @@ class NotificationDriver(object, metaclass=abc.ABCMeta):
                                 notification_uuid):
         pass
 
+    def stop_workflow(self, notification_uuid):
+        """Stop the recovery workflow of the notification.
+
+        The workflow being executed for the notification doesn't start any
+        other task and its execute method raises RecoveryWorkflowStopped.
+        Drivers which can't interrupt their workflows ignore it.
+        """
+        pass
+
     @abc.abstractmethod
     def get_notification_recovery_workflow_details(self, context,
                                                    recovery_method,
                                                    notification_uuid):
         pass
 
+    def get_recovery_workflow_notification_uuids(self, context,
+                                                 batch_size=1000):
+        """Return an iterable of the uuids of the notifications whose
+        recovery workflow details are stored by the driver.
+
+        Drivers which don't store any details return an empty list.
+        """
+        return []
+
+    def purge_notification_recovery_workflow_details(self, context,
+                                                     notification_uuids,
+                                                     archive=None):
+        """Destroy the recovery workflow details of the notifications.
+
+        Returns the number of notifications whose details were destroyed,
+        drivers which don't store any details destroy none.
+        """
+        return 0
+
     @abc.abstractmethod
     def upgrade_backend(self, backend):
         pass
@@ -22,9 +22,14 @@ from collections import OrderedDict
 import contextlib
 
 from oslo_log import log as logging
+from oslo_serialization import jsonutils
 from oslo_utils import excutils
+import sqlalchemy
 from taskflow import exceptions
 from taskflow.persistence import backends
+from taskflow.persistence.backends import impl_sqlalchemy
+from taskflow.persistence.backends.sqlalchemy import tables
+from taskflow.persistence import models
 
 from masakari.compute import nova
 import masakari.conf
@@ -45,19 +50,79 @@ PERSISTENCE_BACKEND = CONF.taskflow.connection
 LOG = logging.getLogger(__name__)
 
 
+def _logbook_to_primitive(book):
+    # Logbook.to_dict() doesn't include the flow and atom details, nest them
+    # so that a logbook can be archived as a single document.
+    primitive = book.to_dict(marshal_time=True)
+    primitive['flow_details'] = []
+    for flow_detail in book:
+        flow_primitive = flow_detail.to_dict()
+        flow_primitive['atom_details'] = []
+        for atom_detail in flow_detail:
+            atom_primitive = atom_detail.to_dict()
+            atom_primitive['type'] = models.atom_detail_type(atom_detail)
+            flow_primitive['atom_details'].append(atom_primitive)
+        primitive['flow_details'].append(flow_primitive)
+
+    return primitive
+
+
 class TaskFlowDriver(driver.NotificationDriver):
     def __init__(self):
         super(TaskFlowDriver, self).__init__()
+        # NOTE: The notifications whose workflows are executed, the flow
+        # engine currently running for each of them and the ones asked to
+        # stop, keyed by notification uuid.
+        self._running_workflows = set()
+        self._flow_engines = {}
+        self._stopped_workflows = set()
+
+    @contextlib.contextmanager
+    def _workflow(self, notification_uuid):
+        self._running_workflows.add(notification_uuid)
+        try:
+            yield
+        finally:
+            self._running_workflows.discard(notification_uuid)
+            self._stopped_workflows.discard(notification_uuid)
+
+    def _run_flow(self, flow_engine, notification_uuid):
+        if notification_uuid in self._stopped_workflows:
+            raise exception.RecoveryWorkflowStopped(
+                notification_uuid=notification_uuid)
+
+        self._flow_engines[notification_uuid] = flow_engine
+        try:
+            # Attaching this listener will capture all of the notifications
+            # that taskflow sends out and redirect them to a more useful
+            # log for masakari's debugging (or error reporting) usage.
+            with base.DynamicLogListener(flow_engine, logger=LOG):
+                flow_engine.run()
+        finally:
+            self._flow_engines.pop(notification_uuid, None)
+
+        # NOTE: A suspended flow engine returns as soon as its running tasks
+        # are done, without starting the next ones.
+        if notification_uuid in self._stopped_workflows:
+            raise exception.RecoveryWorkflowStopped(
+                notification_uuid=notification_uuid)
+
+    def stop_workflow(self, notification_uuid):
+        if notification_uuid not in self._running_workflows:
+            return
+
+        LOG.warning("Stopping the recovery workflow of notification %s.",
+                    notification_uuid)
+        self._stopped_workflows.add(notification_uuid)
+        flow_engine = self._flow_engines.get(notification_uuid)
+        if flow_engine is not None:
+            flow_engine.suspend()
 
     def _execute_auto_workflow(self, context, novaclient, process_what):
         flow_engine = host_failure.get_auto_flow(context, novaclient,
                                                  process_what)
 
-        # Attaching this listener will capture all of the notifications
-        # that taskflow sends out and redirect them to a more useful
-        # log for masakari's debugging (or error reporting) usage.
-        with base.DynamicLogListener(flow_engine, logger=LOG):
-            flow_engine.run()
+        self._run_flow(flow_engine, process_what['notification_uuid'])
 
     def _execute_rh_workflow(self, context, novaclient, process_what,
                              **kwargs):
@@ -65,16 +130,19 @@ class TaskFlowDriver(driver.NotificationDriver):
             msg = _('No reserved_hosts available for evacuation.')
             raise exception.ReservedHostsUnavailable(message=msg)
 
-        process_what['reserved_host_list'] = kwargs.pop('reserved_host_list')
+        # NOTE: Don't leak the reserved hosts into process_what, the auto
+        # workflow executed on failure of the reserved_host one shares it.
+        process_what = dict(process_what,
+                            reserved_host_list=kwargs.pop(
+                                'reserved_host_list'))
         flow_engine = host_failure.get_rh_flow(context, novaclient,
                                                process_what,
                                                **kwargs)
 
-        with base.DynamicLogListener(flow_engine, logger=LOG):
-            try:
-                flow_engine.run()
-            except exception.LockAlreadyAcquired as ex:
-                raise exception.HostRecoveryFailureException(ex.message)
+        try:
+            self._run_flow(flow_engine, process_what['notification_uuid'])
+        except exception.LockAlreadyAcquired as ex:
+            raise exception.HostRecoveryFailureException(ex.message)
 
     def _execute_auto_priority_workflow(self, context, novaclient,
                                         process_what, **kwargs):
@@ -82,7 +150,8 @@ class TaskFlowDriver(driver.NotificationDriver):
             self._execute_auto_workflow(context, novaclient, process_what)
         except Exception as ex:
             with excutils.save_and_reraise_exception(reraise=False) as ctxt:
-                if isinstance(ex, exception.SkipHostRecoveryException):
+                if isinstance(ex, (exception.SkipHostRecoveryException,
+                                   exception.RecoveryWorkflowStopped)):
                     ctxt.reraise = True
                     return
 
@@ -109,7 +178,8 @@ class TaskFlowDriver(driver.NotificationDriver):
                                       **kwargs)
         except Exception as ex:
             with excutils.save_and_reraise_exception(reraise=False) as ctxt:
-                if isinstance(ex, exception.SkipHostRecoveryException):
+                if isinstance(ex, (exception.SkipHostRecoveryException,
+                                   exception.RecoveryWorkflowStopped)):
                     ctxt.reraise = True
                     return
 
@@ -127,6 +197,24 @@ class TaskFlowDriver(driver.NotificationDriver):
                 })
                 self._execute_auto_workflow(context, novaclient, process_what)
 
+    def _execute_host_failure_workflow(self, context, novaclient,
+                                       recovery_method, process_what,
+                                       **kwargs):
+        if recovery_method == fields.FailoverSegmentRecoveryMethod.AUTO:
+            self._execute_auto_workflow(context, novaclient, process_what)
+        elif recovery_method == (
+                fields.FailoverSegmentRecoveryMethod.RESERVED_HOST):
+            self._execute_rh_workflow(context, novaclient, process_what,
+                                      **kwargs)
+        elif recovery_method == (
+                fields.FailoverSegmentRecoveryMethod.AUTO_PRIORITY):
+            self._execute_auto_priority_workflow(
+                context, novaclient,
+                process_what, **kwargs)
+        else:
+            self._execute_rh_priority_workflow(context, novaclient,
+                                               process_what, **kwargs)
+
     def execute_host_failure(self, context, host_name, recovery_method,
                              notification_uuid, **kwargs):
         novaclient = nova.API()
@@ -137,25 +225,16 @@ class TaskFlowDriver(driver.NotificationDriver):
         }
 
         try:
-            if recovery_method == fields.FailoverSegmentRecoveryMethod.AUTO:
-                self._execute_auto_workflow(context, novaclient, process_what)
-            elif recovery_method == (
-                    fields.FailoverSegmentRecoveryMethod.RESERVED_HOST):
-                self._execute_rh_workflow(context, novaclient, process_what,
-                                          **kwargs)
-            elif recovery_method == (
-                    fields.FailoverSegmentRecoveryMethod.AUTO_PRIORITY):
-                self._execute_auto_priority_workflow(
-                    context, novaclient,
-                    process_what, **kwargs)
-            else:
-                self._execute_rh_priority_workflow(context, novaclient,
-                                                   process_what, **kwargs)
+            with self._workflow(notification_uuid):
+                self._execute_host_failure_workflow(
+                    context, novaclient, recovery_method, process_what,
+                    **kwargs)
         except Exception as exc:
             with excutils.save_and_reraise_exception(reraise=False) as ctxt:
                 if isinstance(exc, (exception.SkipHostRecoveryException,
                                     exception.HostRecoveryFailureException,
-                                    exception.ReservedHostsUnavailable)):
+                                    exception.ReservedHostsUnavailable,
+                                    exception.RecoveryWorkflowStopped)):
                     ctxt.reraise = True
                     return
                 msg = _("Failed to execute host failure flow for "
@@ -180,11 +259,8 @@ class TaskFlowDriver(driver.NotificationDriver):
             LOG.exception(msg)
             raise exception.MasakariException(msg)
 
-        # Attaching this listener will capture all of the notifications that
-        # taskflow sends out and redirect them to a more useful log for
-        # masakari's debugging (or error reporting) usage.
-        with base.DynamicLogListener(flow_engine, logger=LOG):
-            flow_engine.run()
+        with self._workflow(notification_uuid):
+            self._run_flow(flow_engine, notification_uuid)
 
     def execute_process_failure(self, context, process_name, host_name,
                                 notification_uuid):
@@ -214,11 +290,8 @@ class TaskFlowDriver(driver.NotificationDriver):
             LOG.exception(msg)
             raise exception.MasakariException(msg)
 
-        # Attaching this listener will capture all of the notifications that
-        # taskflow sends out and redirect them to a more useful log for
-        # masakari's debugging (or error reporting) usage.
-        with base.DynamicLogListener(flow_engine, logger=LOG):
-            flow_engine.run()
+        with self._workflow(notification_uuid):
+            self._run_flow(flow_engine, notification_uuid)
 
     @contextlib.contextmanager
     def upgrade_backend(self, persistence_backend):
@@ -332,3 +405,69 @@ class TaskFlowDriver(driver.NotificationDriver):
                         progress_details.append(progress_details_obj)
 
         return progress_details
+
+    def get_recovery_workflow_notification_uuids(self, context,
+                                                 batch_size=1000):
+        """Retrieve uuids of notifications having recovery workflow details
+
+        The logbook of a recovery workflow is saved under the uuid of the
+        notification it processes. With the SQLAlchemy persistence backend
+        the logbooks table is read by pages of batch_size uuids, the
+        connections of the other backends read all the logbooks at once.
+        """
+        backend = backends.fetch(PERSISTENCE_BACKEND)
+        if not isinstance(backend, impl_sqlalchemy.SQLAlchemyBackend):
+            with contextlib.closing(backend.get_connection()) as conn:
+                for book in conn.get_logbooks(lazy=True):
+                    yield book.uuid
+            return
+
+        # NOTE: get_logbooks of the SQLAlchemy backend reads all the rows of
+        # the logbooks table before returning the first logbook.
+        logbooks = tables.fetch(sqlalchemy.MetaData()).logbooks
+        marker = None
+        while True:
+            query = sqlalchemy.select([logbooks.c.uuid]).order_by(
+                logbooks.c.uuid).limit(batch_size)
+            if marker is not None:
+                query = query.where(logbooks.c.uuid > marker)
+            with backend.engine.connect() as conn:
+                notification_uuids = [row[0] for row in conn.execute(query)]
+
+            for notification_uuid in notification_uuids:
+                yield notification_uuid
+            if len(notification_uuids) < batch_size:
+                return
+            marker = notification_uuids[-1]
+
+    def purge_notification_recovery_workflow_details(self, context,
+                                                     notification_uuids,
+                                                     archive=None):
+        """Destroy the recovery workflow details of notifications
+
+        If archive is given, each logbook is written to this file object
+        with its flow and atom details, as one JSON document per line,
+        before being destroyed.
+
+        :returns: the number of logbooks destroyed
+        """
+        backend = backends.fetch(PERSISTENCE_BACKEND)
+        purged = 0
+        with contextlib.closing(backend.get_connection()) as conn:
+            for notification_uuid in notification_uuids:
+                try:
+                    if archive is not None:
+                        book = conn.get_logbook(notification_uuid)
+                        archive.write(jsonutils.dumps(
+                            _logbook_to_primitive(book)) + '\n')
+                    conn.destroy_logbook(notification_uuid)
+                except exceptions.NotFound:
+                    # NOTE: The logbook has been destroyed meanwhile, e.g.
+                    # by another purge.
+                    LOG.debug("No recovery workflow details found for "
+                              "notification %s.", notification_uuid)
+                    continue
+
+                purged += 1
+
+        return purged
@@ -19,14 +19,16 @@ from eventlet import timeout as etimeout
 
 from oslo_config import cfg
 from oslo_log import log as logging
-from oslo_service import loopingcall
+from oslo_utils import encodeutils
 from oslo_utils import excutils
 from oslo_utils import strutils
+from oslo_utils import timeutils
 from taskflow.patterns import linear_flow
 from taskflow import retry
 
 import masakari.conf
 from masakari.engine.drivers.taskflow import base
+from masakari.engine import instance_watcher
 from masakari import exception
 from masakari import utils
 
@@ -36,31 +38,132 @@ LOG = logging.getLogger(__name__)
 ACTION = 'instance:evacuate'
 # Instance power_state
 SHUTDOWN = 4
+# Maximum number of seconds between two checks of the compute service state
+SERVICE_DOWN_POLL_MAX_INTERVAL = 10
 TASKFLOW_CONF = cfg.CONF.taskflow_driver_recovery_flows
 
 
+def _get_instance_snapshot(instance):
+    """Returns the state of a server needed by the recovery tasks.
+
+    The snapshot only holds primitive types so that it can be stored in the
+    flow store and persisted by the taskflow backend.
+    """
+    return {
+        'id': instance.id,
+        'vm_state': getattr(instance, "OS-EXT-STS:vm_state"),
+        'task_state': getattr(instance, "OS-EXT-STS:task_state"),
+        'power_state': getattr(instance, "OS-EXT-STS:power_state"),
+        'locked': instance.locked,
+        'host': getattr(instance, "OS-EXT-SRV-ATTR:hypervisor_hostname"),
+        'flavor': getattr(instance, "flavor", None),
+    }
+
+
+def _get_instance_ram(instance):
+    # Flavor details are only embedded in servers since nova API
+    # microversion 2.47.
+    flavor = instance.get('flavor') or {}
+    return flavor.get('ram', 0)
+
+
+def _place_on_reserved_hosts(instances, reserved_host_list, hypervisors):
+    """Spreads instances across reserved hosts according to free memory.
+
+    Instances are placed from the largest to the smallest one, each of them
+    on the reserved host having the most free memory left. Returns the
+    instances placed on every reserved host, and the instances which don't
+    fit on any of them.
+    """
+    free_ram = {}
+    for hypervisor in hypervisors:
+        service_host = (getattr(hypervisor, 'service', None) or {}).get(
+            'host')
+        for name in (service_host, hypervisor.hypervisor_hostname):
+            if name in reserved_host_list and name not in free_ram:
+                free_ram[name] = hypervisor.free_ram_mb
+                break
+
+    placement = {}
+    unplaced_instances = []
+    for instance in sorted(instances, key=_get_instance_ram, reverse=True):
+        ram = _get_instance_ram(instance)
+        candidates = [reserved_host for reserved_host in reserved_host_list
+                      if free_ram.get(reserved_host, -1) >= ram]
+        if not candidates:
+            unplaced_instances.append(instance)
+            continue
+
+        reserved_host = max(candidates, key=lambda host: free_ram[host])
+        free_ram[reserved_host] -= ram
+        placement.setdefault(reserved_host, []).append(instance)
+
+    return placement, unplaced_instances
+
+
 class DisableComputeServiceTask(base.MasakariTask):
     def __init__(self, context, novaclient, **kwargs):
         kwargs['requires'] = ["host_name"]
         super(DisableComputeServiceTask, self).__init__(context, novaclient,
                                                         **kwargs)
 
+    def _wait_for_service_down(self, host_name):
+        """Poll nova until it reports the compute service down.
+
+        Returns False if nova doesn't report the service down within
+        ``wait_period_after_service_update`` seconds.
+        """
+        interval = CONF.verify_interval or 1
+        with timeutils.StopWatch(
+                duration=CONF.wait_period_after_service_update) as watch:
+            while True:
+                try:
+                    if self.novaclient.is_compute_service_reported_down(
+                            self.context, host_name):
+                        return True
+                except exception.MasakariException as e:
+                    LOG.warning("Failed to get the state of compute service "
+                                "on host '%(host)s': %(error)s",
+                                {'host': host_name, 'error': e.message})
+
+                if watch.expired():
+                    return False
+
+                eventlet.sleep(min(interval, watch.leftover()))
+                interval = min(interval * 2,
+                               SERVICE_DOWN_POLL_MAX_INTERVAL)
+
     def execute(self, host_name):
         msg = "Disabling compute service on host: '%s'" % host_name
         self.update_details(msg)
         self.novaclient.enable_disable_service(self.context, host_name)
-        # Sleep until nova-compute service is marked as disabled.
-        log_msg = ("Sleeping %(wait)s sec before starting recovery "
-               "thread until nova recognizes the node down.")
-        LOG.info(log_msg, {'wait': CONF.wait_period_after_service_update})
-        eventlet.sleep(CONF.wait_period_after_service_update)
+        if CONF.host_failure.wait_for_compute_service_down:
+            log_msg = ("Waiting at most %(wait)s sec before starting "
+                       "recovery thread until nova recognizes the node down.")
+            LOG.info(log_msg, {'wait': CONF.wait_period_after_service_update})
+            if self._wait_for_service_down(host_name):
+                msg = ("Compute service on host '%s' is reported down by "
+                       "nova") % host_name
+            else:
+                msg = ("Compute service on host '%(host)s' is not reported "
+                       "down by nova after %(wait)s sec") % {
+                    'host': host_name,
+                    'wait': CONF.wait_period_after_service_update}
+            LOG.info(msg)
+            self.update_details(msg, 0.8)
+        else:
+            # Sleep until nova-compute service is marked as disabled.
+            log_msg = ("Sleeping %(wait)s sec before starting recovery "
+                   "thread until nova recognizes the node down.")
+            LOG.info(log_msg, {'wait': CONF.wait_period_after_service_update})
+            eventlet.sleep(CONF.wait_period_after_service_update)
         msg = "Disabled compute service on host: '%s'" % host_name
         self.update_details(msg, 1.0)
 
 
 class PrepareHAEnabledInstancesTask(base.MasakariTask):
     """Get all HA_Enabled instances."""
-    default_provides = set(["instance_list"])
+    default_provides = set(["instance_list", "instance_snapshots"])
 
     def __init__(self, context, novaclient, **kwargs):
         kwargs['requires'] = ["host_name"]
@@ -130,6 +233,12 @@ class PrepareHAEnabledInstancesTask(base.MasakariTask):
             LOG.info(msg)
             raise exception.SkipHostRecoveryException(message=msg)
 
+        # Keep the state of the instances fetched above so that the
+        # following tasks don't have to get them from nova again.
+        instance_snapshots = {
+            instance.id: _get_instance_snapshot(instance)
+            for instance in instance_list}
+
         # List of instance UUID
         instance_list = [instance.id for instance in instance_list]
 
@@ -138,6 +247,7 @@ class PrepareHAEnabledInstancesTask(base.MasakariTask):
 
         return {
             "instance_list": instance_list,
+            "instance_snapshots": instance_snapshots,
         }
 
 
@@ -149,95 +259,89 @@ class EvacuateInstancesTask(base.MasakariTask):
         super(EvacuateInstancesTask, self).__init__(context, novaclient,
                                                     **kwargs)
 
-    def _get_state_and_host_of_instance(self, context, instance):
-        new_instance = self.novaclient.get_server(context, instance.id)
+    def _get_state_and_host_of_instance(self, instance, new_instance):
         instance_host = getattr(new_instance,
                                 "OS-EXT-SRV-ATTR:hypervisor_hostname")
-        old_vm_state = getattr(instance, "OS-EXT-STS:vm_state")
+        old_vm_state = instance['vm_state']
         new_vm_state = getattr(new_instance, "OS-EXT-STS:vm_state")
 
         return (old_vm_state, new_vm_state, instance_host)
 
+    def _reset_instance_snapshot(self, instance):
+        # Resetting the state of an instance sets its vm_state to 'error'
+        # and clears its task_state, reflect that in the snapshot instead of
+        # getting the instance from nova again.
+        instance = dict(instance)
+        instance.update(vm_state='error', task_state=None)
+        return instance
+
     def _stop_after_evacuation(self, context, instance):
-        def _wait_for_stop_confirmation():
-            old_vm_state, new_vm_state, instance_host = (
-                self._get_state_and_host_of_instance(context, instance))
+        instance_id = instance['id']
 
-            if new_vm_state == 'stopped':
-                raise loopingcall.LoopingCallDone()
+        def _stop_confirmed(new_instance):
+            old_vm_state, new_vm_state, instance_host = (
+                self._get_state_and_host_of_instance(instance, new_instance))
 
-        periodic_call_stopped = loopingcall.FixedIntervalLoopingCall(
-            _wait_for_stop_confirmation)
+            return new_vm_state == 'stopped'
 
         try:
-            self.novaclient.stop_server(context, instance.id)
-            # confirm instance is stopped after recovery
-            periodic_call_stopped.start(interval=CONF.verify_interval)
-            etimeout.with_timeout(
-                CONF.wait_period_after_power_off,
-                periodic_call_stopped.wait)
+            with instance_watcher.get_instance_watcher().register(
+                    instance_id) as waiter:
+                self.novaclient.stop_server(context, instance_id)
+                # confirm instance is stopped after recovery
+                waiter.wait(_stop_confirmed,
+                            CONF.wait_period_after_power_off)
         except etimeout.Timeout:
             with excutils.save_and_reraise_exception():
-                periodic_call_stopped.stop()
                 msg = ("Instance '%(uuid)s' is successfully evacuated but "
-                       "failed to stop.") % {'uuid': instance.id}
+                       "failed to stop.") % {'uuid': instance_id}
                 LOG.warning(msg)
-        else:
-            periodic_call_stopped.stop()
 
     def _evacuate_and_confirm(self, context, instance, host_name,
                               failed_evacuation_instances,
                               reserved_host=None):
+        instance_id = instance['id']
         # Before locking the instance check whether it is already locked
         # by user, if yes don't lock the instance
-        instance_already_locked = self.novaclient.get_server(
-            context, instance.id).locked
+        instance_already_locked = instance['locked']
 
         if not instance_already_locked:
             # lock the instance so that until evacuation and confirmation
             # is not complete, user won't be able to perform any actions
             # on the instance.
-            self.novaclient.lock_server(context, instance.id)
+            self.novaclient.lock_server(context, instance_id)
 
-        def _wait_for_evacuation_confirmation():
+        def _evacuation_confirmed(new_instance):
             old_vm_state, new_vm_state, instance_host = (
-                self._get_state_and_host_of_instance(context, instance))
+                self._get_state_and_host_of_instance(instance, new_instance))
 
             if (new_vm_state == 'error' and
                     new_vm_state != old_vm_state):
                 raise exception.InstanceEvacuateFailed(
-                    instance_uuid=instance.id)
+                    instance_uuid=instance_id)
 
             if instance_host != host_name:
                 if ((old_vm_state == 'error' and
                     new_vm_state == 'active') or
                         old_vm_state == new_vm_state):
-                    raise loopingcall.LoopingCallDone()
+                    return True
 
-        def _wait_for_evacuation():
-            periodic_call = loopingcall.FixedIntervalLoopingCall(
-                _wait_for_evacuation_confirmation)
+            return False
 
+        def _wait_for_evacuation(waiter):
             try:
-                # add a timeout to the periodic call.
-                periodic_call.start(interval=CONF.verify_interval)
-                etimeout.with_timeout(
-                    CONF.wait_period_after_evacuation,
-                    periodic_call.wait)
+                waiter.wait(_evacuation_confirmed,
+                            CONF.wait_period_after_evacuation)
             except exception.InstanceEvacuateFailed as e:
                 LOG.warning(str(e))
-                failed_evacuation_instances.append(instance.id)
+                failed_evacuation_instances.append(instance_id)
             except etimeout.Timeout:
                 # Instance is not evacuated in the expected time_limit.
-                failed_evacuation_instances.append(instance.id)
-            else:
-                # stop the periodic call, in case of exceptions or
-                # Timeout.
-                periodic_call.stop()
+                failed_evacuation_instances.append(instance_id)
 
         try:
-            vm_state = getattr(instance, "OS-EXT-STS:vm_state")
-            task_state = getattr(instance, "OS-EXT-STS:task_state")
+            vm_state = instance['vm_state']
+            task_state = instance['task_state']
 
             # Nova evacuates an instance only when vm_state is in active,
             # stopped or error state. If an instance is in other than active,
@@ -245,9 +349,9 @@ class EvacuateInstancesTask(base.MasakariTask):
             # to *error* so that the instance can be evacuated.
             stop_instance = True
             if vm_state not in ['active', 'error', 'stopped']:
-                self.novaclient.reset_instance_state(context, instance.id)
-                instance = self.novaclient.get_server(context, instance.id)
-                power_state = getattr(instance, "OS-EXT-STS:power_state")
+                self.novaclient.reset_instance_state(context, instance_id)
+                instance = self._reset_instance_snapshot(instance)
+                power_state = instance['power_state']
                 if vm_state == 'resized' and power_state != SHUTDOWN:
                     stop_instance = False
 
@@ -255,16 +359,20 @@ class EvacuateInstancesTask(base.MasakariTask):
                 # Nova fails evacuation when the instance's task_state is not
                 # none. In this case, masakari resets the instance's vm_state
                 # to 'error' and task_state to none.
-                self.novaclient.reset_instance_state(context, instance.id)
-                instance = self.novaclient.get_server(context, instance.id)
+                self.novaclient.reset_instance_state(context, instance_id)
+                instance = self._reset_instance_snapshot(instance)
                 if vm_state == 'active':
                     stop_instance = False
 
-            # evacuate the instance
-            self.novaclient.evacuate_instance(context, instance.id,
-                                              target=reserved_host)
+            # Start watching the instance before requesting the evacuation
+            # so that the state changes made by nova are not missed.
+            with instance_watcher.get_instance_watcher().register(
+                    instance_id) as waiter:
+                # evacuate the instance
+                self.novaclient.evacuate_instance(context, instance_id,
+                                                  target=reserved_host)
 
-            _wait_for_evacuation()
+                _wait_for_evacuation(waiter)
 
             if vm_state != 'active':
                 if stop_instance:
@@ -273,82 +381,92 @@ class EvacuateInstancesTask(base.MasakariTask):
                     # it should be set to 'error' after recovery.
                     if vm_state == 'error':
                         self.novaclient.reset_instance_state(
-                            context, instance.id)
+                            context, instance_id)
         except etimeout.Timeout:
             # Instance is not stop in the expected time_limit.
-            failed_evacuation_instances.append(instance.id)
+            failed_evacuation_instances.append(instance_id)
         except Exception:
             # Exception is raised while resetting instance state or
             # evacuating the instance itself.
-            failed_evacuation_instances.append(instance.id)
+            failed_evacuation_instances.append(instance_id)
         finally:
             if not instance_already_locked:
                 # Unlock the server after evacuation and confirmation
-                self.novaclient.unlock_server(context, instance.id)
+                self.novaclient.unlock_server(context, instance_id)
 
-    def execute(self, host_name, instance_list, reserved_host=None):
+    def execute(self, host_name, instance_list, reserved_host=None,
+                instance_snapshots=None, reserved_host_list=None):
         msg = ("Start evacuation of instances from failed host '%(host_name)s'"
                ", instance uuids are: '%(instance_list)s'") % {
             'host_name': host_name, 'instance_list': ','.join(instance_list)}
         self.update_details(msg)
 
-        def _do_evacuate(context, host_name, instance_list,
-                         reserved_host=None):
-            failed_evacuation_instances = []
-
-            if reserved_host:
-                msg = "Enabling reserved host: '%s'" % reserved_host
-                self.update_details(msg, 0.1)
-                if CONF.host_failure.add_reserved_host_to_aggregate:
-                    # Assign reserved_host to an aggregate to which the failed
-                    # compute host belongs to.
-                    aggregates = self.novaclient.get_aggregate_list(context)
-                    for aggregate in aggregates:
-                        if host_name in aggregate.hosts:
-                            try:
-                                msg = ("Add host %(reserved_host)s to "
-                                       "aggregate %(aggregate)s") % {
-                                    'reserved_host': reserved_host,
-                                    'aggregate': aggregate.name}
-                                self.update_details(msg, 0.2)
-
-                                self.novaclient.add_host_to_aggregate(
-                                    context, reserved_host, aggregate)
-                                msg = ("Added host %(reserved_host)s to "
-                                       "aggregate %(aggregate)s") % {
-                                    'reserved_host': reserved_host,
-                                    'aggregate': aggregate.name}
-                                self.update_details(msg, 0.3)
-                            except exception.Conflict:
-                                msg = ("Host '%(reserved_host)s' already has "
-                                       "been added to aggregate "
-                                       "'%(aggregate)s'.") % {
-                                    'reserved_host': reserved_host,
-                                    'aggregate': aggregate.name}
-                                self.update_details(msg, 1.0)
-                                LOG.info(msg)
-
-                            # A failed compute host can be associated with
-                            # multiple aggregates but operators will not
-                            # associate it with multiple aggregates in real
-                            # deployment so adding reserved_host to the very
-                            # first aggregate from the list.
-                            break
-
-                self.novaclient.enable_disable_service(
-                    context, reserved_host, enable=True)
-
-                # Set reserved property of reserved_host to False
-                self.update_host_method(self.context, reserved_host)
+        instance_snapshots = instance_snapshots or {}
 
+        def _get_instances(instance_list):
+            instances = []
+            for instance_id in instance_list:
+                instance = instance_snapshots.get(instance_id)
+                if instance is None:
+                    instance = _get_instance_snapshot(
+                        self.novaclient.get_server(self.context, instance_id))
+                instances.append(instance)
+            return instances
+
+        def _enable_reserved_host(context, host_name, reserved_host):
+            msg = "Enabling reserved host: '%s'" % reserved_host
+            self.update_details(msg, 0.1)
+            if CONF.host_failure.add_reserved_host_to_aggregate:
+                # Assign reserved_host to an aggregate to which the failed
+                # compute host belongs to.
+                aggregates = self.novaclient.get_aggregate_list(context)
+                for aggregate in aggregates:
+                    if host_name in aggregate.hosts:
+                        try:
+                            msg = ("Add host %(reserved_host)s to "
+                                   "aggregate %(aggregate)s") % {
+                                'reserved_host': reserved_host,
+                                'aggregate': aggregate.name}
+                            self.update_details(msg, 0.2)
+
+                            self.novaclient.add_host_to_aggregate(
+                                context, reserved_host, aggregate)
+                            msg = ("Added host %(reserved_host)s to "
+                                   "aggregate %(aggregate)s") % {
+                                'reserved_host': reserved_host,
+                                'aggregate': aggregate.name}
+                            self.update_details(msg, 0.3)
+                        except exception.Conflict:
+                            msg = ("Host '%(reserved_host)s' already has "
+                                   "been added to aggregate "
+                                   "'%(aggregate)s'.") % {
+                                'reserved_host': reserved_host,
+                                'aggregate': aggregate.name}
+                            self.update_details(msg, 1.0)
+                            LOG.info(msg)
+
+                        # A failed compute host can be associated with
+                        # multiple aggregates but operators will not
+                        # associate it with multiple aggregates in real
+                        # deployment so adding reserved_host to the very
+                        # first aggregate from the list.
+                        break
+
+            self.novaclient.enable_disable_service(
+                context, reserved_host, enable=True)
+
+            # Set reserved property of reserved_host to False
+            self.update_host_method(self.context, reserved_host)
+
+        def _evacuate_instances(context, host_name, instances,
+                                failed_evacuation_instances,
+                                reserved_host=None):
             thread_pool = greenpool.GreenPool(
                 CONF.host_failure_recovery_threads)
 
-            for instance_id in instance_list:
-                msg = "Evacuation of instance started: '%s'" % instance_id
+            for instance in instances:
+                msg = "Evacuation of instance started: '%s'" % instance['id']
                 self.update_details(msg, 0.5)
-                instance = self.novaclient.get_server(self.context,
-                                                      instance_id)
                 thread_pool.spawn_n(self._evacuate_and_confirm, context,
                                     instance, host_name,
                                     failed_evacuation_instances,
@@ -356,6 +474,8 @@ class EvacuateInstancesTask(base.MasakariTask):
 
             thread_pool.waitall()
 
+        def _report_evacuation(host_name, instance_list,
+                               failed_evacuation_instances):
             evacuated_instances = list(set(instance_list).difference(set(
                 failed_evacuation_instances)))
 
@@ -381,6 +501,79 @@ class EvacuateInstancesTask(base.MasakariTask):
             msg = "Evacuation process completed!"
             self.update_details(msg, 1.0)
 
+        def _do_evacuate(context, host_name, instance_list,
+                         reserved_host=None):
+            failed_evacuation_instances = []
+
+            if reserved_host:
+                _enable_reserved_host(context, host_name, reserved_host)
+
+            _evacuate_instances(context, host_name,
+                                _get_instances(instance_list),
+                                failed_evacuation_instances, reserved_host)
+
+            _report_evacuation(host_name, instance_list,
+                               failed_evacuation_instances)
+
+        def _do_evacuate_to_reserved_hosts(context, host_name, instance_list,
+                                           reserved_host_list):
+            failed_evacuation_instances = []
+
+            hypervisors = self.novaclient.get_hypervisor_list(context)
+            placement, unplaced_instances = _place_on_reserved_hosts(
+                _get_instances(instance_list), reserved_host_list,
+                hypervisors)
+
+            if unplaced_instances:
+                unplaced_instances = [instance['id'] for instance in
+                                      unplaced_instances]
+                msg = ("No reserved host has enough free memory for "
+                       "instances '%s'") % ','.join(unplaced_instances)
+                self.update_details(msg, 0.1)
+                LOG.warning(msg)
+                failed_evacuation_instances.extend(unplaced_instances)
+
+            def _evacuate_to_reserved_host(reserved_host, instances):
+                msg = ("Instances '%(instance_list)s' will be evacuated to "
+                       "reserved host '%(reserved_host)s'") % {
+                    'instance_list': ','.join(
+                        instance['id'] for instance in instances),
+                    'reserved_host': reserved_host}
+                self.update_details(msg, 0.1)
+
+                @utils.synchronized(reserved_host)
+                def do_evacuate_with_reserved_host():
+                    _enable_reserved_host(context, host_name, reserved_host)
+                    _evacuate_instances(context, host_name, instances,
+                                        failed_evacuation_instances,
+                                        reserved_host)
+
+                try:
+                    do_evacuate_with_reserved_host()
+                except Exception as e:
+                    # Nothing has been evacuated to this reserved host yet as
+                    # failures of the evacuation itself are handled per
+                    # instance.
+                    msg = ("Failed to use reserved host '%(reserved_host)s' "
+                           "for evacuation: %(error)s") % {
+                        'reserved_host': reserved_host,
+                        'error': encodeutils.exception_to_unicode(e)}
+                    self.update_details(msg, 0.5)
+                    LOG.warning(msg)
+                    failed_evacuation_instances.extend(
+                        instance['id'] for instance in instances)
+
+            # Evacuations to the different reserved hosts run concurrently,
+            # each of them using its own pool of threads.
+            reserved_hosts_pool = greenpool.GreenPool(max(len(placement), 1))
+            for reserved_host, instances in placement.items():
+                reserved_hosts_pool.spawn_n(_evacuate_to_reserved_host,
+                                            reserved_host, instances)
+            reserved_hosts_pool.waitall()
+
+            _report_evacuation(host_name, instance_list,
+                               failed_evacuation_instances)
+
         lock_name = reserved_host if reserved_host else None
 
         @utils.synchronized(lock_name)
@@ -392,6 +585,13 @@ class EvacuateInstancesTask(base.MasakariTask):
         if lock_name:
             do_evacuate_with_reserved_host(self.context, host_name,
                                            instance_list, reserved_host)
+        elif reserved_host_list:
+            # The reserved host recovery flow only provides the whole list of
+            # reserved hosts, without retrying with each reserved host in
+            # turn, when instances are spread across reserved hosts. Every
+            # reserved host used is locked separately.
+            _do_evacuate_to_reserved_hosts(self.context, host_name,
+                                           instance_list, reserved_host_list)
         else:
             # No need to acquire lock on reserved_host when recovery_method is
             # 'auto' as the selection of compute host will be decided by nova.
@@ -447,7 +647,9 @@ def get_rh_flow(context, novaclient, process_what, **kwargs):
 
     1. Disable compute service on source host
     2. Get all HA_Enabled instances.
-    3. Evacuate all the HA_Enabled instances using reserved_host.
+    3. Evacuate all the HA_Enabled instances using reserved_host, or spread
+       them across the reserved hosts if
+       ``[host_failure]spread_across_reserved_hosts`` is set.
     4. Confirm evacuation of instances.
     """
     flow_name = ACTION.replace(":", "_") + "_engine"
@@ -461,9 +663,14 @@ def get_rh_flow(context, novaclient, process_what, **kwargs):
             context=context, novaclient=novaclient, **kwargs):
         rh_evacuate_flow_pre.add(plugin)
 
-    rh_evacuate_flow_main = linear_flow.Flow(
-        "retry_%s" % flow_name, retry=retry.ParameterizedForEach(
-            rebind=['reserved_host_list'], provides='reserved_host'))
+    if CONF.host_failure.spread_across_reserved_hosts:
+        # Instances are spread across all the reserved hosts at once, there
+        # is no reserved host to retry the evacuation with.
+        rh_evacuate_flow_main = linear_flow.Flow("spread_%s" % flow_name)
+    else:
+        rh_evacuate_flow_main = linear_flow.Flow(
+            "retry_%s" % flow_name, retry=retry.ParameterizedForEach(
+                rebind=['reserved_host_list'], provides='reserved_host'))
 
     for plugin in base.get_recovery_flow(
             task_dict['main'],
@@ -0,0 +1,149 @@
+# Copyright 2016 NTT DATA
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Shared instance state watcher
+
+Recovery workflows have to wait for nova to report that an instance has
+reached an expected state (evacuated, stopped, ...). Instead of every
+recovery thread polling nova for its own instance, the threads register
+the instance they wait for with a single watcher per engine. The watcher
+periodically lists the servers changed since its previous poll and hands
+each updated server over to the threads waiting for it.
+"""
+
+import datetime
+
+import eventlet
+from eventlet import queue
+from eventlet import timeout as etimeout
+from oslo_log import log as logging
+from oslo_utils import timeutils
+
+from masakari.compute import nova
+import masakari.conf
+from masakari import context as masakari_context
+
+CONF = masakari.conf.CONF
+LOG = logging.getLogger(__name__)
+
+# Number of seconds the 'changes-since' filter is moved back in time so
+# that updates made close to a poll, or recorded by nova with a slightly
+# different clock, are not missed.
+CHANGES_SINCE_OVERLAP = 5
+
+_WATCHER = None
+
+
+class InstanceWaiter(object):
+    """Receives the state updates of a single instance from the watcher."""
+
+    def __init__(self, watcher, instance_id):
+        self.watcher = watcher
+        self.instance_id = instance_id
+        self._updates = queue.LightQueue()
+
+    def notify(self, server):
+        self._updates.put(server)
+
+    def wait(self, condition, timeout):
+        """Wait until nova reports a state of the instance matching condition.
+
+        :param condition: callable accepting the updated server and returning
+            True once the expected state is reached. Exceptions raised by the
+            condition are propagated to the caller.
+        :param timeout: maximum number of seconds to wait.
+        :raises: eventlet.timeout.Timeout if the condition is not met within
+            the given timeout.
+        """
+        with etimeout.Timeout(timeout):
+            while True:
+                server = self._updates.get()
+                if condition(server):
+                    return server
+
+    def close(self):
+        self.watcher.unregister(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class InstanceStateWatcher(object):
+    """Polls nova in batches on behalf of all registered waiters."""
+
+    def __init__(self, novaclient=None):
+        self.novaclient = novaclient or nova.API()
+        self._waiters = {}
+        self._poller = None
+
+    def register(self, instance_id):
+        """Start watching the instance.
+
+        The waiter must be registered before the action whose outcome it
+        waits for is requested from nova, so that no state change is missed.
+        """
+        waiter = InstanceWaiter(self, instance_id)
+        self._waiters.setdefault(instance_id, []).append(waiter)
+
+        if self._poller is None:
+            self._poller = eventlet.spawn(self._poll)
+
+        return waiter
+
+    def unregister(self, waiter):
+        waiters = self._waiters.get(waiter.instance_id, [])
+        if waiter in waiters:
+            waiters.remove(waiter)
+        if not waiters:
+            self._waiters.pop(waiter.instance_id, None)
+
+    def _changes_since(self, poll_time):
+        return poll_time - datetime.timedelta(seconds=CHANGES_SINCE_OVERLAP)
+
+    def _poll(self):
+        context = masakari_context.get_admin_context()
+        changes_since = self._changes_since(timeutils.utcnow())
+
+        try:
+            while self._waiters:
+                poll_time = timeutils.utcnow()
+                try:
+                    servers = self.novaclient.get_servers_changed_since(
+                        context, changes_since.isoformat())
+                except Exception:
+                    # Waiters have their own timeouts, keep polling so that
+                    # a transient failure doesn't fail all of them.
+                    LOG.exception("Failed to fetch the state of instances "
+                                  "%s.", ','.join(self._waiters))
+                else:
+                    changes_since = self._changes_since(poll_time)
+                    for server in servers:
+                        for waiter in list(self._waiters.get(server.id, [])):
+                            waiter.notify(server)
+
+                eventlet.sleep(CONF.verify_interval)
+        finally:
+            self._poller = None
+
+
+def get_instance_watcher():
+    """Returns the instance state watcher shared by the whole engine."""
+    global _WATCHER
+    if _WATCHER is None:
+        _WATCHER = InstanceStateWatcher()
+    return _WATCHER
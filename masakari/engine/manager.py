@@ -21,10 +21,14 @@ notifications. It is responsible for processing notifications and executing
 workflows.
 
 """
+import datetime
+import os
 import traceback
 
+from eventlet import greenpool
 from oslo_log import log as logging
 import oslo_messaging as messaging
+from oslo_service import loopingcall
 from oslo_service import periodic_task
 from oslo_utils import timeutils
 
@@ -63,6 +67,13 @@ class MasakariManager(manager.Manager):
                                              *args, **kwargs)
 
         self.driver = driver.load_masakari_driver(masakari_driver)
+        # Owner recorded in the lease of the notifications processed by this
+        # engine, several engines can share the notifications table.
+        self.engine_id = '%s:%d' % (self.host, os.getpid())
+        # Bounds the notifications processed at the same time among the ones
+        # sent together, whatever the number of notifications sent.
+        self._notifications_pool = greenpool.GreenPool(
+            CONF.notifications_processing_threads)
 
     def _handle_notification_type_process(self, context, notification):
         notification_status = fields.NotificationStatus.FINISHED
@@ -96,6 +107,8 @@ class MasakariManager(manager.Manager):
                     notification.notification_uuid)
             except exception.SkipProcessRecoveryException:
                 notification_status = fields.NotificationStatus.FINISHED
+            except exception.RecoveryWorkflowStopped:
+                raise
             except (exception.MasakariException,
                     exception.ProcessRecoveryFailureException) as e:
                 notification_status = fields.NotificationStatus.ERROR
@@ -146,6 +159,8 @@ class MasakariManager(manager.Manager):
             exception_info = e
         except exception.SkipInstanceRecoveryException:
             notification_status = fields.NotificationStatus.FINISHED
+        except exception.RecoveryWorkflowStopped:
+            raise
         except (exception.MasakariException,
                 exception.InstanceRecoveryFailureException) as e:
             notification_status = fields.NotificationStatus.ERROR
@@ -232,6 +247,8 @@ class MasakariManager(manager.Manager):
                     reserved_host_list=reserved_host_list)
             except exception.SkipHostRecoveryException:
                 notification_status = fields.NotificationStatus.FINISHED
+            except exception.RecoveryWorkflowStopped:
+                raise
             except (exception.HostRecoveryFailureException,
                     exception.ReservedHostsUnavailable,
                     exception.MasakariException) as e:
@@ -264,40 +281,37 @@ class MasakariManager(manager.Manager):
 
         return notification_status
 
-    def _process_notification(self, context, notification):
-        @utils.synchronized(notification.source_host_uuid, blocking=True)
-        def do_process_notification(notification):
-            LOG.info('Processing notification %(notification_uuid)s of '
-                     'type: %(type)s',
-                     {'notification_uuid': notification.notification_uuid,
-                      'type': notification.type})
-
-            # Get notification from db
-            notification_db = objects.Notification.get_by_uuid(context,
-                                        notification.notification_uuid)
-
-            # NOTE(tpatil): To fix bug 1773132, process notification only
-            # if the notification status is New and the current notification
-            # from DB status is Not New to avoid recovering from failure twice
-            if (notification.status == fields.NotificationStatus.NEW and
-                    notification_db.status != fields.NotificationStatus.NEW):
-                LOG.warning("Processing of notification is skipped to avoid "
-                            "recovering from failure twice. "
-                            "Notification received is '%(uuid)s' "
-                            "and it's status is '%(new_status)s' and the "
-                            "current status of same notification in db "
-                            "is '%(old_status)s'",
-                            {"uuid": notification.notification_uuid,
-                            "new_status": notification.status,
-                            "old_status": notification_db.status})
-                return
-
-            update_data = {
-                'status': fields.NotificationStatus.RUNNING,
-            }
-            notification.update(update_data)
-            notification.save()
+    def _get_notification_lock_name(self, notification):
+        # NOTE: Instance failures are recovered independently of each other,
+        # so VM notifications are only serialized per instance. Host and
+        # process notifications act on the whole host and keep being
+        # serialized per source host.
+        if notification.type == fields.NotificationType.VM:
+            instance_uuid = notification.payload.get('instance_uuid')
+            if instance_uuid:
+                return instance_uuid
+
+        return notification.source_host_uuid
+
+    def _execute_notification(self, context, notification):
+        # NOTE(tpatil): To fix bug 1773132, process notification only
+        # if the notification status in DB is still the one it has been
+        # received with, i.e. if the notification received as New is not
+        # New anymore, it is not processed to avoid recovering from failure
+        # twice.
+        if not notification.update_status(fields.NotificationStatus.RUNNING,
+                                          notification.status,
+                                          claimed_by=self.engine_id):
+            LOG.warning("Processing of notification is skipped to avoid "
+                        "recovering from failure twice. "
+                        "Notification received is '%(uuid)s' "
+                        "and it's status '%(status)s' has been changed "
+                        "in db.",
+                        {"uuid": notification.notification_uuid,
+                         "status": notification.status})
+            return
 
+        try:
             if notification.type == fields.NotificationType.PROCESS:
                 notification_status = self._handle_notification_type_process(
                     context, notification)
@@ -307,17 +321,75 @@ class MasakariManager(manager.Manager):
             elif notification.type == fields.NotificationType.COMPUTE_HOST:
                 notification_status = self._handle_notification_type_host(
                     context, notification)
+        except exception.RecoveryWorkflowStopped:
+            # NOTE: The engine which has taken over the lease processes the
+            # notification again and sets its final status.
+            LOG.warning("Processing of notification %s is stopped as its "
+                        "lease has been taken over by another engine.",
+                        notification.notification_uuid)
+            return
+
+        LOG.info("Notification %(notification_uuid)s exits with "
+                 "status: %(status)s.",
+                 {'notification_uuid': notification.notification_uuid,
+                  'status': notification_status})
+
+        # NOTE: Only the engine holding the lease can set the final status,
+        # an engine which has lost it may still be finishing a task.
+        if not notification.update_status(notification_status,
+                                          fields.NotificationStatus.RUNNING,
+                                          claimed_by=self.engine_id):
+            LOG.warning("Status of notification %(uuid)s couldn't be set to "
+                        "'%(status)s' as it is not running anymore or its "
+                        "lease has been taken over by another engine.",
+                        {"uuid": notification.notification_uuid,
+                         "status": notification_status})
+
+    def _renew_notification_lease(self, notification):
+        try:
+            renewed = notification.renew_lease(self.engine_id,
+                                               CONF.notification_lease_time)
+        except Exception:
+            # Keep trying, the lease is only lost once it has expired.
+            LOG.exception("Failed to renew the lease of notification %s.",
+                          notification.notification_uuid)
+            return
+
+        if not renewed:
+            # NOTE: Another engine processes the notification again, the
+            # workflow executed here stops before its next task.
+            LOG.warning("Lease of notification %s has been taken over "
+                        "by another engine.",
+                        notification.notification_uuid)
+            self.driver.stop_workflow(notification.notification_uuid)
+            raise loopingcall.LoopingCallDone()
 
-            LOG.info("Notification %(notification_uuid)s exits with "
-                     "status: %(status)s.",
+    def _process_notification(self, context, notification):
+        @utils.synchronized(self._get_notification_lock_name(notification),
+                            blocking=True)
+        def do_process_notification(notification):
+            LOG.info('Processing notification %(notification_uuid)s of '
+                     'type: %(type)s',
                      {'notification_uuid': notification.notification_uuid,
-                      'status': notification_status})
+                      'type': notification.type})
 
-            update_data = {
-                'status': notification_status
-            }
-            notification.update(update_data)
-            notification.save()
+            if not notification.claim(self.engine_id,
+                                      CONF.notification_lease_time):
+                LOG.info("Processing of notification %s is skipped as it is "
+                         "claimed by another engine.",
+                         notification.notification_uuid)
+                return
+
+            lease_renewal = loopingcall.FixedIntervalLoopingCall(
+                self._renew_notification_lease, notification)
+            renew_interval = CONF.notification_lease_time / 3.0
+            lease_renewal.start(interval=renew_interval,
+                                initial_delay=renew_interval)
+            try:
+                self._execute_notification(context, notification)
+            finally:
+                lease_renewal.stop()
+                notification.release(self.engine_id)
 
         engine_utils.notify_about_notification_update(context,
             notification,
@@ -330,6 +402,19 @@ class MasakariManager(manager.Manager):
         """Processes the notification"""
         self._process_notification(context, notification)
 
+    def process_notifications(self, context, notifications=None):
+        """Processes several notifications sent together.
+
+        Each notification is processed in its own green thread, as it would
+        be if it had been sent alone. At most
+        CONF.notifications_processing_threads of them are processed at the
+        same time, this call waits for a free green thread of the pool before
+        dispatching the next notification.
+        """
+        for notification in notifications or []:
+            self._notifications_pool.spawn_n(self._process_notification,
+                                             context, notification)
+
     @periodic_task.periodic_task(
         spacing=CONF.process_unfinished_notifications_interval)
     def _process_unfinished_notifications(self, context):
@@ -337,8 +422,11 @@ class MasakariManager(manager.Manager):
             'status': [fields.NotificationStatus.ERROR,
                        fields.NotificationStatus.NEW]
         }
-        notifications_list = objects.NotificationList.get_all(context,
-                                                              filters=filters)
+        # NOTE: Only the fields needed to select the notifications to retry
+        # are read, these ones are then fetched entirely to be processed.
+        notifications_list = objects.NotificationList.get_all(
+            context, filters=filters,
+            fields=['notification_uuid', 'status', 'generated_time'])
 
         for notification in notifications_list:
             if (notification.status == fields.NotificationStatus.ERROR or
@@ -346,62 +434,93 @@ class MasakariManager(manager.Manager):
                 timeutils.is_older_than(
                     notification.generated_time,
                     CONF.retry_notification_new_status_interval))):
+                try:
+                    notification = objects.Notification.get_by_uuid(
+                        context, notification.notification_uuid)
+                except exception.NotificationNotFound:
+                    continue
                 self._process_notification(context, notification)
 
-            # get updated notification from db after workflow execution
-            notification_db = objects.Notification.get_by_uuid(
-                context, notification.notification_uuid)
-
-            if notification_db.status == fields.NotificationStatus.ERROR:
-                # update notification status as failed
-                notification_status = fields.NotificationStatus.FAILED
-                update_data = {
-                    'status': notification_status
-                }
-
-                notification_db.update(update_data)
-                notification_db.save()
-                LOG.error(
-                    "Periodic task 'process_unfinished_notifications': "
-                    "Notification %(notification_uuid)s exits with "
-                    "status: %(status)s.",
-                    {'notification_uuid': notification.notification_uuid,
-                     'status': notification_status})
+        if not notifications_list:
+            return
+
+        # update status of the notifications still in error after workflow
+        # execution as failed
+        notification_status = fields.NotificationStatus.FAILED
+        filters = {
+            'notification_uuid': [notification.notification_uuid
+                                  for notification in notifications_list],
+            'status': fields.NotificationStatus.ERROR
+        }
+        failed_notifications = (
+            objects.NotificationList.update_status_by_filters(
+                context, filters, notification_status))
+
+        for notification in failed_notifications:
+            LOG.error(
+                "Periodic task 'process_unfinished_notifications': "
+                "Notification %(notification_uuid)s exits with "
+                "status: %(status)s.",
+                {'notification_uuid': notification.notification_uuid,
+                 'status': notification_status})
+
+    @periodic_task.periodic_task(
+        spacing=CONF.check_notification_leases_interval)
+    def _process_notifications_with_expired_lease(self, context):
+        # NOTE: The lease of a running notification is renewed by the engine
+        # processing it for as long as its workflow runs, an expired lease
+        # means that this engine has stopped.
+        filters = {
+            'status': fields.NotificationStatus.RUNNING,
+            'lease-expired-before': timeutils.utcnow()
+        }
+        notifications_list = objects.NotificationList.get_all(context,
+                                                              filters=filters)
+
+        for notification in notifications_list:
+            LOG.warning("Periodic task 'process_notifications_with_expired_"
+                        "lease': Taking over notification "
+                        "%(notification_uuid)s as its lease has expired.",
+                        {'notification_uuid': notification.notification_uuid})
+            self._process_notification(context, notification)
 
     @periodic_task.periodic_task(
         spacing=CONF.check_expired_notifications_interval)
     def _check_expired_notifications(self, context):
+        # update running expired notification status as failed
         filters = {
             'status': [fields.NotificationStatus.RUNNING,
                        fields.NotificationStatus.ERROR,
-                       fields.NotificationStatus.NEW]
+                       fields.NotificationStatus.NEW],
+            'generated-before': timeutils.utcnow() - datetime.timedelta(
+                seconds=CONF.notifications_expired_interval)
         }
-        notifications_list = objects.NotificationList.get_all(context,
-                                                              filters=filters)
+        notifications_list = (
+            objects.NotificationList.update_status_by_filters(
+                context, filters, fields.NotificationStatus.FAILED))
 
         for notification in notifications_list:
-            if timeutils.is_older_than(
-                    notification.generated_time,
-                    CONF.notifications_expired_interval):
-                # update running expired notification status as failed
-                notification_status = fields.NotificationStatus.FAILED
-                update_data = {
-                    'status': notification_status
-                }
-
-                notification.update(update_data)
-                notification.save()
-                LOG.error(
-                    "Periodic task 'check_expired_notifications': "
-                    "Notification %(notification_uuid)s is expired.",
-                    {'notification_uuid': notification.notification_uuid})
+            LOG.error(
+                "Periodic task 'check_expired_notifications': "
+                "Notification %(notification_uuid)s is expired.",
+                {'notification_uuid': notification.notification_uuid})
+
+    @periodic_task.periodic_task(
+        spacing=CONF.archive_notifications_interval)
+    def _archive_notifications(self, context):
+        rows = objects.NotificationList.archive(
+            context, CONF.archive_notifications_age_in_days,
+            batch_size=CONF.archive_notifications_batch_size)
+        if rows:
+            LOG.info("Periodic task 'archive_notifications': Archived "
+                     "%(rows)d notification(s).", {'rows': rows})
 
     def get_notification_recovery_workflow_details(self, context,
                                                    notification):
         """Retrieve recovery workflow details of the notification"""
         try:
             host_obj = objects.Host.get_by_uuid(
-                context, notification.source_host_uuid)
+                context, notification.source_host_uuid, use_slave=True)
             recovery_method = host_obj.failover_segment.recovery_method
 
             progress_details = (
@@ -32,9 +32,11 @@ class EngineAPI(rpc.RPCAPI):
         1.0 - Initial version.
         1.1 - Added get_notification_recovery_workflow_details method to
               retrieve progress details from notification driver.
+        1.2 - Added process_notifications method to process several
+              notifications sent together.
     """
 
-    RPC_API_VERSION = '1.1'
+    RPC_API_VERSION = '1.2'
     TOPIC = CONF.masakari_topic
     BINARY = 'masakari-engine'
 
@@ -50,6 +52,12 @@ class EngineAPI(rpc.RPCAPI):
         cctxt = self.client.prepare(version=version)
         cctxt.cast(context, 'process_notification', notification=notification)
 
+    def process_notifications(self, context, notifications):
+        version = '1.2'
+        cctxt = self.client.prepare(version=version)
+        cctxt.cast(context, 'process_notifications',
+                   notifications=notifications)
+
     def get_notification_recovery_workflow_details(self, context,
                                                    notification):
         version = '1.1'
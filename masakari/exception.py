@@ -363,6 +363,11 @@ class IgnoreInstanceRecoveryException(MasakariException):
     msg_fmt = _('Instance recovery is ignored.')
 
 
+class RecoveryWorkflowStopped(MasakariException):
+    msg_fmt = _('Recovery workflow of notification %(notification_uuid)s '
+                'has been stopped.')
+
+
 class HostNotFoundUnderFailoverSegment(HostNotFound):
     msg_fmt = _("Host '%(host_uuid)s' under failover_segment "
                 "'%(segment_uuid)s' could not be found.")
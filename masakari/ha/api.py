@@ -12,6 +12,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
 import datetime
 import traceback
 
@@ -63,7 +64,7 @@ class FailoverSegmentAPI(object):
         return segment
 
     def get_all(self, context, filters=None, sort_keys=None,
-                sort_dirs=None, limit=None, marker=None):
+                sort_dirs=None, limit=None, marker=None, with_stats=False):
         """Get all failover segments filtered by one of the given parameters.
 
         If there is no filter it will retrieve all segments in the system.
@@ -73,15 +74,21 @@ class FailoverSegmentAPI(object):
         secondary sort ket, etc.). For each sort key, the associated sort
         direction is based on the list of sort directions in the 'sort_dirs'
         parameter.
+
+        If 'with_stats' is True, the host and active notification counts of
+        the segments are set.
         """
 
         LOG.debug("Searching by: %s", str(filters))
 
+        # NOTE: Listing tolerates slightly stale data, so it is read from
+        # the slave connection if there is one.
         limited_segments = (objects.FailoverSegmentList.
                             get_all(context, filters=filters,
                                     sort_keys=sort_keys,
                                     sort_dirs=sort_dirs, limit=limit,
-                                    marker=marker))
+                                    marker=marker, use_slave=True,
+                                    with_stats=with_stats))
 
         return limited_segments
 
@@ -153,6 +160,36 @@ class HostAPI(object):
         novaclient = nova.API()
         novaclient.find_compute_service(context, name)
 
+    def _are_valid_host_names(self, context, names):
+        """Check the names against a single listing of the compute hosts."""
+        novaclient = nova.API()
+        compute_hosts = novaclient.get_compute_service_hosts(context)
+        for name in names:
+            if name not in compute_hosts:
+                raise exception.ComputeNotFoundByName(compute_name=name)
+
+    @staticmethod
+    def _new_host(context, segment, host_data):
+        host = objects.Host(context=context)
+
+        # Populate host object for create
+        host.name = host_data.get('name')
+        host.failover_segment = segment
+        host.type = host_data.get('type')
+        host.control_attributes = host_data.get('control_attributes')
+        host.on_maintenance = strutils.bool_from_string(
+            host_data.get('on_maintenance', False), strict=True)
+        host.reserved = strutils.bool_from_string(
+            host_data.get('reserved', False), strict=True)
+        return host
+
+    @staticmethod
+    def _check_unique_names(names):
+        duplicates = sorted(name for name, count in
+                            collections.Counter(names).items() if count > 1)
+        if duplicates:
+            raise exception.HostExists(name=duplicates[0])
+
     def get_host(self, context, segment_uuid, host_uuid):
         """Get a host by id"""
 
@@ -179,24 +216,15 @@ class HostAPI(object):
                                                  sort_keys=sort_keys,
                                                  sort_dirs=sort_dirs,
                                                  limit=limit,
-                                                 marker=marker)
+                                                 marker=marker,
+                                                 use_slave=True)
 
         return limited_hosts
 
     def create_host(self, context, segment_uuid, host_data):
         """Create host"""
         segment = objects.FailoverSegment.get_by_uuid(context, segment_uuid)
-        host = objects.Host(context=context)
-
-        # Populate host object for create
-        host.name = host_data.get('name')
-        host.failover_segment = segment
-        host.type = host_data.get('type')
-        host.control_attributes = host_data.get('control_attributes')
-        host.on_maintenance = strutils.bool_from_string(
-            host_data.get('on_maintenance', False), strict=True)
-        host.reserved = strutils.bool_from_string(
-            host_data.get('reserved', False), strict=True)
+        host = self._new_host(context, segment, host_data)
 
         self._is_valid_host_name(context, host.name)
 
@@ -212,6 +240,33 @@ class HostAPI(object):
 
         return host
 
+    def create_hosts(self, context, segment_uuid, hosts_data):
+        """Create several hosts of a segment in a single transaction.
+
+        The names of the hosts are validated against a single listing of the
+        compute services and either all the hosts are created or none.
+        """
+        segment = objects.FailoverSegment.get_by_uuid(context, segment_uuid)
+        hosts = [self._new_host(context, segment, host_data)
+                 for host_data in hosts_data]
+
+        names = [host.name for host in hosts]
+        self._check_unique_names(names)
+        self._are_valid_host_names(context, names)
+
+        try:
+            created = objects.HostList.create(context, hosts)
+        except Exception as e:
+            with excutils.save_and_reraise_exception():
+                tb = traceback.format_exc()
+                for host in hosts:
+                    api_utils.notify_about_host_api(context, host,
+                        action=fields.EventNotificationAction.HOST_CREATE,
+                        phase=fields.EventNotificationPhase.ERROR,
+                        exception=e, tb=tb)
+
+        return created
+
     def update_host(self, context, segment_uuid, id, host_data):
         """Update the host"""
 
@@ -246,6 +301,65 @@ class HostAPI(object):
                     tb=tb)
         return host
 
+    def update_hosts(self, context, segment_uuid, hosts_data):
+        """Update several hosts of a segment in a single transaction.
+
+        Each item of hosts_data holds the 'id' of the host to update along
+        with its new attributes. The recovery state of the segment is checked
+        once, the new names are validated against a single listing of the
+        compute services and either all the hosts are updated or none.
+        """
+        segment = objects.FailoverSegment.get_by_uuid(context, segment_uuid)
+
+        host_uuids = [host_data['id'] for host_data in hosts_data]
+        if len(set(host_uuids)) != len(host_uuids):
+            raise exception.InvalidInput(
+                reason=_("A host can't be updated more than once by a "
+                         "single request."))
+
+        if is_failover_segment_under_recovery(segment):
+            msg = _("Hosts of failover segment %s can't be updated as "
+                    "it is in-use to process notifications.") % segment.uuid
+            LOG.error(msg)
+            raise exception.HostInUse(msg)
+
+        hosts = {host.uuid: host for host in objects.HostList.get_all(
+            context, filters={'failover_segment_id': segment.uuid,
+                              'uuid': host_uuids})}
+        for host_uuid in host_uuids:
+            if host_uuid not in hosts:
+                raise exception.HostNotFoundUnderFailoverSegment(
+                    host_uuid=host_uuid, segment_uuid=segment.uuid)
+
+        names = [host_data['name'] for host_data in hosts_data
+                 if 'name' in host_data]
+        if names:
+            self._check_unique_names(names)
+            self._are_valid_host_names(context, names)
+
+        for host_data in hosts_data:
+            host_data = dict(host_data)
+            host = hosts[host_data.pop('id')]
+            for key in ('on_maintenance', 'reserved'):
+                if key in host_data:
+                    host_data[key] = strutils.bool_from_string(
+                        host_data[key], strict=True)
+            host.update(host_data)
+
+        hosts = [hosts[host_uuid] for host_uuid in host_uuids]
+        try:
+            updated = objects.HostList.save_all(context, hosts)
+        except Exception as e:
+            with excutils.save_and_reraise_exception():
+                tb = traceback.format_exc()
+                for host in hosts:
+                    api_utils.notify_about_host_api(context, host,
+                        action=fields.EventNotificationAction.HOST_UPDATE,
+                        phase=fields.EventNotificationPhase.ERROR,
+                        exception=e, tb=tb)
+
+        return updated
+
     def delete_host(self, context, segment_uuid, id):
         """Delete the host"""
 
@@ -274,39 +388,25 @@ class NotificationAPI(object):
 
     @staticmethod
     def _is_duplicate_notification(context, notification):
-        # Get all the notifications by filters
-
-        filters = {
-            'type': notification.type,
-            'source_host_uuid': notification.source_host_uuid,
-            'generated-since': (notification.generated_time -
-                datetime.timedelta(
-                    seconds=CONF.duplicate_notification_detection_interval))
-        }
-        notifications_list = objects.NotificationList.get_all(context,
-                                                              filters=filters)
-        for db_notification in notifications_list:
-            # if payload is same notification should be considered as
-            # duplicate
-            if db_notification.payload == notification.payload:
-                return True
-
-        return False
+        # if the payload is the same as the one of a notification of the
+        # same type and host generated within the detection interval, the
+        # notification should be considered as duplicate
+        generated_since = (notification.generated_time - datetime.timedelta(
+            seconds=CONF.duplicate_notification_detection_interval))
 
-    def create_notification(self, context, notification_data):
-        """Create notification"""
+        return notification.is_duplicate(generated_since, use_slave=True)
 
-        # Check whether host from which the notification came is already
-        # present in failover segment or not
-        host_name = notification_data.get('hostname')
-        host_object = objects.Host.get_by_name(context, host_name)
-        host_on_maintenance = host_object.on_maintenance
+    @staticmethod
+    def _new_notification(context, host_object, notification_data):
+        """Build the notification of notification_data from host_object.
 
-        if host_on_maintenance:
+        :raises HostOnMaintenanceError: if the host is under maintenance.
+        """
+        if host_object.on_maintenance:
             message = (_("Notification received from host %(host)s of type "
                          "'%(type)s' is ignored as the host is already under "
                          "maintenance.") % {
-                'host': host_name,
+                'host': host_object.name,
                 'type': notification_data.get('type')
             })
             raise exception.HostOnMaintenanceError(message=message)
@@ -319,12 +419,28 @@ class NotificationAPI(object):
         notification.source_host_uuid = host_object.uuid
         notification.payload = notification_data.get('payload')
         notification.status = fields.NotificationStatus.NEW
+        return notification
+
+    @staticmethod
+    def _duplicate_notification_error(host_name, notification):
+        message = (_("Notification received from host %(host)s of "
+                     " type '%(type)s' is duplicate.") %
+                   {'host': host_name, 'type': notification.type})
+        return exception.DuplicateNotification(message=message)
+
+    def create_notification(self, context, notification_data):
+        """Create notification"""
+
+        # Check whether host from which the notification came is already
+        # present in failover segment or not
+        host_name = notification_data.get('hostname')
+        host_object = objects.Host.get_by_name(context, host_name)
+
+        notification = self._new_notification(context, host_object,
+                                              notification_data)
 
         if self._is_duplicate_notification(context, notification):
-            message = (_("Notification received from host %(host)s of "
-                         " type '%(type)s' is duplicate.") %
-                       {'host': host_name, 'type': notification.type})
-            raise exception.DuplicateNotification(message=message)
+            raise self._duplicate_notification_error(host_name, notification)
 
         try:
             notification.create()
@@ -338,8 +454,74 @@ class NotificationAPI(object):
                     tb=tb)
         return notification
 
+    def create_notifications(self, context, notifications_data):
+        """Create several notifications at once.
+
+        The hosts of all the notifications are read by one query and so are
+        the notifications they may duplicate. The accepted notifications are
+        then stored in a single transaction and sent to the engine by a
+        single cast.
+
+        :returns: a list holding, for each item of notifications_data, either
+                  the created notification or the exception telling why it
+                  was rejected: HostNotFoundByName, HostOnMaintenanceError or
+                  DuplicateNotification.
+        """
+        host_names = sorted({notification_data.get('hostname')
+                             for notification_data in notifications_data})
+        hosts = {host.name: host for host in objects.HostList.get_all(
+            context, filters={'name': host_names})}
+
+        results = []
+        for notification_data in notifications_data:
+            host_name = notification_data.get('hostname')
+            try:
+                if host_name not in hosts:
+                    raise exception.HostNotFoundByName(host_name=host_name)
+                results.append(self._new_notification(
+                    context, hosts[host_name], notification_data))
+            except (exception.HostNotFoundByName,
+                    exception.HostOnMaintenanceError) as e:
+                results.append(e)
+
+        candidates = [(index, notification)
+                      for index, notification in enumerate(results)
+                      if isinstance(notification, objects.Notification)]
+        duplicates = objects.NotificationList.check_duplicates(
+            context, [candidate[1] for candidate in candidates],
+            CONF.duplicate_notification_detection_interval, use_slave=True)
+
+        accepted_indexes = []
+        notifications = []
+        for (index, notification), duplicate in zip(candidates, duplicates):
+            if duplicate:
+                results[index] = self._duplicate_notification_error(
+                    notifications_data[index].get('hostname'), notification)
+            else:
+                accepted_indexes.append(index)
+                notifications.append(notification)
+        if not notifications:
+            return results
+
+        try:
+            created = objects.NotificationList.create(context, notifications)
+            self.engine_rpcapi.process_notifications(context, created)
+        except Exception as e:
+            with excutils.save_and_reraise_exception():
+                tb = traceback.format_exc()
+                action = fields.EventNotificationAction.NOTIFICATION_CREATE
+                for notification in notifications:
+                    api_utils.notify_about_notification_api(
+                        context, notification, action=action,
+                        phase=fields.EventNotificationPhase.ERROR,
+                        exception=e, tb=tb)
+
+        for index, notification in zip(accepted_indexes, created):
+            results[index] = notification
+        return results
+
     def get_all(self, context, filters=None, sort_keys=None,
-                sort_dirs=None, limit=None, marker=None):
+                sort_dirs=None, limit=None, marker=None, fields=None):
         """Get all notifications filtered by one of the given parameters.
 
         If there is no filter it will retrieve all notifications in the system.
@@ -349,23 +531,26 @@ class NotificationAPI(object):
         secondary sort ket, etc.). For each sort key, the associated sort
         direction is based on the list of sort directions in the 'sort_dirs'
         parameter.
+
+        If 'fields' is given, only these fields of the notifications are read.
         """
         LOG.debug("Searching by: %s", str(filters))
 
         limited_notifications = (objects.NotificationList.
                                  get_all(context, filters, sort_keys,
-                                         sort_dirs, limit, marker))
+                                         sort_dirs, limit, marker,
+                                         use_slave=True, fields=fields))
 
         return limited_notifications
 
-    def get_notification(self, context, notification_uuid):
+    def get_notification(self, context, notification_uuid, use_slave=False):
         """Get a single notification with the given notification_uuid."""
         if uuidutils.is_uuid_like(notification_uuid):
             LOG.debug("Fetching notification by "
                       "UUID", notification_uuid=notification_uuid)
 
-            notification = objects.Notification.get_by_uuid(context,
-                                                            notification_uuid)
+            notification = objects.Notification.get_by_uuid(
+                context, notification_uuid, use_slave=use_slave)
         else:
             LOG.debug("Failed to fetch notification by "
                       "uuid %s", notification_uuid)
@@ -376,7 +561,8 @@ class NotificationAPI(object):
     def get_notification_recovery_workflow_details(self, context,
                                                    notification_uuid):
         """Get recovery workflow details details of the notification"""
-        notification = self.get_notification(context, notification_uuid)
+        notification = self.get_notification(context, notification_uuid,
+                                             use_slave=True)
 
         LOG.debug("Fetching recovery workflow details of a notification %s ",
                   notification_uuid)
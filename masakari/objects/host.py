@@ -35,7 +35,8 @@ class Host(base.MasakariPersistentObject, base.MasakariObject,
     # Version 1.1: Added 'segment_uuid' parameter to 'get_by_uuid' method
     # Version 1.2: Removed 'failover_segment_id' parameter which can be
     #              retrieved from failover_segment object
-    VERSION = '1.2'
+    # Version 1.3: Added 'use_slave' parameter to 'get_by_uuid' method
+    VERSION = '1.3'
 
     fields = {
         'id': fields.IntegerField(),
@@ -55,13 +56,24 @@ class Host(base.MasakariPersistentObject, base.MasakariObject,
             del primitive['failover_segment_id']
 
     @staticmethod
-    def _from_db_object(context, host, db_host):
+    def _from_db_object(context, host, db_host, segments=None):
+        """Set the fields of the host from the db record.
 
+        If segments is given, it maps segment uuids to the FailoverSegment
+        objects already built, which are shared by the hosts of a segment.
+        """
         for key in host.fields:
             db_value = db_host.get(key)
             if key == "failover_segment":
-                db_value = objects.FailoverSegment._from_db_object(
-                    context, objects.FailoverSegment(), db_value)
+                segment = None
+                if segments is not None:
+                    segment = segments.get(db_value['uuid'])
+                if segment is None:
+                    segment = objects.FailoverSegment._from_db_object(
+                        context, objects.FailoverSegment(), db_value)
+                    if segments is not None:
+                        segments[segment.uuid] = segment
+                db_value = segment
 
             setattr(host, key, db_value)
 
@@ -75,8 +87,9 @@ class Host(base.MasakariPersistentObject, base.MasakariObject,
         return cls._from_db_object(context, cls(), db_inst)
 
     @base.remotable_classmethod
-    def get_by_uuid(cls, context, uuid, segment_uuid=None):
-        db_inst = db.host_get_by_uuid(context, uuid, segment_uuid=segment_uuid)
+    def get_by_uuid(cls, context, uuid, segment_uuid=None, use_slave=False):
+        db_inst = db.host_get_by_uuid(context, uuid, segment_uuid=segment_uuid,
+                                      use_slave=use_slave)
         return cls._from_db_object(context, cls(), db_inst)
 
     @base.remotable_classmethod
@@ -84,8 +97,7 @@ class Host(base.MasakariPersistentObject, base.MasakariObject,
         db_inst = db.host_get_by_name(context, name)
         return cls._from_db_object(context, cls(), db_inst)
 
-    @base.remotable
-    def create(self):
+    def _get_create_updates(self):
         if self.obj_attr_is_set('id'):
             raise exception.ObjectActionError(action='create',
                                               reason='already created')
@@ -104,6 +116,12 @@ class Host(base.MasakariPersistentObject, base.MasakariObject,
         segment = updates.pop('failover_segment')
         updates['failover_segment_id'] = segment.uuid
 
+        return updates
+
+    @base.remotable
+    def create(self):
+        updates = self._get_create_updates()
+
         api_utils.notify_about_host_api(self._context, self,
             action=fields.EventNotificationAction.HOST_CREATE,
             phase=fields.EventNotificationPhase.START)
@@ -116,8 +134,7 @@ class Host(base.MasakariPersistentObject, base.MasakariObject,
 
         self._from_db_object(self._context, self, db_host)
 
-    @base.remotable
-    def save(self):
+    def _get_save_updates(self):
         updates = self.masakari_obj_get_changes()
         if 'failover_segment' in updates:
             raise exception.ObjectActionError(action='save',
@@ -125,6 +142,12 @@ class Host(base.MasakariPersistentObject, base.MasakariObject,
                                                      'changed')
         updates.pop('id', None)
 
+        return updates
+
+    @base.remotable
+    def save(self):
+        updates = self._get_save_updates()
+
         api_utils.notify_about_host_api(self._context, self,
             action=fields.EventNotificationAction.HOST_UPDATE,
             phase=fields.EventNotificationPhase.START)
@@ -162,7 +185,10 @@ class Host(base.MasakariPersistentObject, base.MasakariObject,
 @base.MasakariObjectRegistry.register
 class HostList(base.ObjectListBase, base.MasakariObject):
 
-    VERSION = '1.0'
+    # Version 1.0: Initial version
+    # Version 1.1: Added 'use_slave' parameter to 'get_all' method
+    # Version 1.2: Added 'create' and 'save_all' methods
+    VERSION = '1.2'
 
     fields = {
         'objects': fields.ListOfObjectsField('Host'),
@@ -170,11 +196,63 @@ class HostList(base.ObjectListBase, base.MasakariObject):
 
     @base.remotable_classmethod
     def get_all(cls, context, filters=None, sort_keys=None, sort_dirs=None,
-                limit=None, marker=None):
+                limit=None, marker=None, use_slave=False):
 
         groups = db.host_get_all_by_filters(context, filters=filters,
                                             sort_keys=sort_keys,
                                             sort_dirs=sort_dirs,
-                                            limit=limit, marker=marker)
+                                            limit=limit, marker=marker,
+                                            use_slave=use_slave)
+
+        # NOTE: The hosts of a segment share the same FailoverSegment object.
+        return base.obj_make_list(context, cls(context), objects.Host, groups,
+                                  segments={})
+
+    @base.remotable_classmethod
+    def create(cls, context, hosts):
+        """Create several new hosts in a single transaction.
+
+        The created hosts are returned in the order of hosts.
+        """
+        values_list = [host._get_create_updates() for host in hosts]
+
+        for host in hosts:
+            api_utils.notify_about_host_api(context, host,
+                action=fields.EventNotificationAction.HOST_CREATE,
+                phase=fields.EventNotificationPhase.START)
+
+        db_hosts = db.hosts_create(context, values_list)
+        created = base.obj_make_list(context, cls(context), objects.Host,
+                                     db_hosts, segments={})
+
+        for host in created:
+            api_utils.notify_about_host_api(context, host,
+                action=fields.EventNotificationAction.HOST_CREATE,
+                phase=fields.EventNotificationPhase.END)
+
+        return created
+
+    @base.remotable_classmethod
+    def save_all(cls, context, hosts):
+        """Save the changes of several hosts in a single transaction.
+
+        The updated hosts are returned in the order of hosts.
+        """
+        values_by_uuid = {host.uuid: host._get_save_updates()
+                          for host in hosts}
+
+        for host in hosts:
+            api_utils.notify_about_host_api(context, host,
+                action=fields.EventNotificationAction.HOST_UPDATE,
+                phase=fields.EventNotificationPhase.START)
+
+        db_hosts = db.hosts_update(context, values_by_uuid)
+        updated = base.obj_make_list(context, cls(context), objects.Host,
+                                     db_hosts, segments={})
+
+        for host in updated:
+            api_utils.notify_about_host_api(context, host,
+                action=fields.EventNotificationAction.HOST_UPDATE,
+                phase=fields.EventNotificationPhase.END)
 
-        return base.obj_make_list(context, cls(context), objects.Host, groups)
+        return updated
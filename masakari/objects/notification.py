@@ -13,8 +13,12 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
+import datetime
+
 from oslo_log import log as logging
 from oslo_serialization import jsonutils
+from oslo_utils import timeutils
 from oslo_utils import uuidutils
 
 from masakari.api import utils as api_utils
@@ -23,6 +27,7 @@ from masakari import exception
 from masakari import objects
 from masakari.objects import base
 from masakari.objects import fields
+from masakari import utils
 
 LOG = logging.getLogger(__name__)
 
@@ -37,7 +42,16 @@ class Notification(base.MasakariPersistentObject, base.MasakariObject,
     # Version 1.0: Initial version
     # Version 1.1: Added recovery_workflow_details field.
     #              Note: This field shouldn't be persisted.
-    VERSION = '1.1'
+    # Version 1.2: Added claim, renew_lease and release methods.
+    # Version 1.3: Added update_status method.
+    # Version 1.4: Added is_duplicate method.
+    # Version 1.5: Added use_slave parameter to get_by_uuid and is_duplicate
+    #              methods.
+    # Version 1.6: Added claimed_by parameter to update_status method.
+    VERSION = '1.6'
+
+    # JSON payload read from the db, decoded on first access of the payload.
+    _raw_payload = None
 
     fields = {
         'id': fields.IntegerField(),
@@ -55,33 +69,56 @@ class Notification(base.MasakariPersistentObject, base.MasakariObject,
         }
 
     @staticmethod
-    def _from_db_object(context, notification, db_notification):
+    def _from_db_object(context, notification, db_notification, fields=None):
+        """Set the fields of the notification from the db record.
+
+        Only the given fields are set, all of them if None. Decoding the
+        payload is deferred until it is accessed.
+        """
+        if fields is None:
+            fields = notification.fields
 
-        for key in notification.fields:
+        for key in fields:
             if key in NOTIFICATION_OPTIONAL_FIELDS:
                 continue
             if key != 'payload':
                 setattr(notification, key, db_notification.get(key))
             else:
-                payload = db_notification.get("payload")
-                notification.payload = jsonutils.loads(payload)
+                if hasattr(notification, base.get_attrname('payload')):
+                    delattr(notification, base.get_attrname('payload'))
+                notification._raw_payload = db_notification.get("payload")
 
         notification.obj_reset_changes()
         notification._context = context
         return notification
 
+    def obj_attr_is_set(self, attrname):
+        # NOTE: A payload read from the db is set, even not decoded yet.
+        if attrname == 'payload' and self._raw_payload is not None:
+            return True
+        return base.MasakariObject.obj_attr_is_set(self, attrname)
+
+    def obj_load_attr(self, attrname):
+        if attrname != 'payload' or self._raw_payload is None:
+            return base.MasakariObject.obj_load_attr(self, attrname)
+
+        payload = jsonutils.loads(self._raw_payload)
+        self._raw_payload = None
+        self.payload = payload
+        self.obj_reset_changes(['payload'])
+
     @base.remotable_classmethod
     def get_by_id(cls, context, id):
         db_notification = db.notification_get_by_id(context, id)
         return cls._from_db_object(context, cls(), db_notification)
 
     @base.remotable_classmethod
-    def get_by_uuid(cls, context, uuid):
-        db_notification = db.notification_get_by_uuid(context, uuid)
+    def get_by_uuid(cls, context, uuid, use_slave=False):
+        db_notification = db.notification_get_by_uuid(context, uuid,
+                                                      use_slave=use_slave)
         return cls._from_db_object(context, cls(), db_notification)
 
-    @base.remotable
-    def create(self):
+    def _get_create_updates(self):
         if self.obj_attr_is_set('id'):
             raise exception.ObjectActionError(action='create',
                                               reason='already created')
@@ -96,8 +133,16 @@ class Notification(base.MasakariPersistentObject, base.MasakariObject,
                       dict(uuid=updates['notification_uuid']))
 
         if 'payload' in updates:
+            updates['payload_hash'] = utils.get_payload_hash(
+                updates['payload'])
             updates['payload'] = jsonutils.dumps(updates['payload'])
 
+        return updates
+
+    @base.remotable
+    def create(self):
+        updates = self._get_create_updates()
+
         api_utils.notify_about_notification_api(self._context, self,
             action=fields.EventNotificationAction.NOTIFICATION_CREATE,
             phase=fields.EventNotificationPhase.START)
@@ -124,6 +169,58 @@ class Notification(base.MasakariPersistentObject, base.MasakariObject,
                                                  updates)
         self._from_db_object(self._context, self, db_notification)
 
+    @base.remotable
+    def is_duplicate(self, generated_since, use_slave=False):
+        """Check whether an identical notification is already stored.
+
+        A notification is identical if it has the same type, source host
+        and payload and was generated after generated_since.
+        """
+        return db.notification_duplicate_exists(
+            self._context, self.source_host_uuid, self.type,
+            utils.get_payload_hash(self.payload), generated_since,
+            use_slave=use_slave)
+
+    @base.remotable
+    def update_status(self, status, expected_status, claimed_by=None):
+        """Change the status if the stored one is still expected_status.
+
+        The check and the update are done by a single statement, so only
+        one of several concurrent callers can win a given transition. If
+        claimed_by is given, the notification must also still be claimed
+        by it.
+
+        :returns: True if the status has been changed
+        """
+        updated = db.notification_update_status(
+            self._context, self.notification_uuid, status, expected_status,
+            claimed_by=claimed_by)
+        if updated:
+            self.status = status
+            self.obj_reset_changes(['status'])
+
+        return updated
+
+    @base.remotable
+    def claim(self, claimed_by, lease_time):
+        """Claim the notification for 'lease_time' seconds.
+
+        Returns False if another engine holds an unexpired lease on it.
+        """
+        return db.notification_claim(self._context, self.notification_uuid,
+                                     claimed_by, lease_time)
+
+    @base.remotable
+    def renew_lease(self, claimed_by, lease_time):
+        return db.notification_renew_lease(self._context,
+                                           self.notification_uuid,
+                                           claimed_by, lease_time)
+
+    @base.remotable
+    def release(self, claimed_by):
+        return db.notification_release(self._context,
+                                       self.notification_uuid, claimed_by)
+
     @base.remotable
     def destroy(self):
         if not self.obj_attr_is_set('id'):
@@ -140,7 +237,13 @@ class Notification(base.MasakariPersistentObject, base.MasakariObject,
 @base.MasakariObjectRegistry.register
 class NotificationList(base.ObjectListBase, base.MasakariObject):
 
-    VERSION = '1.0'
+    # Version 1.0: Initial version
+    # Version 1.1: Added update_status_by_filters method.
+    # Version 1.2: Added archive method.
+    # Version 1.3: Added use_slave parameter to get_all method.
+    # Version 1.4: Added fields parameter to get_all method.
+    # Version 1.5: Added check_duplicates and create methods.
+    VERSION = '1.5'
 
     fields = {
         'objects': fields.ListOfObjectsField('Notification'),
@@ -148,16 +251,126 @@ class NotificationList(base.ObjectListBase, base.MasakariObject):
 
     @base.remotable_classmethod
     def get_all(cls, context, filters=None, sort_keys=None,
-                sort_dirs=None, limit=None, marker=None):
+                sort_dirs=None, limit=None, marker=None, use_slave=False,
+                fields=None):
+        """Get the notifications matching filters.
+
+        If fields is given, only these fields of the notifications are read
+        and set.
+        """
+        columns = None
+        if fields is not None:
+            columns = [field for field in fields
+                       if field not in NOTIFICATION_OPTIONAL_FIELDS]
 
         groups = db.notifications_get_all_by_filters(context, filters=filters,
                                                      sort_keys=sort_keys,
                                                      sort_dirs=sort_dirs,
-                                                     limit=limit, marker=marker
-                                                     )
+                                                     limit=limit,
+                                                     marker=marker,
+                                                     use_slave=use_slave,
+                                                     columns=columns)
+
+        return base.obj_make_list(context, cls(context), objects.Notification,
+                                  groups, fields=fields)
+
+    @base.remotable_classmethod
+    def check_duplicates(cls, context, notifications, interval,
+                         use_slave=False):
+        """Tell which of the notifications duplicate a previous one.
+
+        A notification is a duplicate if an identical notification, i.e.
+        with the same type, source host and payload, was generated less
+        than interval seconds before it, either a stored one or one which
+        is not a duplicate itself and precedes it in notifications. The
+        stored notifications of all the notifications are read by a single
+        query.
+
+        :returns: a list of booleans, one per notification
+        """
+        if not notifications:
+            return []
+
+        payload_hashes = [utils.get_payload_hash(notification.payload)
+                          for notification in notifications]
+        generated_times = [timeutils.normalize_time(
+            notification.generated_time) for notification in notifications]
+        delta = datetime.timedelta(seconds=interval)
+
+        previous = collections.defaultdict(list)
+        db_notifications = db.notifications_get_generated_since(
+            context,
+            {notification.source_host_uuid for notification in notifications},
+            set(payload_hashes), min(generated_times) - delta,
+            use_slave=use_slave)
+        for source_host_uuid, type, payload_hash, generated_time in (
+                db_notifications):
+            previous[(source_host_uuid, type, payload_hash)].append(
+                generated_time)
+
+        duplicates = []
+        for notification, payload_hash, generated_time in zip(
+                notifications, payload_hashes, generated_times):
+            key = (notification.source_host_uuid, notification.type,
+                   payload_hash)
+            duplicate = any(previous_time >= generated_time - delta
+                            for previous_time in previous[key])
+            if not duplicate:
+                previous[key].append(generated_time)
+            duplicates.append(duplicate)
+
+        return duplicates
+
+    @base.remotable_classmethod
+    def create(cls, context, notifications):
+        """Create several new notifications in a single transaction.
+
+        The created notifications are returned in the order of
+        notifications.
+        """
+        values_list = [notification._get_create_updates()
+                       for notification in notifications]
+
+        for notification in notifications:
+            api_utils.notify_about_notification_api(context, notification,
+                action=fields.EventNotificationAction.NOTIFICATION_CREATE,
+                phase=fields.EventNotificationPhase.START)
+
+        db_notifications = db.notifications_create(context, values_list)
+        created = base.obj_make_list(context, cls(context),
+                                     objects.Notification, db_notifications)
+
+        for notification in created:
+            api_utils.notify_about_notification_api(context, notification,
+                action=fields.EventNotificationAction.NOTIFICATION_CREATE,
+                phase=fields.EventNotificationPhase.END)
+
+        return created
+
+    @base.remotable_classmethod
+    def update_status_by_filters(cls, context, filters, status):
+        """Set the status of all the notifications matching filters.
+
+        The notifications are updated together in a single transaction and
+        the updated ones are returned.
+        """
+        db_notifications = db.notifications_update_status_by_filters(
+            context, filters, status)
 
         return base.obj_make_list(context, cls(context), objects.Notification,
-                                  groups)
+                                  db_notifications)
+
+    @base.remotable_classmethod
+    def archive(cls, context, age_in_days, batch_size=1000):
+        """Archive the notifications not processed anymore.
+
+        The finished, failed and ignored notifications last updated more
+        than age_in_days ago are moved to the archive, by batches of
+        batch_size notifications. The number of archived notifications is
+        returned.
+        """
+        return db.archive_notifications(context, age_in_days,
+                                        batch_size=batch_size)
 
 
 def notification_sample(sample):
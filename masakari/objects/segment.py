@@ -15,6 +15,7 @@
 
 from oslo_log import log as logging
 from oslo_utils import uuidutils
+from oslo_utils import versionutils
 
 from masakari.api import utils as api_utils
 from masakari import db
@@ -25,11 +26,20 @@ from masakari.objects import fields
 
 LOG = logging.getLogger(__name__)
 
+# The statistics of a segment are only set when they are requested.
+SEGMENT_STATISTICS_FIELDS = ['host_count', 'reserved_host_count',
+                             'on_maintenance_host_count',
+                             'active_notification_count']
+
 
 @base.MasakariObjectRegistry.register
 class FailoverSegment(base.MasakariPersistentObject, base.MasakariObject,
                       base.MasakariObjectDictCompat):
-    VERSION = '1.0'
+    # Version 1.0: Initial version
+    # Version 1.1: Added host_count, reserved_host_count,
+    #              on_maintenance_host_count and active_notification_count
+    #              statistics fields
+    VERSION = '1.1'
 
     fields = {
         'id': fields.IntegerField(),
@@ -38,11 +48,27 @@ class FailoverSegment(base.MasakariPersistentObject, base.MasakariObject,
         'service_type': fields.StringField(),
         'description': fields.StringField(nullable=True),
         'recovery_method': fields.FailoverSegmentRecoveryMethodField(),
+        'host_count': fields.IntegerField(),
+        'reserved_host_count': fields.IntegerField(),
+        'on_maintenance_host_count': fields.IntegerField(),
+        'active_notification_count': fields.IntegerField(),
         }
 
+    def obj_make_compatible(self, primitive, target_version):
+        super(FailoverSegment, self).obj_make_compatible(primitive,
+                                                         target_version)
+        target_version = versionutils.convert_version_to_tuple(target_version)
+        if target_version < (1, 1):
+            for key in SEGMENT_STATISTICS_FIELDS:
+                primitive.pop(key, None)
+
     @staticmethod
     def _from_db_object(context, segment, db_segment):
         for key in segment.fields:
+            if key in SEGMENT_STATISTICS_FIELDS:
+                if db_segment.get(key) is not None:
+                    setattr(segment, key, db_segment.get(key))
+                continue
             setattr(segment, key, db_segment[key])
         segment._context = context
         segment.obj_reset_changes()
@@ -134,7 +160,11 @@ class FailoverSegment(base.MasakariPersistentObject, base.MasakariObject,
 @base.MasakariObjectRegistry.register
 class FailoverSegmentList(base.ObjectListBase, base.MasakariObject):
 
-    VERSION = '1.0'
+    # Version 1.0: Initial version
+    # Version 1.1: Added 'use_slave' parameter to 'get_all' method
+    # Version 1.2: FailoverSegment version 1.1, added 'with_stats' parameter
+    #              to 'get_all' method
+    VERSION = '1.2'
 
     fields = {
         'objects': fields.ListOfObjectsField('FailoverSegment'),
@@ -142,13 +172,16 @@ class FailoverSegmentList(base.ObjectListBase, base.MasakariObject):
 
     @base.remotable_classmethod
     def get_all(cls, ctxt, filters=None, sort_keys=None,
-                sort_dirs=None, limit=None, marker=None):
+                sort_dirs=None, limit=None, marker=None, use_slave=False,
+                with_stats=False):
 
         groups = db.failover_segment_get_all_by_filters(ctxt, filters=filters,
                                                         sort_keys=sort_keys,
                                                         sort_dirs=sort_dirs,
                                                         limit=limit,
-                                                        marker=marker)
+                                                        marker=marker,
+                                                        use_slave=use_slave,
+                                                        with_stats=with_stats)
 
         return base.obj_make_list(ctxt, cls(ctxt), objects.FailoverSegment,
                                   groups)
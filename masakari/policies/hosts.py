@@ -46,7 +46,7 @@ rules = [
     policy.DocumentedRuleDefault(
         name=HOSTS % 'create',
         check_str=base.RULE_ADMIN_API,
-        description="Creates a host under given segment.",
+        description="Creates a host, or several ones, under given segment.",
         operations=[
             {
                 'method': 'POST',
@@ -56,11 +56,16 @@ rules = [
     policy.DocumentedRuleDefault(
         name=HOSTS % 'update',
         check_str=base.RULE_ADMIN_API,
-        description="Updates the editable attributes of an existing host.",
+        description="Updates the editable attributes of an existing host, "
+                    "or of several hosts of a segment.",
         operations=[
             {
                 'method': 'PUT',
                 'path': '/segments/{segment_id}/hosts/{host_id}'
+            },
+            {
+                'method': 'PUT',
+                'path': '/segments/{segment_id}/hosts'
             }
         ]),
     policy.DocumentedRuleDefault(
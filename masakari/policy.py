@@ -15,12 +15,16 @@
 
 """Policy Engine For Masakari."""
 
+import ast
+import collections
 import copy
 import logging
 import re
 import sys
+import threading
 
 from oslo_config import cfg
+from oslo_policy import _checks
 from oslo_policy import policy
 from oslo_utils import excutils
 
@@ -36,6 +40,161 @@ _ENFORCER = None
 # rules whether were updated.
 saved_file_rules = []
 KEY_EXPR = re.compile(r'%\((\w+)\)s')
+# Names substituted from the target in the match of a check, dotted names
+# included.
+TARGET_EXPR = re.compile(r'%\(([^)]*)\)s')
+# Credentials looked at by oslo.policy to enforce the scope of a rule.
+SCOPE_CREDENTIALS = ('system_scope', 'domain_id', 'project_id')
+
+
+class CachingEnforcer(policy.Enforcer):
+    """Enforcer caching the authorization decisions it can reproduce.
+
+    A decision is cached only when every check of the rule of the action
+    is a pure function of the credentials and the target, i.e. it is made of
+    role, is_admin, generic, rule, '@' and '!' checks. Such a decision is
+    keyed by the action and the values of the fields the rule reads, and
+    the cache is emptied whenever the rules change, e.g. when the policy
+    file is reloaded. Only the granted decisions are cached, so denials
+    keep raising with the messages of the enforcer.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._decisions = collections.OrderedDict()
+        self._rule_fields = {}
+        self._cache_lock = threading.Lock()
+        self._generation = 0
+        self._local = threading.local()
+        super(CachingEnforcer, self).__init__(*args, **kwargs)
+
+    def clear_cache(self):
+        with self._cache_lock:
+            self._generation += 1
+            self._decisions.clear()
+            self._rule_fields = {}
+
+    def load_rules(self, force_reload=False):
+        # NOTE: authorize has loaded the rules already before enforcing
+        # them, they are not loaded a second time by enforce.
+        if getattr(self._local, 'rules_loaded', False) and not force_reload:
+            return
+        super(CachingEnforcer, self).load_rules(force_reload=force_reload)
+
+    def set_rules(self, rules, overwrite=True, use_conf=False):
+        super(CachingEnforcer, self).set_rules(rules, overwrite=overwrite,
+                                               use_conf=use_conf)
+        self.clear_cache()
+
+    def clear(self):
+        super(CachingEnforcer, self).clear()
+        self.clear_cache()
+
+    def register_default(self, default):
+        super(CachingEnforcer, self).register_default(default)
+        self.clear_cache()
+
+    def _check_fields(self, check, seen):
+        """Return the credential and target fields a check depends on.
+
+        None is returned when the check may depend on anything else, e.g.
+        an http check.
+        """
+        check_type = type(check)
+        if check_type in (_checks.TrueCheck, _checks.FalseCheck):
+            return set(), set()
+        if check_type in (_checks.AndCheck, _checks.OrCheck):
+            creds, target = set(), set()
+            for rule in check.rules:
+                fields = self._check_fields(rule, seen)
+                if fields is None:
+                    return None
+                creds |= fields[0]
+                target |= fields[1]
+            return creds, target
+        if check_type is _checks.NotCheck:
+            return self._check_fields(check.rule, seen)
+        if check_type is _checks.RuleCheck:
+            if check.match in seen:
+                return None
+            rule = self.rules.get(check.match)
+            if rule is None:
+                return set(), set()
+            return self._check_fields(rule, seen | {check.match})
+        target = {name.split('.')[0]
+                  for name in TARGET_EXPR.findall(check.match)}
+        if check_type is IsAdminCheck:
+            return {'is_admin'}, set()
+        if check_type is _checks.RoleCheck:
+            return {'roles'}, target
+        if check_type is _checks.GenericCheck:
+            try:
+                ast.literal_eval(check.kind)
+                return set(), target
+            except (ValueError, SyntaxError):
+                return {check.kind.split('.')[0]}, target
+        return None
+
+    def _cache_key(self, action, target, creds):
+        fields = self._rule_fields.get(action, False)
+        if fields is False:
+            rule = self.rules.get(action)
+            if rule is None or action not in self.registered_rules:
+                return None
+            fields = self._check_fields(rule, {action})
+            if fields is not None:
+                fields = (tuple(sorted(fields[0] | set(SCOPE_CREDENTIALS))),
+                          tuple(sorted(fields[1])))
+            self._rule_fields[action] = fields
+        if fields is None:
+            return None
+
+        def _value(values, name):
+            value = values.get(name)
+            if isinstance(value, list):
+                value = tuple(value)
+            return value
+
+        # NOTE: enforce_scope is only known to the recent oslo.policy.
+        key = (action, getattr(self.conf.oslo_policy, 'enforce_scope', None),
+               tuple(_value(creds, name) for name in fields[0]),
+               tuple(_value(target, name) for name in fields[1]))
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def authorize(self, rule, target, creds, do_raise=False, exc=None,
+                  *args, **kwargs):
+        size = CONF.policy_cache_size
+        if not size or not isinstance(rule, str):
+            return super(CachingEnforcer, self).authorize(
+                rule, target, creds, do_raise, exc, *args, **kwargs)
+
+        # Reload the rules first, so that a modified policy file empties
+        # the cache before it is looked up.
+        self.load_rules()
+        generation = self._generation
+        key = self._cache_key(rule, target, creds)
+        if key is not None:
+            with self._cache_lock:
+                if key in self._decisions:
+                    self._decisions.move_to_end(key)
+                    return self._decisions[key]
+
+        self._local.rules_loaded = True
+        try:
+            result = super(CachingEnforcer, self).authorize(
+                rule, target, creds, do_raise, exc, *args, **kwargs)
+        finally:
+            self._local.rules_loaded = False
+        if key is not None and result:
+            with self._cache_lock:
+                if generation == self._generation:
+                    self._decisions[key] = result
+                    while len(self._decisions) > size:
+                        self._decisions.popitem(last=False)
+        return result
 
 
 def reset():
@@ -62,7 +221,7 @@ def init(policy_file=None, rules=None, default_rule=None, use_conf=True,
     global _ENFORCER
     global saved_file_rules
     if not _ENFORCER:
-        _ENFORCER = policy.Enforcer(CONF,
+        _ENFORCER = CachingEnforcer(CONF,
                                     policy_file=policy_file,
                                     rules=rules,
                                     default_rule=default_rule,
@@ -486,6 +486,176 @@ class HostTestCase(test.TestCase):
                           uuidsentinel.fake_host_3)
 
 
+@ddt.ddt
+class HostV1_7_TestCase(HostTestCase):
+    """Test Case for host api for 1.7 API"""
+    api_version = '1.7'
+
+    def _set_up(self):
+        self.controller = hosts.HostsController()
+        self.req = fakes.HTTPRequest.blank(
+            '/v1/segments/%s/hosts' % uuidsentinel.fake_segment1,
+            use_admin_context=True, version=self.api_version)
+        self.context = self.req.environ['masakari.context']
+
+    def _get_hosts_data(self):
+        return [{"name": "host-%s" % i, "type": "fake",
+                 "reserved": False, "on_maintenance": False,
+                 "control_attributes": "fake-control_attributes"}
+                for i in (1, 2)]
+
+    @mock.patch.object(ha_api.HostAPI, 'create_hosts')
+    def test_create_hosts(self, mock_create_hosts):
+        mock_create_hosts.return_value = self.host_list
+        hosts_data = self._get_hosts_data()
+
+        result = self.controller.create(self.req, uuidsentinel.fake_segment1,
+                                        body={"hosts": hosts_data})
+
+        self._assert_host_data(self.host_list_obj,
+                               _make_hosts_list(result['hosts']))
+        mock_create_hosts.assert_called_once_with(
+            self.context, uuidsentinel.fake_segment1, hosts_data)
+
+    @ddt.data([exception.ComputeNotFoundByName(compute_name='host-2'),
+               exc.HTTPBadRequest],
+              [exception.FailoverSegmentNotFound(
+                  id=uuidsentinel.fake_segment1), exc.HTTPNotFound],
+              [exception.HostExists(name='host-2'), exc.HTTPConflict])
+    @ddt.unpack
+    @mock.patch.object(ha_api.HostAPI, 'create_hosts')
+    def test_create_hosts_failure(self, masakari_exc, exc, mock_create_hosts):
+        mock_create_hosts.side_effect = masakari_exc
+
+        self.assertRaises(exc, self.controller.create, self.req,
+                          uuidsentinel.fake_segment1,
+                          body={"hosts": self._get_hosts_data()})
+
+    @ddt.data(
+        # no hosts
+        {"hosts": []},
+
+        # both host and hosts
+        {"host": {"name": "host-1", "type": "fake",
+                  "control_attributes": "fake-control_attributes"},
+         "hosts": [{"name": "host-2", "type": "fake",
+                    "control_attributes": "fake-control_attributes"}]},
+
+        # no name
+        {"hosts": [{"type": "fake",
+                    "control_attributes": "fake-control_attributes"}]}
+    )
+    def test_create_hosts_validation_failure(self, body):
+        self.assertRaises(self.bad_request, self.controller.create,
+                          self.req, uuidsentinel.fake_segment1, body=body)
+
+    def test_create_hosts_not_supported_before_1_7(self):
+        req = fakes.HTTPRequest.blank(
+            '/v1/segments/%s/hosts' % uuidsentinel.fake_segment1,
+            use_admin_context=True, version='1.6')
+
+        self.assertRaises(self.bad_request, self.controller.create, req,
+                          uuidsentinel.fake_segment1,
+                          body={"hosts": self._get_hosts_data()})
+
+    @mock.patch.object(ha_api.HostAPI, 'update_hosts')
+    def test_update_all(self, mock_update_hosts):
+        mock_update_hosts.return_value = self.host_list
+        hosts_data = [{"id": uuidsentinel.fake_host_1,
+                       "on_maintenance": True},
+                      {"id": uuidsentinel.fake_host_2,
+                       "on_maintenance": True}]
+
+        result = self.controller.update_all(
+            self.req, uuidsentinel.fake_segment1, body={"hosts": hosts_data})
+
+        self._assert_host_data(self.host_list_obj,
+                               _make_hosts_list(result['hosts']))
+        mock_update_hosts.assert_called_once_with(
+            self.context, uuidsentinel.fake_segment1, hosts_data)
+
+    @ddt.data([exception.ComputeNotFoundByName(compute_name='host-3'),
+               exc.HTTPBadRequest],
+              [exception.InvalidInput(reason='duplicate'),
+               exc.HTTPBadRequest],
+              [exception.HostNotFoundUnderFailoverSegment(
+                  host_uuid=uuidsentinel.fake_host_3,
+                  segment_uuid=uuidsentinel.fake_segment1), exc.HTTPNotFound],
+              [exception.FailoverSegmentNotFound(
+                  id=uuidsentinel.fake_segment1), exc.HTTPNotFound],
+              [exception.HostExists(name='host-3'), exc.HTTPConflict],
+              [exception.HostInUse(uuid=uuidsentinel.fake_host_1),
+               exc.HTTPConflict])
+    @ddt.unpack
+    @mock.patch.object(ha_api.HostAPI, 'update_hosts')
+    def test_update_all_failure(self, masakari_exc, exc, mock_update_hosts):
+        mock_update_hosts.side_effect = masakari_exc
+
+        self.assertRaises(exc, self.controller.update_all, self.req,
+                          uuidsentinel.fake_segment1,
+                          body={"hosts": [{"id": uuidsentinel.fake_host_1,
+                                           "name": "host-3"}]})
+
+    @ddt.data(
+        # no hosts
+        {"hosts": []},
+
+        # no id
+        {"hosts": [{"on_maintenance": True}]},
+
+        # invalid id
+        {"hosts": [{"id": "1", "on_maintenance": True}]},
+
+        # no updates
+        {"hosts": [{"id": uuidsentinel.fake_host_1}]},
+
+        # wrong updates
+        {"hosts": [{"id": uuidsentinel.fake_host_1, "foo": "bar"}]}
+    )
+    def test_update_all_validation_failure(self, body):
+        self.assertRaises(self.bad_request, self.controller.update_all,
+                          self.req, uuidsentinel.fake_segment1, body=body)
+
+    @mock.patch('masakari.rpc.get_client')
+    @mock.patch.object(ha_api.HostAPI, 'update_hosts')
+    def test_update_all_route(self, mock_update_hosts, mock_client):
+        mock_update_hosts.return_value = self.host_list
+        body = {"hosts": [{"id": uuidsentinel.fake_host_1,
+                           "on_maintenance": True}]}
+        fake_req = fakes.HTTPRequest.blank(
+            '/v1/segments/%s/hosts' % uuidsentinel.fake_segment1,
+            use_admin_context=True)
+        fake_req.headers['Content-Type'] = 'application/json'
+        fake_req.headers['OpenStack-API-Version'] = 'instance-ha 1.7'
+        fake_req.method = 'PUT'
+        fake_req.body = jsonutils.dump_as_bytes(body)
+
+        resp = fake_req.get_response(self.app)
+
+        self.assertEqual(http.OK, resp.status_code)
+        mock_update_hosts.assert_called_once_with(
+            mock.ANY, uuidsentinel.fake_segment1, body['hosts'])
+
+    @mock.patch('masakari.rpc.get_client')
+    @mock.patch.object(ha_api.HostAPI, 'update_hosts')
+    def test_update_all_route_not_found_before_1_7(self, mock_update_hosts,
+                                                   mock_client):
+        body = {"hosts": [{"id": uuidsentinel.fake_host_1,
+                           "on_maintenance": True}]}
+        fake_req = fakes.HTTPRequest.blank(
+            '/v1/segments/%s/hosts' % uuidsentinel.fake_segment1,
+            use_admin_context=True)
+        fake_req.headers['Content-Type'] = 'application/json'
+        fake_req.headers['OpenStack-API-Version'] = 'instance-ha 1.6'
+        fake_req.method = 'PUT'
+        fake_req.body = jsonutils.dump_as_bytes(body)
+
+        resp = fake_req.get_response(self.app)
+
+        self.assertEqual(http.NOT_FOUND, resp.status_code)
+        mock_update_hosts.assert_not_called()
+
+
 class HostTestCasePolicyNotAuthorized(test.NoDBTestCase):
     """Test Case for host non admin."""
 
@@ -553,6 +723,19 @@ class HostTestCasePolicyNotAuthorized(test.NoDBTestCase):
                                 uuidsentinel.fake_host_1, body=body)
         self._check_rule(exc, rule_name)
 
+    def test_update_all_no_admin(self):
+        rule_name = "os_masakari_api:os-hosts:update"
+        self.policy.set_rules({rule_name: "project:non_fake"})
+        req = fakes.HTTPRequest.blank(
+            '/v1/segments/%s/hosts' % uuidsentinel.fake_segment1,
+            version='1.7')
+        body = {"hosts": [{"id": uuidsentinel.fake_host_1,
+                           "on_maintenance": True}]}
+        exc = self.assertRaises(exception.PolicyNotAuthorized,
+                                self.controller.update_all,
+                                req, uuidsentinel.fake_segment1, body=body)
+        self._check_rule(exc, rule_name)
+
     def test_delete_no_admin(self):
         rule_name = "os_masakari_api:os-hosts:delete"
         self.policy.set_rules({rule_name: "project:non_fake"})
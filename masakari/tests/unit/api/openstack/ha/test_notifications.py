@@ -18,6 +18,7 @@
 import copy
 from http import client as http
 from unittest import mock
+from urllib import parse
 
 import ddt
 from oslo_serialization import jsonutils
@@ -25,6 +26,7 @@ from oslo_utils import timeutils
 from webob import exc
 
 from masakari.api.openstack.ha import notifications
+from masakari.api.openstack.ha.schemas import notifications as schema
 from masakari.engine import rpcapi as engine_rpcapi
 from masakari import exception
 from masakari.ha import api as ha_api
@@ -35,6 +37,7 @@ from masakari import test
 from masakari.tests.unit.api.openstack import fakes
 from masakari.tests.unit.objects import test_objects
 from masakari.tests import uuidsentinel
+from masakari import utils
 
 NOW = timeutils.utcnow().replace(microsecond=0)
 OPTIONAL = ['recovery_workflow_details']
@@ -499,3 +502,240 @@ class NotificationV1_1_TestCase(NotificationTestCase):
                               result.recovery_workflow_details)
         self._assert_notification_data(NOTIFICATION_WITH_PROGRESS_DETAILS,
                                        _make_notification_obj(result))
+
+
+class NotificationV1_2_TestCase(test.TestCase):
+    """Test Case for notifications api for 1.2 API"""
+    api_version = '1.2'
+
+    @mock.patch.object(engine_rpcapi, 'EngineAPI')
+    def setUp(self, mock_rpc):
+        super(NotificationV1_2_TestCase, self).setUp()
+        self.controller = notifications.NotificationsController()
+
+    def _get_req(self, url):
+        return fakes.HTTPRequest.blank(url, use_admin_context=True,
+                                       version=self.api_version)
+
+    @mock.patch.object(ha_api.NotificationAPI, 'get_all')
+    def test_index_with_next_link(self, mock_get_all):
+        mock_get_all.return_value = [
+            _make_notification_obj(NOTIFICATION_DATA)]
+        req = self._get_req('/v1/notifications?limit=1&sort_key=type')
+
+        result = self.controller.index(req)
+
+        links = result['notifications_links']
+        self.assertEqual(1, len(links))
+        self.assertEqual('next', links[0]['rel'])
+        marker = parse.parse_qs(
+            parse.urlsplit(links[0]['href']).query)['marker'][0]
+        self.assertEqual({'created_at': NOW.isoformat(), 'id': 1,
+                          'type': 'VM'},
+                         utils.decode_cursor(marker))
+
+    @mock.patch.object(ha_api.NotificationAPI, 'get_all')
+    def test_index_without_next_link(self, mock_get_all):
+        mock_get_all.return_value = [
+            _make_notification_obj(NOTIFICATION_DATA)]
+        req = self._get_req('/v1/notifications?limit=2')
+
+        result = self.controller.index(req)
+
+        self.assertEqual([], result['notifications_links'])
+
+
+class NotificationV1_3_TestCase(NotificationV1_2_TestCase):
+    """Test Case for notifications api for 1.3 API"""
+    api_version = '1.3'
+
+    @mock.patch.object(ha_api.NotificationAPI, 'get_all')
+    def test_index_archived(self, mock_get_all):
+        mock_get_all.return_value = [
+            _make_notification_obj(NOTIFICATION_DATA)]
+        req = self._get_req('/v1/notifications?archived=true&status=finished')
+
+        self.controller.index(req)
+
+        mock_get_all.assert_called_once_with(
+            req.environ['masakari.context'],
+            {'archived': True, 'status': 'finished'}, ['created_at'], ['desc'],
+            1000, None, fields=None)
+
+    def test_index_invalid_archived(self):
+        req = self._get_req('/v1/notifications?archived=abcd')
+
+        self.assertRaises(exc.HTTPBadRequest, self.controller.index, req)
+
+
+@ddt.ddt
+class NotificationV1_4_TestCase(NotificationV1_3_TestCase):
+    """Test Case for notifications api for 1.4 API"""
+    api_version = '1.4'
+
+    @mock.patch.object(ha_api.NotificationAPI, 'get_all')
+    def test_index_with_fields(self, mock_get_all):
+        mock_get_all.return_value = [
+            _make_notification_obj(NOTIFICATION_DATA)]
+        req = self._get_req('/v1/notifications?limit=1&sort_key=type&'
+                            'fields=notification_uuid,status&fields=status')
+
+        result = self.controller.index(req)
+
+        self.assertEqual([{'notification_uuid': uuidsentinel.fake_notification,
+                           'status': 'running'}], result['notifications'])
+        fields = mock_get_all.call_args[1]['fields']
+        self.assertCountEqual(
+            ['notification_uuid', 'status', 'type', 'created_at', 'id'],
+            fields)
+        # the next link is built from the fields of the cursor
+        marker = parse.parse_qs(parse.urlsplit(
+            result['notifications_links'][0]['href']).query)['marker'][0]
+        self.assertEqual({'created_at': NOW.isoformat(), 'id': 1,
+                          'type': 'VM'},
+                         utils.decode_cursor(marker))
+
+    @ddt.data('fields=abcd', 'fields=status,recovery_workflow_details')
+    def test_index_invalid_fields(self, param):
+        req = self._get_req('/v1/notifications?%s' % param)
+
+        self.assertRaises(exc.HTTPBadRequest, self.controller.index, req)
+
+
+@ddt.ddt
+class NotificationV1_6_TestCase(NotificationV1_4_TestCase):
+    """Test Case for notifications api for 1.6 API"""
+    api_version = '1.6'
+
+    def _get_notification_data(self, hostname="fake_host"):
+        return {"hostname": hostname,
+                "payload": {"event": "STOPPED",
+                            "host_status": "NORMAL",
+                            "cluster_status": "ONLINE"},
+                "type": "COMPUTE_HOST",
+                "generated_time": str(NOW)}
+
+    @mock.patch.object(ha_api.NotificationAPI, 'create_notifications')
+    def test_create_notifications(self, mock_create_notifications):
+        mock_create_notifications.return_value = [
+            NOTIFICATION,
+            exception.HostNotFoundByName(host_name="fake_host_2"),
+            exception.DuplicateNotification(type="COMPUTE_HOST"),
+            exception.HostOnMaintenanceError(host_name="fake_host")]
+        notifications_data = [self._get_notification_data(),
+                              self._get_notification_data("fake_host_2"),
+                              self._get_notification_data(),
+                              self._get_notification_data()]
+        req = self._get_req('/v1/notifications')
+
+        result = self.controller.create(
+            req, body={"notifications": notifications_data})
+
+        results = result['notifications']
+        self.assertEqual([http.ACCEPTED, http.BAD_REQUEST, http.CONFLICT,
+                          http.CONFLICT],
+                         [item['code'] for item in results])
+        test_objects.compare_obj(self, results[0]['notification'],
+                                 NOTIFICATION_DATA, allow_missing=OPTIONAL)
+        for item in results[1:]:
+            self.assertNotIn('notification', item)
+            self.assertIn('message', item)
+        mock_create_notifications.assert_called_once_with(
+            req.environ['masakari.context'], notifications_data)
+
+    @mock.patch.object(ha_api.NotificationAPI, 'create_notification')
+    def test_create_single_notification(self, mock_create):
+        mock_create.return_value = NOTIFICATION
+        req = self._get_req('/v1/notifications')
+
+        result = self.controller.create(
+            req, body={"notification": self._get_notification_data()})
+
+        test_objects.compare_obj(self, result['notification'],
+                                 NOTIFICATION_DATA, allow_missing=OPTIONAL)
+
+    @mock.patch.object(ha_api.NotificationAPI, 'create_notifications')
+    def test_create_notifications_invalid_payload(self,
+                                                  mock_create_notifications):
+        invalid = self._get_notification_data()
+        invalid['type'] = "PROCESS"
+        req = self._get_req('/v1/notifications')
+
+        self.assertRaises(exception.ValidationError, self.controller.create,
+                          req, body={"notifications": [
+                              self._get_notification_data(), invalid]})
+        # no notification is created if any of them is invalid
+        self.assertFalse(mock_create_notifications.called)
+
+    @ddt.data(
+        # empty list
+        {"notifications": []},
+        # both a notification and a list of notifications
+        {"notification": {"hostname": "fake_host",
+                          "payload": {"event": "STOPPED",
+                                      "host_status": "NORMAL",
+                                      "cluster_status": "ONLINE"},
+                          "type": "COMPUTE_HOST",
+                          "generated_time": str(NOW)},
+         "notifications": [{"hostname": "fake_host",
+                            "payload": {"event": "STOPPED",
+                                        "host_status": "NORMAL",
+                                        "cluster_status": "ONLINE"},
+                            "type": "COMPUTE_HOST",
+                            "generated_time": str(NOW)}]},
+        # invalid item
+        {"notifications": [{"hostname": "fake_host"}]},
+        # neither a notification nor a list of notifications
+        {})
+    def test_create_notifications_failure(self, body):
+        req = self._get_req('/v1/notifications')
+
+        self.assertRaises(exception.ValidationError, self.controller.create,
+                          req, body=body)
+
+    def test_create_too_many_notifications(self):
+        req = self._get_req('/v1/notifications')
+        body = {"notifications": [
+            self._get_notification_data()
+            for i in range(schema.MAX_NOTIFICATIONS_PER_REQUEST + 1)]}
+
+        self.assertRaises(exception.ValidationError, self.controller.create,
+                          req, body=body)
+
+    def test_create_notifications_before_v1_6(self):
+        req = fakes.HTTPRequest.blank('/v1/notifications',
+                                      use_admin_context=True, version='1.5')
+
+        self.assertRaises(exception.ValidationError, self.controller.create,
+                          req, body={"notifications": [
+                              self._get_notification_data()]})
+
+
+class NotificationFieldsV1_3_TestCase(NotificationV1_3_TestCase):
+    """Test Case for the fields parameter before 1.4 API"""
+
+    @mock.patch.object(ha_api.NotificationAPI, 'get_all')
+    def test_index_fields_ignored(self, mock_get_all):
+        mock_get_all.return_value = [
+            _make_notification_obj(NOTIFICATION_DATA)]
+        req = self._get_req('/v1/notifications?fields=status')
+
+        result = self.controller.index(req)
+
+        self.assertIsNone(mock_get_all.call_args[1]['fields'])
+        self.assertIn('payload', result['notifications'][0])
+
+
+class NotificationArchivedV1_2_TestCase(NotificationV1_2_TestCase):
+    """Test Case for the archived filter before 1.3 API"""
+
+    @mock.patch.object(ha_api.NotificationAPI, 'get_all')
+    def test_index_archived_ignored(self, mock_get_all):
+        mock_get_all.return_value = []
+        req = self._get_req('/v1/notifications?archived=true')
+
+        self.controller.index(req)
+
+        mock_get_all.assert_called_once_with(
+            req.environ['masakari.context'], {}, ['created_at'], ['desc'],
+            1000, None, fields=None)
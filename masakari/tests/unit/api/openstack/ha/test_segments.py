@@ -92,6 +92,31 @@ class FailoverSegmentTestCase(test.TestCase):
         self._assert_segment_data(FAILOVER_SEGMENT_LIST,
                                   _make_segments_list(result))
 
+    @mock.patch.object(ha_api.FailoverSegmentAPI, 'get_all')
+    def test_index_links(self, mock_get_all):
+        mock_get_all.return_value = [FAILOVER_SEGMENT]
+
+        result = self.controller.index(self.req)
+        self.assertNotIn('segments_links', result)
+
+        req = fakes.HTTPRequest.blank('/v1/segments?limit=1',
+                                      use_admin_context=True, version='1.2')
+        result = self.controller.index(req)
+        self.assertEqual(1, len(result['segments_links']))
+        self.assertEqual('next', result['segments_links'][0]['rel'])
+
+    @mock.patch.object(ha_api.FailoverSegmentAPI, 'get_all')
+    def test_index_with_stats(self, mock_get_all):
+        mock_get_all.return_value = [FAILOVER_SEGMENT]
+
+        self.controller.index(self.req)
+        self.assertFalse(mock_get_all.call_args[1]['with_stats'])
+
+        req = fakes.HTTPRequest.blank('/v1/segments', use_admin_context=True,
+                                      version='1.5')
+        self.controller.index(req)
+        self.assertTrue(mock_get_all.call_args[1]['with_stats'])
+
     @mock.patch.object(ha_api.FailoverSegmentAPI, 'get_all')
     def test_index_marker_not_found(self, mock_get_all):
         fake_request = fakes.HTTPRequest.blank('/v1/segments?marker=12345',
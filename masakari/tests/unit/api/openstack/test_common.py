@@ -17,6 +17,8 @@
 Test suites for 'common' code used throughout the OpenStack HTTP API.
 """
 
+import datetime
+
 from testtools import matchers
 from unittest import mock
 
@@ -26,6 +28,7 @@ from masakari.api.openstack import common
 from masakari import test
 from masakari.tests.unit.api.openstack import fakes
 from masakari.tests import uuidsentinel
+from masakari import utils
 
 
 class MiscFunctionsTest(test.TestCase):
@@ -142,6 +145,60 @@ class TestCollectionLinks(test.NoDBTestCase):
                                                mock.sentinel.coll_key)
         self.assertThat(results, matchers.HasLength(1))
 
+    @mock.patch('masakari.api.openstack.common.ViewBuilder._get_next_link')
+    def test_items_equals_given_limit_with_sort_keys(self, href_link_mock):
+        items = [
+            {"uuid": "123", "id": 1, "name": "fake",
+             "created_at": datetime.datetime(2016, 10, 13, 9, 11, 21)}
+        ]
+        req = mock.MagicMock()
+        params = mock.PropertyMock(return_value=dict(limit=1))
+        type(req).params = params
+
+        builder = common.ViewBuilder()
+        results = builder._get_collection_links(req, items,
+                                                mock.sentinel.coll_key,
+                                                "uuid", sort_keys=["name"])
+
+        marker = utils.encode_cursor({"created_at": "2016-10-13T09:11:21",
+                                      "id": 1, "name": "fake"})
+        href_link_mock.assert_called_once_with(req, marker,
+                                               mock.sentinel.coll_key)
+        self.assertThat(results, matchers.HasLength(1))
+
+    @mock.patch('masakari.api.openstack.common.ViewBuilder._get_next_link')
+    def test_items_without_sort_key_values(self, href_link_mock):
+        items = [
+            {"uuid": "123", "id": 1}
+        ]
+        req = mock.MagicMock()
+        params = mock.PropertyMock(return_value=dict(limit=1))
+        type(req).params = params
+
+        builder = common.ViewBuilder()
+        builder._get_collection_links(req, items, mock.sentinel.coll_key,
+                                      "uuid", sort_keys=["name"])
+
+        href_link_mock.assert_called_once_with(req, "123",
+                                               mock.sentinel.coll_key)
+
+    @mock.patch('masakari.api.openstack.common.ViewBuilder._get_next_link')
+    def test_items_with_null_sort_key_value(self, href_link_mock):
+        items = [
+            {"uuid": "123", "id": 1, "updated_at": None,
+             "created_at": datetime.datetime(2016, 10, 13, 9, 11, 21)}
+        ]
+        req = mock.MagicMock()
+        params = mock.PropertyMock(return_value=dict(limit=1))
+        type(req).params = params
+
+        builder = common.ViewBuilder()
+        builder._get_collection_links(req, items, mock.sentinel.coll_key,
+                                      "uuid", sort_keys=["updated_at"])
+
+        href_link_mock.assert_called_once_with(req, "123",
+                                               mock.sentinel.coll_key)
+
 
 class LinkPrefixTest(test.NoDBTestCase):
 
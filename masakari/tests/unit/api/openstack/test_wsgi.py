@@ -1044,3 +1044,69 @@ class TestController(test.NoDBTestCase):
             wsgi.Controller.check_for_versions_intersection(func_list=func_list
                                                             ))
         self.assertTrue(result)
+
+    def _get_versioned_controller(self):
+        class Controller(wsgi.Controller):
+            @wsgi.Controller.api_version('1.0', '1.1')
+            def index(self, req):
+                return 'index 1.0'
+
+            @wsgi.Controller.api_version('1.3')  # noqa
+            @wsgi.response(http.ACCEPTED)
+            def index(self, req):  # noqa
+                return 'index 1.3'
+
+            def show(self, req, id):
+                return 'show'
+
+        return Controller()
+
+    def _get_request(self, version):
+        return fakes.HTTPRequest.blank('/tests', version=version)
+
+    def test_versioned_method_dispatch(self):
+        controller = self._get_versioned_controller()
+
+        for version in ('1.0', '1.1'):
+            self.assertEqual('index 1.0',
+                             controller.index(self._get_request(version)))
+        for version in ('1.3', '1.9', '2.0'):
+            index = controller.index
+            self.assertEqual('index 1.3', index(self._get_request(version)))
+            self.assertEqual(http.ACCEPTED, index.wsgi_code)
+        self.assertEqual('index 1.3',
+                         controller.index(req=self._get_request('1.3')))
+
+    def test_versioned_method_dispatch_version_not_found(self):
+        controller = self._get_versioned_controller()
+
+        self.assertRaises(exception.VersionNotFoundForAPIMethod,
+                          controller.index, self._get_request('1.2'))
+
+    def test_versioned_method_dispatch_intersecting_versions(self):
+        def _versioned_method(name, min_ver, max_ver):
+            return versioned_method.VersionedMethod(
+                name, api_version.APIVersionRequest(min_ver),
+                api_version.APIVersionRequest(max_ver),
+                lambda controller, req: name)
+
+        # Sorted by descending start version, as registered by api_version
+        dispatcher = wsgi.VersionedMethodDispatcher(
+            'index', [_versioned_method('B', '1.2', '1.3'),
+                      _versioned_method('A', '1.0', '1.5')])
+
+        for version, name in (('1.0', 'A'), ('1.2', 'B'), ('1.3', 'B'),
+                              ('1.4', 'A'), ('1.5', 'A')):
+            func = dispatcher.select(api_version.APIVersionRequest(version))
+            self.assertEqual(name, func(None, None))
+        self.assertRaises(exception.VersionNotFoundForAPIMethod,
+                          dispatcher.select,
+                          api_version.APIVersionRequest('1.6'))
+
+    def test_not_versioned_method(self):
+        controller = self._get_versioned_controller()
+
+        self.assertEqual('show', controller.show(self._get_request('1.0'), 1))
+        self.assertIsInstance(
+            type(controller).__dict__['index'],
+            wsgi.VersionedMethodDispatcher)
@@ -14,9 +14,12 @@
 
 from http import client as http
 from unittest import mock
+from urllib import parse
 
 from keystoneauth1 import exceptions as keystone_exception
+from novaclient import base as novaclient_base
 from novaclient import exceptions as nova_exception
+from novaclient.v2 import servers
 
 from masakari.compute import nova
 from masakari import context
@@ -41,6 +44,8 @@ class NovaClientTestCase(test.TestCase):
         self.override_config('os_privileged_user_password', 'strongpassword')
         self.override_config('os_privileged_user_auth_url',
                              'http://keystonehost/identity')
+        nova.reset_session_cache()
+        self.addCleanup(nova.reset_session_cache)
 
     @mock.patch('novaclient.api_versions.APIVersion')
     @mock.patch('novaclient.client.Client')
@@ -125,6 +130,44 @@ class NovaClientTestCase(test.TestCase):
             cacert=None, timeout=None, global_request_id=self.ctx.global_id,
             extensions=nova.nova_extensions)
 
+    @mock.patch('novaclient.api_versions.APIVersion')
+    @mock.patch('novaclient.client.Client')
+    @mock.patch('keystoneauth1.loading.get_plugin_loader')
+    @mock.patch('keystoneauth1.session.Session')
+    def test_nova_client_reuses_session(self, p_session, p_plugin_loader,
+                                        p_client, p_api_version):
+        nova.novaclient(self.ctx)
+        nova.novaclient(self.ctx)
+
+        p_plugin_loader.return_value.load_from_options.assert_called_once()
+        p_session.assert_called_once()
+        self.assertEqual(2, p_client.call_count)
+        for call in p_client.call_args_list:
+            self.assertEqual(p_session.return_value, call[1]['session'])
+
+    @mock.patch('novaclient.api_versions.APIVersion')
+    @mock.patch('novaclient.client.Client')
+    @mock.patch('keystoneauth1.loading.get_plugin_loader')
+    @mock.patch('keystoneauth1.session.Session')
+    def test_nova_client_new_session_on_credentials_change(
+            self, p_session, p_plugin_loader, p_client, p_api_version):
+        nova.novaclient(self.ctx)
+        self.override_config('os_privileged_user_password', 'newpassword')
+        nova.novaclient(self.ctx)
+
+        self.assertEqual(2, p_session.call_count)
+
+    @mock.patch('novaclient.client.Client')
+    @mock.patch('keystoneauth1.loading.get_plugin_loader')
+    def test_nova_client_session_connection_pool(self, p_plugin_loader,
+                                                 p_client):
+        self.override_config('host_failure_recovery_threads', 20)
+        nova.novaclient(self.ctx)
+
+        session = p_client.call_args[1]['session']
+        adapter = session.session.get_adapter('https://novahost')
+        self.assertEqual(21, adapter._pool_maxsize)
+
 
 class NovaApiTestCase(test.TestCase):
     def setUp(self):
@@ -177,6 +220,39 @@ class NovaApiTestCase(test.TestCase):
         mock_servers.list.assert_called_once_with(
             detailed=True, search_opts={'host': 'fake', 'all_tenants': True})
 
+    @mock.patch('masakari.compute.nova.novaclient')
+    def test_get_servers_changed_since(self, mock_novaclient):
+        changes_since = '2016-01-01T00:00:00'
+        mock_servers = mock.MagicMock()
+        mock_novaclient.return_value = mock.MagicMock(servers=mock_servers)
+        self.api.get_servers_changed_since(self.ctx, changes_since)
+
+        mock_novaclient.assert_called_once_with(self.ctx)
+        mock_servers.list.assert_called_once_with(
+            detailed=True, search_opts={'changes-since': changes_since,
+                                        'all_tenants': True}, limit=-1)
+
+    @mock.patch('masakari.compute.nova.novaclient')
+    def test_get_servers_changed_since_several_pages(self, mock_novaclient):
+        pages = {None: [mock.Mock(id='1'), mock.Mock(id='2')],
+                 '2': [mock.Mock(id='3')],
+                 '3': []}
+
+        def fake_list(url, response_key):
+            marker = parse.parse_qs(parse.urlsplit(url).query).get('marker')
+            return novaclient_base.ListWithMeta(
+                pages[marker[0] if marker else None], None)
+
+        server_manager = servers.ServerManager(mock.Mock())
+        mock_novaclient.return_value = mock.Mock(servers=server_manager)
+        with mock.patch.object(server_manager, '_list',
+                               side_effect=fake_list):
+            result = self.api.get_servers_changed_since(
+                self.ctx, '2016-01-01T00:00:00')
+
+        # the server of the second page is returned too
+        self.assertEqual(['1', '2', '3'], [server.id for server in result])
+
     @mock.patch('masakari.compute.nova.novaclient')
     def test_enable_disable_service_enable(self, mock_novaclient):
         host = 'fake'
@@ -229,6 +305,27 @@ class NovaApiTestCase(test.TestCase):
         mock_services.list.assert_called_once_with(binary='nova-compute',
                                                    host='fake')
 
+    @mock.patch('masakari.compute.nova.novaclient')
+    def test_is_compute_service_reported_down(self, mock_novaclient):
+        mock_services = mock.MagicMock()
+        mock_novaclient.return_value = mock.MagicMock(services=mock_services)
+        mock_services.list.return_value = [
+            mock.MagicMock(state='up', forced_down=False)]
+        self.assertFalse(
+            self.api.is_compute_service_reported_down(self.ctx, 'fake'))
+
+        mock_services.list.return_value = [
+            mock.MagicMock(state='down', forced_down=False)]
+        self.assertTrue(
+            self.api.is_compute_service_reported_down(self.ctx, 'fake'))
+
+        mock_services.list.return_value = [
+            mock.MagicMock(state='up', forced_down=True)]
+        self.assertTrue(
+            self.api.is_compute_service_reported_down(self.ctx, 'fake'))
+        mock_services.list.assert_called_with(binary='nova-compute',
+                                              host='fake')
+
     @mock.patch('masakari.compute.nova.novaclient')
     def test_evacuate_instance(self, mock_novaclient):
         uuid = uuidsentinel.fake_server
@@ -270,6 +367,16 @@ class NovaApiTestCase(test.TestCase):
         mock_novaclient.assert_called_once_with(self.ctx)
         self.assertTrue(mock_aggregates.list.called)
 
+    @mock.patch('masakari.compute.nova.novaclient')
+    def test_get_hypervisor_list(self, mock_novaclient):
+        mock_hypervisors = mock.MagicMock()
+        mock_novaclient.return_value = mock.MagicMock(
+            hypervisors=mock_hypervisors)
+        self.api.get_hypervisor_list(self.ctx)
+
+        mock_novaclient.assert_called_once_with(self.ctx)
+        mock_hypervisors.list.assert_called_once_with()
+
     @mock.patch('masakari.compute.nova.novaclient')
     def test_add_host_to_aggregate(self, mock_novaclient):
         mock_aggregate = mock.MagicMock()
@@ -318,6 +425,18 @@ class NovaApiTestCase(test.TestCase):
         mock_services.list.assert_called_once_with(host=host,
                                                    binary='nova-compute')
 
+    @mock.patch('masakari.compute.nova.novaclient')
+    def test_get_compute_service_hosts(self, mock_novaclient):
+        mock_services = mock.MagicMock()
+        mock_novaclient.return_value = mock.MagicMock(services=mock_services)
+        mock_services.list.return_value = [mock.MagicMock(host='host-1'),
+                                           mock.MagicMock(host='host-2')]
+
+        self.assertEqual({'host-1', 'host-2'},
+                         self.api.get_compute_service_hosts(self.ctx))
+        mock_novaclient.assert_called_once_with(self.ctx)
+        mock_services.list.assert_called_once_with(binary='nova-compute')
+
     @mock.patch('masakari.compute.nova.novaclient')
     def test_find_compute_service_existing_host_name(self, mock_novaclient):
         host = 'fake'
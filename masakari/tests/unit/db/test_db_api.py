@@ -12,17 +12,56 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 """Unit tests for the DB API."""
+import datetime
+from unittest import mock
+
+from oslo_db.sqlalchemy import enginefacade
 from oslo_utils import timeutils
+import sqlalchemy
 
 from masakari import context
 from masakari import db
+from masakari.db.sqlalchemy import api as sqlalchemy_api
 from masakari import exception
 from masakari import test
+from masakari import utils
 from masakari.tests import uuidsentinel
 
 NOW = timeutils.utcnow().replace(microsecond=0)
 
 
+@sqlalchemy_api.select_db_reader_mode
+def _get_reader_mode(context, use_slave=False):
+    return context.transaction_ctx.mode
+
+
+class SelectDbReaderModeTestCase(test.TestCase):
+
+    def setUp(self):
+        super(SelectDbReaderModeTestCase, self).setUp()
+        self.ctxt = context.get_admin_context()
+
+    def test_select_db_reader_mode_default(self):
+        self.assertIs(enginefacade._READER, _get_reader_mode(self.ctxt))
+
+    def test_select_db_reader_mode_use_slave(self):
+        self.assertIs(enginefacade._ASYNC_READER,
+                      _get_reader_mode(self.ctxt, use_slave=True))
+
+    def test_notifications_get_all_by_filters_use_slave(self):
+        db.notification_create(self.ctxt, {
+            'notification_uuid': uuidsentinel.notification,
+            'generated_time': NOW, 'source_host_uuid': uuidsentinel.host,
+            'type': 'VM', 'payload': 'fake_payload', 'status': 'new'})
+
+        # Without slave_connection, the async reader uses the main database
+        notifications = db.notifications_get_all_by_filters(self.ctxt,
+                                                            use_slave=True)
+
+        self.assertEqual([uuidsentinel.notification],
+                         [n['notification_uuid'] for n in notifications])
+
+
 class ModelsObjectComparatorMixin(object):
     def _dict_from_object(self, obj, ignored_keys):
         if ignored_keys is None:
@@ -62,7 +101,8 @@ class FailoverSegmentsTestCase(test.TestCase, ModelsObjectComparatorMixin):
             'name': 'fake_name',
             'service_type': 'fake_service_type',
             'description': 'fake_description',
-            'recovery_method': 'auto'
+            'recovery_method': 'auto',
+            'active_notifications': 0
         }
 
     def _get_fake_values_list(self):
@@ -110,7 +150,8 @@ class FailoverSegmentsTestCase(test.TestCase, ModelsObjectComparatorMixin):
                    'name': 'updated_name',
                    'service_type': 'fake_service_type',
                    'description': 'updated_desc',
-                   'recovery_method': 'auto'}
+                   'recovery_method': 'auto',
+                   'active_notifications': 0}
         ignored_keys = ['deleted', 'created_at', 'updated_at', 'deleted_at',
                         'id']
         self._create_failover_segment(self._get_fake_values())
@@ -142,6 +183,44 @@ class FailoverSegmentsTestCase(test.TestCase, ModelsObjectComparatorMixin):
         self._assertEqualListsOfObjects([failover_segments[1]],
                                         real_failover_segment, ignored_keys)
 
+    def test_failover_segment_get_all_by_filters_with_stats(self):
+        for p in self._get_fake_values_list():
+            self._create_failover_segment(p)
+        hosts = [
+            {'uuid': uuidsentinel.host_1, 'reserved': True,
+             'on_maintenance': False},
+            {'uuid': uuidsentinel.host_2, 'reserved': True,
+             'on_maintenance': True},
+            {'uuid': uuidsentinel.host_3, 'reserved': False,
+             'on_maintenance': False},
+            {'uuid': uuidsentinel.host_4, 'reserved': True,
+             'on_maintenance': True}]
+        for host in hosts:
+            host.update({'name': host['uuid'], 'type': 'fake_type',
+                         'control_attributes': 'fake_control_attr',
+                         'failover_segment_id': uuidsentinel.uuid_1})
+            db.host_create(self.ctxt, host)
+        db.host_delete(self.ctxt, uuidsentinel.host_4)
+        db.failover_segment_update(self.ctxt, uuidsentinel.uuid_1,
+                                   {'active_notifications': 2})
+
+        real_failover_segments = db.failover_segment_get_all_by_filters(
+            context=self.ctxt, sort_keys=['id'], sort_dirs=['asc'],
+            with_stats=True)
+
+        self.assertEqual(
+            [(3, 2, 1, 2), (0, 0, 0, 0), (0, 0, 0, 0)],
+            [(s['host_count'], s['reserved_host_count'],
+              s['on_maintenance_host_count'], s['active_notification_count'])
+             for s in real_failover_segments])
+
+        real_failover_segments = db.failover_segment_get_all_by_filters(
+            context=self.ctxt, sort_keys=['id'], sort_dirs=['asc'],
+            limit=1, marker=1, with_stats=True)
+        self.assertEqual([(uuidsentinel.uuid_2, 0)],
+                         [(s['uuid'], s['host_count'])
+                          for s in real_failover_segments])
+
     def test_failover_segment_not_found(self):
         self._create_failover_segment(self._get_fake_values())
         self.assertRaises(exception.FailoverSegmentNotFound,
@@ -324,6 +403,108 @@ class HostsTestCase(test.TestCase, ModelsObjectComparatorMixin):
             sort_dirs=['asc'])
         self._assertEqualListsOfObjects([hosts[1]], real_host, ignored_keys)
 
+    def test_host_get_all_by_filters_name(self):
+        hosts = [self._create_host(p) for p in self._get_fake_values_list()]
+        ignored_keys = ['deleted', 'created_at', 'updated_at', 'deleted_at',
+                        'id', 'failover_segment']
+        real_hosts = db.host_get_all_by_filters(
+            context=self.ctxt,
+            filters={'name': ['name_1', 'name_3', 'unknown']},
+            sort_keys=['id'], sort_dirs=['asc'])
+        self._assertEqualListsOfObjects([hosts[0], hosts[2]], real_hosts,
+                                        ignored_keys)
+
+    def test_host_get_all_by_filters_uuid(self):
+        hosts = [self._create_host(p) for p in self._get_fake_values_list()]
+        ignored_keys = ['deleted', 'created_at', 'updated_at', 'deleted_at',
+                        'id', 'failover_segment']
+        real_hosts = db.host_get_all_by_filters(
+            context=self.ctxt,
+            filters={'uuid': [uuidsentinel.uuid_2, uuidsentinel.uuid_4]})
+        self._assertEqualListsOfObjects([hosts[1]], real_hosts,
+                                        ignored_keys)
+
+    def test_hosts_create(self):
+        values_list = self._get_fake_values_list()
+        for values in values_list:
+            del values['id']
+
+        hosts = db.hosts_create(self.ctxt, list(reversed(values_list)))
+
+        ignored_keys = ['deleted', 'created_at', 'updated_at', 'deleted_at',
+                        'id', 'failover_segment']
+        # the hosts are returned in the order they were given
+        self._assertEqualListsOfObjects(list(reversed(values_list)), hosts,
+                                        ignored_keys)
+        self.assertEqual(
+            [uuidsentinel.failover_segment_id] * 3,
+            [host.failover_segment.uuid for host in hosts])
+
+    def test_hosts_create_duplicate_name(self):
+        self._create_host(self._get_fake_values())
+        values_list = self._get_fake_values_list()
+        for values in values_list:
+            del values['id']
+        values_list[2]['name'] = 'fake_name'
+
+        self.assertRaises(exception.HostExists, db.hosts_create, self.ctxt,
+                          values_list)
+        # none of the hosts is created
+        self.assertEqual(1, len(db.host_get_all_by_filters(self.ctxt)))
+
+    def test_hosts_update(self):
+        for p in self._get_fake_values_list():
+            self._create_host(p)
+
+        hosts = db.hosts_update(self.ctxt, {
+            uuidsentinel.uuid_3: {'on_maintenance': False},
+            uuidsentinel.uuid_1: {'name': 'updated_name', 'reserved': False}})
+
+        self.assertEqual([uuidsentinel.uuid_3, uuidsentinel.uuid_1],
+                         [host.uuid for host in hosts])
+        host_1 = db.host_get_by_uuid(self.ctxt, uuidsentinel.uuid_1)
+        self.assertEqual('updated_name', host_1.name)
+        self.assertFalse(host_1.reserved)
+        self.assertFalse(db.host_get_by_uuid(
+            self.ctxt, uuidsentinel.uuid_3).on_maintenance)
+        self.assertTrue(db.host_get_by_uuid(
+            self.ctxt, uuidsentinel.uuid_2).on_maintenance)
+
+    def test_hosts_update_not_found(self):
+        for p in self._get_fake_values_list():
+            self._create_host(p)
+
+        self.assertRaises(exception.HostNotFound, db.hosts_update, self.ctxt,
+                          {uuidsentinel.uuid_1: {'on_maintenance': False},
+                           uuidsentinel.uuid_4: {'on_maintenance': False}})
+        # none of the hosts is updated
+        self.assertTrue(db.host_get_by_uuid(
+            self.ctxt, uuidsentinel.uuid_1).on_maintenance)
+
+    def test_hosts_update_duplicate_name(self):
+        for p in self._get_fake_values_list():
+            self._create_host(p)
+
+        self.assertRaises(exception.HostExists, db.hosts_update, self.ctxt,
+                          {uuidsentinel.uuid_1: {'type': 'updated_type'},
+                           uuidsentinel.uuid_2: {'name': 'name_3'}})
+        # none of the hosts is updated
+        self.assertEqual('type_1', db.host_get_by_uuid(
+            self.ctxt, uuidsentinel.uuid_1).type)
+
+    def test_host_get_all_by_filters_loads_segments(self):
+        for p in self._get_fake_values_list():
+            self._create_host(p)
+
+        real_hosts = db.host_get_all_by_filters(context=self.ctxt)
+
+        self.assertEqual(3, len(real_hosts))
+        # the segments are loaded, once for the hosts of a segment
+        self.assertEqual({uuidsentinel.failover_segment_id},
+                         {h.failover_segment.uuid for h in real_hosts})
+        self.assertEqual(1, len({id(h.failover_segment)
+                                 for h in real_hosts}))
+
     def test_host_get_all_by_filter_on_maintenance(self):
         for p in self._get_fake_values_list():
             # create temporary reserved_hosts, all are on maintenance
@@ -395,7 +576,10 @@ class NotificationsTestCase(test.TestCase, ModelsObjectComparatorMixin):
             'source_host_uuid': uuidsentinel.source_host,
             'type': 'fake_type',
             'payload': 'fake_payload',
-            'status': 'new'
+            'status': 'new',
+            'claimed_by': None,
+            'lease_expires_at': None,
+            'payload_hash': None
         }
 
     def _get_fake_values_list(self):
@@ -445,7 +629,10 @@ class NotificationsTestCase(test.TestCase, ModelsObjectComparatorMixin):
                    'source_host_uuid': uuidsentinel.source_host,
                    'type': 'updated_type',
                    'payload': 'updated_payload',
-                   'status': 'new'}
+                   'status': 'new',
+                   'claimed_by': None,
+                   'lease_expires_at': None,
+                   'payload_hash': None}
         ignored_keys = ['deleted', 'created_at', 'updated_at', 'deleted_at',
                         'id']
         self._create_notification(self._get_fake_values())
@@ -477,6 +664,333 @@ class NotificationsTestCase(test.TestCase, ModelsObjectComparatorMixin):
         self._assertEqualListsOfObjects([notifications[1]],
                                         real_notification, ignored_keys)
 
+    def test_notification_get_all_by_filters_archived(self):
+        notifications = [self._create_notification(p)
+                         for p in self._get_fake_values_list()]
+        db.notification_update(self.ctxt, uuidsentinel.notification_3,
+                               {'payload': 'updated_payload'})
+        with mock.patch.object(timeutils, 'utcnow', return_value=(
+                NOW + datetime.timedelta(days=2))):
+            self.assertEqual(1, db.archive_notifications(self.ctxt, 1))
+
+        real_notifications = db.notifications_get_all_by_filters(
+            context=self.ctxt)
+        self.assertEqual([2, 1], [n['id'] for n in real_notifications])
+        real_notifications = db.notifications_get_all_by_filters(
+            context=self.ctxt, filters={'archived': True,
+                                        'status': 'failed'})
+        self._assertEqualListsOfObjects(
+            [notifications[2]], real_notifications,
+            ['updated_at', 'payload'])
+        self.assertRaises(exception.NotificationNotFound,
+                          db.notification_get_by_uuid, self.ctxt,
+                          uuidsentinel.notification_3)
+
+    def test_notification_get_all_by_filters_with_columns(self):
+        for p in self._get_fake_values_list():
+            self._create_notification(p)
+
+        real_notifications = db.notifications_get_all_by_filters(
+            context=self.ctxt, filters={'status': 'new'},
+            sort_keys=['generated_time'], columns=['notification_uuid'])
+
+        self.assertEqual([uuidsentinel.notification_2,
+                          uuidsentinel.notification_1],
+                         [n['notification_uuid'] for n in real_notifications])
+        # the columns of the cursor are read too, not the other ones
+        for notification in real_notifications:
+            self.assertEqual(
+                {'payload', 'payload_hash', 'source_host_uuid', 'type',
+                 'status', 'claimed_by', 'lease_expires_at', 'updated_at',
+                 'deleted_at', 'deleted'},
+                sqlalchemy.inspect(notification).unloaded)
+
+    def _get_cursor(self, notification, keys=('created_at', 'id')):
+        return utils.encode_cursor({key: notification[key] for key in keys})
+
+    def test_notification_get_all_by_filters_with_cursor(self):
+        notifications = [self._create_notification(p)
+                         for p in self._get_fake_values_list()]
+        real_notifications = db.notifications_get_all_by_filters(
+            context=self.ctxt,
+            marker=self._get_cursor(notifications[2]))
+        self.assertEqual([2, 1], [n['id'] for n in real_notifications])
+
+    def test_notification_get_all_by_filters_with_cursor_mixed_dirs(self):
+        notifications = [self._create_notification(p)
+                         for p in self._get_fake_values_list()]
+        real_notifications = db.notifications_get_all_by_filters(
+            context=self.ctxt,
+            marker=self._get_cursor(notifications[0],
+                                    keys=('status', 'created_at', 'id')),
+            sort_keys=['status', 'id'],
+            sort_dirs=['desc', 'asc'])
+        self.assertEqual([2, 3], [n['id'] for n in real_notifications])
+
+    def test_notification_get_all_by_filters_with_cursor_missing_key(self):
+        notifications = [self._create_notification(p)
+                         for p in self._get_fake_values_list()]
+        self.assertRaises(exception.MarkerNotFound,
+                          db.notifications_get_all_by_filters,
+                          context=self.ctxt,
+                          marker=self._get_cursor(notifications[0]),
+                          sort_keys=['status'])
+
+    def _test_notification_get_all_by_filters_with_malformed_cursor(
+            self, values, sort_keys=None):
+        for p in self._get_fake_values_list():
+            self._create_notification(p)
+        self.assertRaises(exception.MarkerNotFound,
+                          db.notifications_get_all_by_filters,
+                          context=self.ctxt,
+                          marker=utils.encode_cursor(values),
+                          sort_keys=sort_keys)
+
+    def test_notification_get_all_by_filters_with_cursor_invalid_integer(
+            self):
+        self._test_notification_get_all_by_filters_with_malformed_cursor(
+            {'created_at': '2016-10-13T09:11:21', 'id': {'a': 1}})
+
+    def test_notification_get_all_by_filters_with_cursor_non_numeric_id(
+            self):
+        self._test_notification_get_all_by_filters_with_malformed_cursor(
+            {'created_at': '2016-10-13T09:11:21', 'id': 'abc'})
+
+    def test_notification_get_all_by_filters_with_cursor_boolean_id(self):
+        self._test_notification_get_all_by_filters_with_malformed_cursor(
+            {'created_at': '2016-10-13T09:11:21', 'id': True})
+
+    def test_notification_get_all_by_filters_with_cursor_null_datetime(
+            self):
+        self._test_notification_get_all_by_filters_with_malformed_cursor(
+            {'created_at': None, 'id': 1})
+
+    def test_notification_get_all_by_filters_with_cursor_invalid_datetime(
+            self):
+        self._test_notification_get_all_by_filters_with_malformed_cursor(
+            {'created_at': 1476349881, 'id': 1})
+
+    def test_notification_get_all_by_filters_with_cursor_invalid_string(
+            self):
+        self._test_notification_get_all_by_filters_with_malformed_cursor(
+            {'status': ['new'], 'created_at': '2016-10-13T09:11:21',
+             'id': 1}, sort_keys=['status'])
+
+    def test_notification_duplicate_exists(self):
+        values = self._get_fake_values()
+        values['payload_hash'] = 'fake_hash'
+        self._create_notification(values)
+
+        def _duplicate_exists(source_host_uuid=uuidsentinel.source_host,
+                              type='fake_type', payload_hash='fake_hash',
+                              generated_since=NOW):
+            return db.notification_duplicate_exists(
+                self.ctxt, source_host_uuid, type, payload_hash,
+                generated_since)
+
+        self.assertTrue(_duplicate_exists())
+        self.assertFalse(_duplicate_exists(payload_hash='other_hash'))
+        self.assertFalse(_duplicate_exists(type='other_type'))
+        self.assertFalse(_duplicate_exists(
+            source_host_uuid=uuidsentinel.other_host))
+        self.assertFalse(_duplicate_exists(
+            generated_since=NOW + datetime.timedelta(seconds=1)))
+
+    def test_notifications_get_generated_since(self):
+        for values in self._get_fake_values_list():
+            values['payload_hash'] = 'fake_hash'
+            self._create_notification(values)
+
+        def _generated_since(source_host_uuids=(uuidsentinel.s_host_1,
+                                                uuidsentinel.s_host_3),
+                             payload_hashes=('fake_hash',),
+                             generated_since=NOW):
+            return db.notifications_get_generated_since(
+                self.ctxt, source_host_uuids, payload_hashes,
+                generated_since)
+
+        self.assertEqual(
+            sorted([(uuidsentinel.s_host_1, 'fake_type', 'fake_hash', NOW),
+                    (uuidsentinel.s_host_3, 'fake_type', 'fake_hash', NOW)]),
+            sorted(_generated_since()))
+        self.assertEqual([], _generated_since(
+            payload_hashes=['other_hash']))
+        self.assertEqual([], _generated_since(
+            generated_since=NOW + datetime.timedelta(seconds=1)))
+
+    def test_notifications_create(self):
+        values_list = self._get_fake_values_list()
+        for values in values_list:
+            del values['id']
+
+        notifications = db.notifications_create(self.ctxt,
+                                                list(reversed(values_list)))
+
+        ignored_keys = ['deleted', 'created_at', 'updated_at', 'deleted_at',
+                        'id', 'claimed_by', 'lease_expires_at',
+                        'payload_hash']
+        # the notifications are returned in the order they were given
+        for values, notification in zip(reversed(values_list),
+                                        notifications):
+            self.assertIsNotNone(notification['id'])
+            self._assertEqualObjects(values, notification, ignored_keys)
+        self.assertEqual(3, len(db.notifications_get_all_by_filters(
+            self.ctxt)))
+
+    def test_notification_update_status(self):
+        self._create_notification(self._get_fake_values())
+
+        self.assertTrue(db.notification_update_status(
+            self.ctxt, uuidsentinel.notification, 'running', 'new'))
+        # a second transition from new is lost
+        self.assertFalse(db.notification_update_status(
+            self.ctxt, uuidsentinel.notification, 'running', 'new'))
+        self.assertTrue(db.notification_update_status(
+            self.ctxt, uuidsentinel.notification, 'failed',
+            ['new', 'running', 'error']))
+
+        notification = db.notification_get_by_uuid(
+            self.ctxt, uuidsentinel.notification)
+        self.assertEqual('failed', notification['status'])
+
+    def test_notifications_update_status_by_filters(self):
+        for values in self._get_fake_values_list():
+            self._create_notification(values)
+
+        updated = db.notifications_update_status_by_filters(
+            self.ctxt, {'status': ['new', 'running'],
+                        'generated-before': timeutils.utcnow()}, 'failed')
+
+        self.assertEqual(
+            {uuidsentinel.notification_1, uuidsentinel.notification_2},
+            {n['notification_uuid'] for n in updated})
+        self.assertEqual(['failed', 'failed'], [n['status'] for n in updated])
+        notifications = db.notifications_get_all_by_filters(
+            self.ctxt, filters={'status': 'failed'})
+        self.assertEqual(3, len(notifications))
+
+    def test_notifications_update_status_by_filters_uuids(self):
+        for values in self._get_fake_values_list():
+            self._create_notification(values)
+
+        updated = db.notifications_update_status_by_filters(
+            self.ctxt, {'notification_uuid': [uuidsentinel.notification_1,
+                                              uuidsentinel.notification_3],
+                        'status': 'new'}, 'failed')
+
+        self.assertEqual([uuidsentinel.notification_1],
+                         [n['notification_uuid'] for n in updated])
+        notification = db.notification_get_by_uuid(
+            self.ctxt, uuidsentinel.notification_2)
+        self.assertEqual('new', notification['status'])
+
+    def test_notifications_update_status_by_filters_no_match(self):
+        for values in self._get_fake_values_list():
+            self._create_notification(values)
+
+        self.assertEqual([], db.notifications_update_status_by_filters(
+            self.ctxt, {'status': 'running'}, 'failed'))
+
+    def test_notification_claim(self):
+        self._create_notification(self._get_fake_values())
+
+        self.assertTrue(db.notification_claim(
+            self.ctxt, uuidsentinel.notification, 'engine-1', 60))
+        notification = db.notification_get_by_uuid(
+            self.ctxt, uuidsentinel.notification)
+        self.assertEqual('engine-1', notification['claimed_by'])
+        self.assertGreater(notification['lease_expires_at'], NOW)
+
+        # claiming again extends the lease of the owner
+        self.assertTrue(db.notification_claim(
+            self.ctxt, uuidsentinel.notification, 'engine-1', 60))
+
+    def test_notification_claim_held_by_another_engine(self):
+        self._create_notification(self._get_fake_values())
+        db.notification_claim(self.ctxt, uuidsentinel.notification,
+                              'engine-1', 60)
+
+        self.assertFalse(db.notification_claim(
+            self.ctxt, uuidsentinel.notification, 'engine-2', 60))
+        self.assertFalse(db.notification_renew_lease(
+            self.ctxt, uuidsentinel.notification, 'engine-2', 60))
+        self.assertFalse(db.notification_release(
+            self.ctxt, uuidsentinel.notification, 'engine-2'))
+        notification = db.notification_get_by_uuid(
+            self.ctxt, uuidsentinel.notification)
+        self.assertEqual('engine-1', notification['claimed_by'])
+
+    def test_notification_claim_expired_lease(self):
+        self._create_notification(self._get_fake_values())
+        db.notification_claim(self.ctxt, uuidsentinel.notification,
+                              'engine-1', -1)
+
+        self.assertTrue(db.notification_claim(
+            self.ctxt, uuidsentinel.notification, 'engine-2', 60))
+        self.assertFalse(db.notification_renew_lease(
+            self.ctxt, uuidsentinel.notification, 'engine-1', 60))
+        notification = db.notification_get_by_uuid(
+            self.ctxt, uuidsentinel.notification)
+        self.assertEqual('engine-2', notification['claimed_by'])
+
+    def test_notification_update_status_claimed_by(self):
+        self._create_notification(self._get_fake_values())
+        db.notification_claim(self.ctxt, uuidsentinel.notification,
+                              'engine-1', -1)
+        self.assertTrue(db.notification_claim(
+            self.ctxt, uuidsentinel.notification, 'engine-2', 60))
+
+        # the engine which has lost the lease can't change the status
+        self.assertFalse(db.notification_update_status(
+            self.ctxt, uuidsentinel.notification, 'running', 'new',
+            claimed_by='engine-1'))
+        self.assertTrue(db.notification_update_status(
+            self.ctxt, uuidsentinel.notification, 'running', 'new',
+            claimed_by='engine-2'))
+        self.assertEqual('running', db.notification_get_by_uuid(
+            self.ctxt, uuidsentinel.notification)['status'])
+
+    def test_notification_release_not_claimed_by(self):
+        self._create_notification(self._get_fake_values())
+        db.notification_claim(self.ctxt, uuidsentinel.notification,
+                              'engine-2', 60)
+
+        self.assertFalse(db.notification_release(
+            self.ctxt, uuidsentinel.notification, 'engine-1'))
+        self.assertEqual('engine-2', db.notification_get_by_uuid(
+            self.ctxt, uuidsentinel.notification)['claimed_by'])
+
+    def test_notification_renew_lease_and_release(self):
+        self._create_notification(self._get_fake_values())
+        db.notification_claim(self.ctxt, uuidsentinel.notification,
+                              'engine-1', -1)
+
+        self.assertTrue(db.notification_renew_lease(
+            self.ctxt, uuidsentinel.notification, 'engine-1', 60))
+        self.assertFalse(db.notification_claim(
+            self.ctxt, uuidsentinel.notification, 'engine-2', 60))
+
+        self.assertTrue(db.notification_release(
+            self.ctxt, uuidsentinel.notification, 'engine-1'))
+        notification = db.notification_get_by_uuid(
+            self.ctxt, uuidsentinel.notification)
+        self.assertIsNone(notification['claimed_by'])
+        self.assertIsNone(notification['lease_expires_at'])
+
+    def test_notification_get_all_by_filters_lease_expired(self):
+        for values in self._get_fake_values_list():
+            self._create_notification(values)
+        db.notification_claim(self.ctxt, uuidsentinel.notification_1,
+                              'engine-1', -1)
+        db.notification_claim(self.ctxt, uuidsentinel.notification_2,
+                              'engine-1', 60)
+
+        notifications = db.notifications_get_all_by_filters(
+            self.ctxt, filters={'lease-expired-before': timeutils.utcnow()})
+
+        self.assertEqual([uuidsentinel.notification_1],
+                         [n['notification_uuid'] for n in notifications])
+
     def test_notification_not_found(self):
         self._create_notification(self._get_fake_values())
         self.assertRaises(exception.NotificationNotFound,
@@ -497,3 +1011,122 @@ class NotificationsTestCase(test.TestCase, ModelsObjectComparatorMixin):
         self.assertRaises(exception.InvalidSortKey,
                           db.notifications_get_all_by_filters,
                           context=self.ctxt, sort_keys=['invalid_sort_key'])
+
+
+class FailoverSegmentUnderRecoveryTestCase(test.TestCase):
+
+    def setUp(self):
+        super(FailoverSegmentUnderRecoveryTestCase, self).setUp()
+        self.ctxt = context.get_admin_context()
+        for segment_uuid, host_uuid in (
+                (uuidsentinel.segment_1, uuidsentinel.host_1),
+                (uuidsentinel.segment_2, uuidsentinel.host_2)):
+            db.failover_segment_create(self.ctxt, {
+                'uuid': segment_uuid, 'name': segment_uuid,
+                'service_type': 'fake_service_type',
+                'recovery_method': 'auto'})
+            db.host_create(self.ctxt, {
+                'uuid': host_uuid, 'name': host_uuid, 'type': 'fake_type',
+                'control_attributes': 'fake_control_attr',
+                'failover_segment_id': segment_uuid})
+
+    def _create_notification(self, notification_uuid, status='new',
+                             source_host_uuid=uuidsentinel.host_1):
+        return db.notification_create(self.ctxt, {
+            'notification_uuid': notification_uuid, 'generated_time': NOW,
+            'source_host_uuid': source_host_uuid, 'type': 'fake_type',
+            'payload': 'fake_payload', 'status': status})
+
+    def _get_active_notifications(self, segment_uuid=uuidsentinel.segment_1):
+        return db.failover_segment_get_by_uuid(
+            self.ctxt, segment_uuid)['active_notifications']
+
+    def _is_under_recovery(self, segment_uuid=uuidsentinel.segment_1,
+                           status=('new', 'running', 'error')):
+        return db.is_failover_segment_under_recovery(
+            self.ctxt, segment_uuid, filters={'status': list(status)})
+
+    def test_notification_create(self):
+        self._create_notification(uuidsentinel.notification_1)
+        self._create_notification(uuidsentinel.notification_2,
+                                  status='finished')
+
+        self.assertEqual(1, self._get_active_notifications())
+        self.assertEqual(0, self._get_active_notifications(
+            uuidsentinel.segment_2))
+        self.assertTrue(self._is_under_recovery())
+        self.assertFalse(self._is_under_recovery(uuidsentinel.segment_2))
+
+    def test_notifications_create(self):
+        db.notifications_create(self.ctxt, [
+            {'notification_uuid': notification_uuid, 'generated_time': NOW,
+             'source_host_uuid': host_uuid, 'type': 'fake_type',
+             'payload': 'fake_payload', 'status': status}
+            for notification_uuid, host_uuid, status in (
+                (uuidsentinel.notification_1, uuidsentinel.host_1, 'new'),
+                (uuidsentinel.notification_2, uuidsentinel.host_1, 'new'),
+                (uuidsentinel.notification_3, uuidsentinel.host_1,
+                 'finished'),
+                (uuidsentinel.notification_4, uuidsentinel.host_2, 'new'))])
+
+        self.assertEqual(2, self._get_active_notifications())
+        self.assertEqual(1, self._get_active_notifications(
+            uuidsentinel.segment_2))
+
+    def test_notification_update_status(self):
+        self._create_notification(uuidsentinel.notification_1)
+
+        self.assertTrue(db.notification_update_status(
+            self.ctxt, uuidsentinel.notification_1, 'running', ['new']))
+        self.assertEqual(1, self._get_active_notifications())
+
+        self.assertFalse(db.notification_update_status(
+            self.ctxt, uuidsentinel.notification_1, 'finished', ['new']))
+        self.assertEqual(1, self._get_active_notifications())
+
+        self.assertTrue(db.notification_update_status(
+            self.ctxt, uuidsentinel.notification_1, 'finished', ['running']))
+        self.assertEqual(0, self._get_active_notifications())
+        self.assertFalse(self._is_under_recovery())
+
+    def test_notification_update(self):
+        self._create_notification(uuidsentinel.notification_1)
+
+        db.notification_update(self.ctxt, uuidsentinel.notification_1,
+                               {'status': 'ignored'})
+        self.assertEqual(0, self._get_active_notifications())
+
+        db.notification_update(self.ctxt, uuidsentinel.notification_1,
+                               {'status': 'error',
+                                'source_host_uuid': uuidsentinel.host_2})
+        self.assertEqual(0, self._get_active_notifications())
+        self.assertEqual(1, self._get_active_notifications(
+            uuidsentinel.segment_2))
+
+    def test_notifications_update_status_by_filters(self):
+        self._create_notification(uuidsentinel.notification_1)
+        self._create_notification(uuidsentinel.notification_2,
+                                  status='error')
+        self._create_notification(uuidsentinel.notification_3,
+                                  source_host_uuid=uuidsentinel.host_2)
+
+        db.notifications_update_status_by_filters(
+            self.ctxt, {'status': ['new', 'error']}, 'failed')
+
+        self.assertEqual(0, self._get_active_notifications())
+        self.assertEqual(0, self._get_active_notifications(
+            uuidsentinel.segment_2))
+
+    def test_notification_delete(self):
+        self._create_notification(uuidsentinel.notification_1)
+
+        db.notification_delete(self.ctxt, uuidsentinel.notification_1)
+
+        self.assertEqual(0, self._get_active_notifications())
+
+    def test_is_under_recovery_with_other_status(self):
+        self._create_notification(uuidsentinel.notification_1,
+                                  status='finished')
+
+        self.assertFalse(self._is_under_recovery())
+        self.assertTrue(self._is_under_recovery(status=['finished']))
@@ -12,6 +12,7 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import datetime
 import logging
 import os
 
@@ -29,6 +30,7 @@ from masakari.db.sqlalchemy import migrate_repo
 from masakari.db.sqlalchemy import migration as sa_migration
 from masakari.db.sqlalchemy import models
 from masakari.tests import fixtures as masakari_fixtures
+from masakari import utils
 
 
 CONF = masakari.conf.CONF
@@ -210,6 +212,96 @@ class MasakariMigrationsCheckers(test_migrations.WalkVersionsMixin):
         self.assertColumnExists(engine, 'atomdetails', 'revert_results')
         self.assertColumnExists(engine, 'atomdetails', 'revert_failure')
 
+    def _check_007(self, engine, data):
+        self.assertColumnExists(engine, 'notifications', 'claimed_by')
+        self.assertColumnExists(engine, 'notifications', 'lease_expires_at')
+        self.assertIndexMembers(engine, 'notifications',
+                                'notifications_status_lease_expires_at_idx',
+                                ['status', 'lease_expires_at'])
+
+    def _pre_upgrade_008(self, engine):
+        notifications = oslodbutils.get_table(engine, 'notifications')
+        data = [{'id': i, 'notification_uuid': 'fake-uuid-%d' % i,
+                 'generated_time': datetime.datetime(2020, 1, 1),
+                 'source_host_uuid': 'fake-host-uuid', 'type': 'VM',
+                 'payload': payload, 'status': 'new', 'deleted': 0}
+                for i, payload in enumerate([
+                    '{"event": "LIFECYCLE", "instance_uuid": "fake"}',
+                    '{"instance_uuid": "fake", "event": "LIFECYCLE"}',
+                    None], 1)]
+        engine.execute(notifications.insert(), data)
+        return data
+
+    def _check_008(self, engine, data):
+        self.assertColumnExists(engine, 'notifications', 'payload_hash')
+        self.assertIndexMembers(engine, 'notifications',
+                                'notifications_duplicate_detection_idx',
+                                ['source_host_uuid', 'type', 'payload_hash',
+                                 'generated_time'])
+
+        notifications = oslodbutils.get_table(engine, 'notifications')
+        rows = engine.execute(
+            notifications.select().order_by(notifications.c.id)).fetchall()
+        expected_hash = utils.get_payload_hash(
+            {'event': 'LIFECYCLE', 'instance_uuid': 'fake'})
+        self.assertEqual([expected_hash, expected_hash, None],
+                         [row.payload_hash for row in rows])
+
+    def _check_009(self, engine, data):
+        self.assertIndexMembers(engine, 'notifications',
+                                'notifications_status_generated_time_idx',
+                                ['status', 'generated_time'])
+        self.assertIndexMembers(engine, 'notifications',
+                                'notifications_host_type_generated_time_idx',
+                                ['source_host_uuid', 'type',
+                                 'generated_time'])
+        self.assertIndexMembers(engine, 'notifications',
+                                'notifications_created_at_id_idx',
+                                ['created_at', 'id'])
+
+    def _pre_upgrade_010(self, engine):
+        segments = oslodbutils.get_table(engine, 'failover_segments')
+        hosts = oslodbutils.get_table(engine, 'hosts')
+        notifications = oslodbutils.get_table(engine, 'notifications')
+
+        engine.execute(segments.insert(), [
+            {'id': i, 'uuid': 'fake-segment-uuid-%d' % i,
+             'name': 'fake-segment-%d' % i, 'service_type': 'COMPUTE',
+             'recovery_method': 'auto', 'deleted': 0} for i in (1, 2)])
+        engine.execute(hosts.insert(), [
+            {'id': 1, 'uuid': 'fake-host-uuid', 'name': 'fake-host',
+             'type': 'SSH', 'control_attributes': 'fake',
+             'failover_segment_id': 'fake-segment-uuid-1', 'deleted': 0}])
+        # Notifications not counted by the active notifications counter,
+        # in addition to the new ones added by _pre_upgrade_008
+        engine.execute(notifications.insert(), [
+            {'id': 10 + i, 'notification_uuid': 'fake-uuid-1%d' % i,
+             'generated_time': datetime.datetime(2020, 1, 1),
+             'source_host_uuid': 'fake-host-uuid', 'type': 'VM',
+             'status': status, 'deleted': deleted}
+            for i, (status, deleted) in enumerate([('finished', 0),
+                                                   ('running', 1)])])
+
+    def _check_010(self, engine, data):
+        self.assertColumnExists(engine, 'failover_segments',
+                                'active_notifications')
+
+        segments = oslodbutils.get_table(engine, 'failover_segments')
+        rows = engine.execute(
+            segments.select().order_by(segments.c.id)).fetchall()
+        self.assertEqual([3, 0], [row.active_notifications for row in rows])
+
+    def _check_011(self, engine, data):
+        notifications = oslodbutils.get_table(engine, 'notifications')
+        shadow_notifications = oslodbutils.get_table(engine,
+                                                     'shadow_notifications')
+        self.assertEqual(
+            sorted(column.name for column in notifications.columns),
+            sorted(column.name for column in shadow_notifications.columns))
+        self.assertIndexMembers(engine, 'shadow_notifications',
+                                'shadow_notifications_created_at_id_idx',
+                                ['created_at', 'id'])
+
 
 class TestMasakariMigrationsSQLite(MasakariMigrationsCheckers,
                                    test_base.DbTestCase):
@@ -15,11 +15,14 @@
 """Tests for db purge."""
 
 import datetime
+from unittest import mock
 import uuid
 
 from oslo_db.sqlalchemy import utils as sqlalchemyutils
 from oslo_utils import timeutils
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.dialects import sqlite
+from sqlalchemy import orm
 
 from masakari import context
 from masakari import db
@@ -165,3 +168,117 @@ class PurgeDeletedTest(test.TestCase):
         self.assertEqual(4, notifications_rows)
         self.assertEqual(5, hosts_rows)
         self.assertEqual(6, failover_segments_rows)
+
+    @mock.patch('time.sleep')
+    def test_purge_deleted_rows_by_batches(self, mock_sleep):
+        rows_purged = db.purge_deleted_rows(self.context, age_in_days=20,
+                                            max_rows=-1, batch_size=3,
+                                            sleep_time=0.5)
+
+        self.assertEqual({'notifications': 4, 'shadow_notifications': 0,
+                          'hosts': 4, 'failover_segments': 4}, rows_purged)
+        # Each table takes a full batch of 3 rows then one of 1 row, which
+        # ends its purge.
+        self.assertEqual(3, mock_sleep.call_args_list.count(mock.call(0.5)))
+        self.assertEqual(2, self.conn.execute(
+            self.notifications.count()).scalar())
+        self.assertEqual(2, self.conn.execute(
+            self.failover_segments.count()).scalar())
+        self.assertEqual(2, self.conn.execute(
+            self.hosts.count()).scalar())
+
+    def test_purge_deleted_rows_dry_run(self):
+        rows_purged = db.purge_deleted_rows(self.context, age_in_days=20,
+                                            max_rows=6, dry_run=True)
+
+        self.assertEqual({'notifications': 4, 'shadow_notifications': 0,
+                          'hosts': 2}, rows_purged)
+        self.assertEqual(6, self.conn.execute(
+            self.notifications.count()).scalar())
+        self.assertEqual(6, self.conn.execute(
+            self.failover_segments.count()).scalar())
+        self.assertEqual(6, self.conn.execute(
+            self.hosts.count()).scalar())
+
+    def test_notifications_get_purgeable_uuids(self):
+        notification_uuids = self.uuidstrs + [uuid.uuid4().hex]
+
+        purgeable = db.notifications_get_purgeable_uuids(
+            self.context, notification_uuids, age_in_days=30)
+
+        # The notifications updated 60 days ago and the one which doesn't
+        # exist anymore
+        self.assertEqual(self.uuidstrs[4:6] + notification_uuids[-1:],
+                         purgeable)
+
+    def test_archive_notifications(self):
+        rows = db.archive_notifications(self.context, age_in_days=30)
+
+        self.assertEqual(2, rows)
+        self.assertEqual(4, self.conn.execute(
+            self.notifications.count()).scalar())
+        shadow_notifications = sqlalchemyutils.get_table(
+            self.engine, "shadow_notifications")
+        archived = self.conn.execute(
+            shadow_notifications.select().order_by(
+                shadow_notifications.c.id)).fetchall()
+        self.assertEqual(self.uuidstrs[4:6],
+                         [row.notification_uuid for row in archived])
+
+        # The archived notifications are still found, and purged, by their
+        # age.
+        purgeable = db.notifications_get_purgeable_uuids(
+            self.context, self.uuidstrs, age_in_days=30)
+        self.assertEqual(self.uuidstrs[4:6], purgeable)
+        rows_purged = db.purge_deleted_rows(self.context, age_in_days=30,
+                                            max_rows=-1)
+        self.assertEqual(2, rows_purged['shadow_notifications'])
+
+    @mock.patch('time.sleep')
+    def test_archive_notifications_by_batches(self, mock_sleep):
+        rows = db.archive_notifications(self.context, age_in_days=20,
+                                        max_rows=3, batch_size=2,
+                                        sleep_time=0.5)
+
+        self.assertEqual(3, rows)
+        self.assertEqual(1, mock_sleep.call_args_list.count(mock.call(0.5)))
+        self.assertEqual(3, self.conn.execute(
+            self.notifications.count()).scalar())
+
+    @mock.patch.object(db_api, '_supports_skip_locked', return_value=True)
+    def test_archive_notifications_locks_batch(self, mock_skip_locked):
+        with mock.patch.object(orm.Session, 'execute', autospec=True,
+                               side_effect=orm.Session.execute) as mock_exec:
+            db.archive_notifications(self.context, age_in_days=30)
+
+        # The ids of the batch are selected first, locked and skipping the
+        # rows locked by another engine archiving them at the same time
+        query = mock_exec.call_args_list[0][0][1]
+        self.assertIn('FOR UPDATE SKIP LOCKED',
+                      str(query.compile(dialect=postgresql.dialect())))
+
+    def test_supports_skip_locked(self):
+        def _dialect(name, server_version_info=None, is_mariadb=False):
+            dialect = mock.Mock(server_version_info=server_version_info,
+                                _is_mariadb=is_mariadb)
+            dialect.name = name
+            return dialect
+
+        self.assertTrue(db_api._supports_skip_locked(_dialect('postgresql')))
+        self.assertTrue(db_api._supports_skip_locked(
+            _dialect('mysql', (8, 0, 32))))
+        self.assertFalse(db_api._supports_skip_locked(
+            _dialect('mysql', (5, 7, 40))))
+        self.assertTrue(db_api._supports_skip_locked(
+            _dialect('mysql', (10, 6, 12), is_mariadb=True)))
+        self.assertFalse(db_api._supports_skip_locked(
+            _dialect('mysql', (10, 5, 19), is_mariadb=True)))
+        self.assertFalse(db_api._supports_skip_locked(_dialect('sqlite')))
+
+    def test_archive_notifications_dry_run(self):
+        rows = db.archive_notifications(self.context, age_in_days=20,
+                                        dry_run=True)
+
+        self.assertEqual(4, rows)
+        self.assertEqual(6, self.conn.execute(
+            self.notifications.count()).scalar())
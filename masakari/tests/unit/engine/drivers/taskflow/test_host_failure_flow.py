@@ -29,6 +29,7 @@ from masakari.engine import manager
 from masakari import exception
 from masakari import test
 from masakari.tests.unit import fakes
+from masakari.tests import uuidsentinel
 
 CONF = conf.CONF
 
@@ -88,6 +89,44 @@ class HostFailureTestCase(test.TestCase):
         mock_enable_disable.assert_called_once_with(
             self.ctxt, self.instance_host)
 
+    @mock.patch.object(nova.API, "is_compute_service_reported_down")
+    @mock.patch('masakari.engine.drivers.taskflow.host_failure.eventlet.'
+                'sleep')
+    def test_disable_compute_service_wait_for_service_down(
+            self, mock_sleep, mock_service_down, mock_unlock, mock_lock,
+            mock_enable_disable):
+        self.override_config("wait_for_compute_service_down",
+                             True, "host_failure")
+        self.override_config("wait_period_after_service_update", 180)
+        mock_service_down.side_effect = [False, False, True]
+
+        self._test_disable_compute_service(mock_enable_disable)
+
+        self.assertEqual(3, mock_service_down.call_count)
+        # polling backs off between two checks of the service state
+        mock_sleep.assert_has_calls([mock.call(1), mock.call(2)])
+
+    @mock.patch.object(nova.API, "is_compute_service_reported_down")
+    @mock.patch('masakari.engine.drivers.taskflow.base.MasakariTask.'
+                'update_details')
+    def test_disable_compute_service_service_not_reported_down(
+            self, _mock_notify, mock_service_down, mock_unlock, mock_lock,
+            mock_enable_disable):
+        self.override_config("wait_for_compute_service_down",
+                             True, "host_failure")
+        self.override_config("wait_period_after_service_update", 1)
+        mock_service_down.return_value = False
+
+        self._test_disable_compute_service(mock_enable_disable)
+
+        self.assertTrue(mock_service_down.called)
+        _mock_notify.assert_has_calls([
+            mock.call("Disabling compute service on host: 'fake-host'"),
+            mock.call("Compute service on host 'fake-host' is not reported "
+                      "down by nova after 1 sec", 0.8),
+            mock.call("Disabled compute service on host: 'fake-host'", 1.0)
+        ])
+
     def _test_instance_list(self, instances_evacuation_count):
         task = host_failure.PrepareHAEnabledInstancesTask(self.ctxt,
                                                           self.novaclient)
@@ -107,9 +146,12 @@ class HostFailureTestCase(test.TestCase):
 
         self.assertEqual(instances_evacuation_count,
                          len(instances['instance_list']))
+        self.assertEqual(sorted(instance_uuid_list),
+                         sorted(instances['instance_snapshots']))
 
         return {
             "instance_list": instance_uuid_list,
+            "instance_snapshots": instances['instance_snapshots'],
         }
 
     def _evacuate_instances(self, instance_list, mock_enable_disable,
@@ -119,24 +161,30 @@ class HostFailureTestCase(test.TestCase):
             update_host_method=manager.update_host_method)
         old_instance_list = copy.deepcopy(instance_list['instance_list'])
 
+        instance_snapshots = instance_list.get('instance_snapshots')
+
         if reserved_host:
             task.execute(self.instance_host,
                          instance_list['instance_list'],
-                         reserved_host=reserved_host)
+                         reserved_host=reserved_host,
+                         instance_snapshots=instance_snapshots)
 
             self.assertTrue(mock_enable_disable.called)
         else:
             task.execute(
-                self.instance_host, instance_list['instance_list'])
+                self.instance_host, instance_list['instance_list'],
+                instance_snapshots=instance_snapshots)
 
         # make sure instance is active and has different host
         self._verify_instance_evacuated(old_instance_list)
 
+    @mock.patch.object(nova.API, "get_servers_changed_since")
     @mock.patch.object(nova.API, "get_server")
     @mock.patch.object(nova.API, "evacuate_instance")
     @mock.patch('masakari.engine.drivers.taskflow.host_failure.LOG')
     def test_instance_evacute_error(self, _mock_log, _mock_evacuate,
-            _mock_get, mock_unlock, mock_lock, mock_enable_disable):
+            _mock_get, _mock_get_changed, mock_unlock, mock_lock,
+            mock_enable_disable):
         task = host_failure.EvacuateInstancesTask(
             self.ctxt, self.novaclient,
             update_host_method=manager.update_host_method)
@@ -153,14 +201,16 @@ class HostFailureTestCase(test.TestCase):
         fake_instance = self.fake_client.servers.create(
             id="1", host=self.instance_host, ha_enabled=True)
 
-        _mock_get.side_effect = [
-            get_fake_server(fake_instance, 'active'),
-            get_fake_server(fake_instance, 'error'),
-        ]
-        task._evacuate_and_confirm(self.ctxt, fake_instance,
-                                   self.instance_host,
-                                   failed_evacuation_instances)
+        _mock_get_changed.return_value = [
+            get_fake_server(fake_instance, 'error')]
+        task._evacuate_and_confirm(
+            self.ctxt, host_failure._get_instance_snapshot(
+                get_fake_server(fake_instance, 'active')),
+            self.instance_host, failed_evacuation_instances)
         self.assertIn(fake_instance.id, failed_evacuation_instances)
+        # the snapshot carries the state of the instance, it isn't fetched
+        # from nova again before evacuating it.
+        _mock_get.assert_not_called()
         expected_log = 'Failed to evacuate instance %s' % fake_instance.id
         _mock_log.warning.assert_called_once_with(expected_log)
 
@@ -564,13 +614,14 @@ class HostFailureTestCase(test.TestCase):
             "instance_list": instance_uuid_list,
         }
 
-        def fake_get_server(context, host):
+        def fake_get_servers_changed_since(context, changes_since):
             # assume that while evacuating instance goes into error state
             fake_server = copy.deepcopy(server)
             setattr(fake_server, 'OS-EXT-STS:vm_state', "error")
-            return fake_server
+            return [fake_server]
 
-        with mock.patch.object(self.novaclient, "get_server", fake_get_server):
+        with mock.patch.object(nova.API, "get_servers_changed_since",
+                               fake_get_servers_changed_since):
             # execute EvacuateInstancesTask
             self.assertRaises(
                 exception.HostRecoveryFailureException,
@@ -737,3 +788,128 @@ class HostFailureTestCase(test.TestCase):
                       "'fake-host'", 0.7),
             mock.call('Evacuation process completed!', 1.0)
         ])
+
+    @mock.patch('masakari.compute.nova.novaclient')
+    @mock.patch('masakari.engine.drivers.taskflow.base.MasakariTask.'
+                'update_details')
+    def test_host_failure_flow_spread_across_reserved_hosts(
+            self, _mock_notify, _mock_novaclient, mock_unlock, mock_lock,
+            mock_enable_disable):
+        _mock_novaclient.return_value = self.fake_client
+        self.override_config("evacuate_all_instances",
+                             True, "host_failure")
+
+        # create test data
+        self.fake_client.servers.create(id="1", host=self.instance_host,
+                                        flavor={'ram': 2048})
+        self.fake_client.servers.create(id="2", host=self.instance_host,
+                                        flavor={'ram': 2048})
+        self.fake_client.servers.create(id="3", host=self.instance_host,
+                                        flavor={'ram': 1024})
+        self.fake_client.hypervisors.create(
+            id="1", hypervisor_hostname="fake-reserved-host-1",
+            free_ram_mb=4096)
+        self.fake_client.hypervisors.create(
+            id="2", hypervisor_hostname="fake-reserved-host-2",
+            free_ram_mb=2048)
+        reserved_host_list = ["fake-reserved-host-1", "fake-reserved-host-2"]
+
+        # execute PrepareHAEnabledInstancesTask
+        instance_list = self._test_instance_list(3)
+
+        # execute EvacuateInstancesTask
+        with mock.patch.object(manager, "update_host_method") as mock_save:
+            task = host_failure.EvacuateInstancesTask(
+                self.ctxt, self.novaclient,
+                update_host_method=manager.update_host_method)
+            task.execute(self.instance_host, instance_list['instance_list'],
+                         instance_snapshots=instance_list[
+                             'instance_snapshots'],
+                         reserved_host_list=reserved_host_list)
+
+            mock_save.assert_has_calls(
+                [mock.call(self.ctxt, "fake-reserved-host-1"),
+                 mock.call(self.ctxt, "fake-reserved-host-2")],
+                any_order=True)
+
+        mock_enable_disable.assert_has_calls(
+            [mock.call(self.ctxt, "fake-reserved-host-1", enable=True),
+             mock.call(self.ctxt, "fake-reserved-host-2", enable=True)],
+            any_order=True)
+        evacuated_to = {
+            server.id: getattr(server, 'OS-EXT-SRV-ATTR:hypervisor_hostname')
+            for server in self.fake_client.servers.list()}
+        self.assertEqual({"1": "fake-reserved-host-1",
+                          "2": "fake-reserved-host-1",
+                          "3": "fake-reserved-host-2"}, evacuated_to)
+        _mock_notify.assert_any_call(
+            "Successfully evacuate instances '1,2,3' from host 'fake-host'",
+            0.7)
+
+    @mock.patch('masakari.compute.nova.novaclient')
+    @mock.patch('masakari.engine.drivers.taskflow.base.MasakariTask.'
+                'update_details')
+    def test_host_failure_flow_spread_reserved_hosts_not_enough_memory(
+            self, _mock_notify, _mock_novaclient, mock_unlock, mock_lock,
+            mock_enable_disable):
+        _mock_novaclient.return_value = self.fake_client
+        self.override_config("evacuate_all_instances",
+                             True, "host_failure")
+
+        # create test data
+        self.fake_client.servers.create(id="1", host=self.instance_host,
+                                        flavor={'ram': 4096})
+        self.fake_client.servers.create(id="2", host=self.instance_host,
+                                        flavor={'ram': 1024})
+        self.fake_client.hypervisors.create(
+            id="1", hypervisor_hostname="fake-reserved-host-1",
+            free_ram_mb=2048)
+
+        # execute PrepareHAEnabledInstancesTask
+        instance_list = self._test_instance_list(2)
+
+        # execute EvacuateInstancesTask
+        with mock.patch.object(manager, "update_host_method"):
+            task = host_failure.EvacuateInstancesTask(
+                self.ctxt, self.novaclient,
+                update_host_method=manager.update_host_method)
+            self.assertRaises(
+                exception.HostRecoveryFailureException, task.execute,
+                self.instance_host, instance_list['instance_list'],
+                instance_snapshots=instance_list['instance_snapshots'],
+                reserved_host_list=["fake-reserved-host-1",
+                                    "fake-reserved-host-2"])
+
+        _mock_notify.assert_has_calls([
+            mock.call("No reserved host has enough free memory for "
+                      "instances '1'", 0.1),
+            mock.call("Instances '2' will be evacuated to reserved host "
+                      "'fake-reserved-host-1'", 0.1),
+            mock.call("Enabling reserved host: 'fake-reserved-host-1'", 0.1),
+            mock.call("Evacuation of instance started: '2'", 0.5),
+            mock.call("Successfully evacuate instances '2' from host "
+                      "'fake-host'", 0.7),
+            mock.call("Failed to evacuate instances '1' from host "
+                      "'fake-host'", 0.7)
+        ])
+
+    def test_get_rh_flow_spread_across_reserved_hosts(
+            self, mock_unlock, mock_lock, mock_enable_disable):
+        self.override_config("spread_across_reserved_hosts",
+                             True, "host_failure")
+        process_what = {
+            'host_name': self.instance_host,
+            'notification_uuid': uuidsentinel.fake_notification,
+            'reserved_host_list': ['fake-reserved-host-1']
+        }
+
+        with mock.patch.object(host_failure.base,
+                               'load_taskflow_into_engine') as mock_load:
+            host_failure.get_rh_flow(
+                self.ctxt, self.novaclient, process_what,
+                update_host_method=manager.update_host_method)
+
+        nested_flow = mock_load.call_args[0][1]
+        main_flow = list(nested_flow)[1]
+        self.assertEqual('spread_instance_evacuate_engine', main_flow.name)
+        self.assertIsNone(main_flow.retry)
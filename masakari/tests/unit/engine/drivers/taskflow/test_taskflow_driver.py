@@ -13,9 +13,18 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import contextlib
+import io
 from unittest import mock
 
+from oslo_serialization import jsonutils
 from oslo_utils import timeutils
+from oslo_utils import uuidutils
+import sqlalchemy
+from taskflow.persistence import backends
+from taskflow.persistence.backends import impl_memory
+from taskflow.persistence.backends import impl_sqlalchemy
+from taskflow.persistence.backends.sqlalchemy import tables
 from taskflow.persistence import models
 from taskflow.persistence import path_based
 
@@ -66,6 +75,50 @@ class TaskflowDriverTestCase(test.TestCase):
         # Ensures that 'reserved_host' flow will not execute
         self.assertFalse(mock_rh_flow.called)
 
+    @mock.patch.object(base, 'DynamicLogListener')
+    @mock.patch.object(host_failure, 'get_auto_flow')
+    @mock.patch.object(host_failure, 'get_rh_flow')
+    def test_stop_workflow(self, mock_rh_flow, mock_auto_flow,
+                           mock_listener):
+        flow_engine = mock.Mock()
+        flow_engine.run.side_effect = (
+            lambda: self.taskflow_driver.stop_workflow(
+                uuidsentinel.fake_notification))
+        mock_auto_flow.return_value = flow_engine
+
+        self.assertRaises(exception.RecoveryWorkflowStopped,
+                          self.taskflow_driver.execute_host_failure,
+                          self.ctxt, 'fake_host',
+                          fields.FailoverSegmentRecoveryMethod.AUTO_PRIORITY,
+                          uuidsentinel.fake_notification,
+                          reserved_host_list=['host-1', 'host-2'])
+
+        # the running flow doesn't start its next tasks and the
+        # 'reserved_host' flow isn't executed
+        flow_engine.suspend.assert_called_once_with()
+        self.assertFalse(mock_rh_flow.called)
+        # the workflow can be executed again once stopped
+        flow_engine.run.side_effect = None
+        self.taskflow_driver.execute_host_failure(
+            self.ctxt, 'fake_host',
+            fields.FailoverSegmentRecoveryMethod.AUTO,
+            uuidsentinel.fake_notification)
+
+    @mock.patch.object(base, 'DynamicLogListener')
+    @mock.patch.object(host_failure, 'get_auto_flow')
+    def test_stop_workflow_not_running(self, mock_auto_flow, mock_listener):
+        flow_engine = mock.Mock()
+        mock_auto_flow.return_value = flow_engine
+
+        self.taskflow_driver.stop_workflow(uuidsentinel.fake_notification)
+        self.taskflow_driver.execute_host_failure(
+            self.ctxt, 'fake_host',
+            fields.FailoverSegmentRecoveryMethod.AUTO,
+            uuidsentinel.fake_notification)
+
+        flow_engine.run.assert_called_once_with()
+        self.assertFalse(flow_engine.suspend.called)
+
     @mock.patch.object(base, 'DynamicLogListener')
     @mock.patch.object(host_failure, 'get_auto_flow')
     @mock.patch.object(host_failure, 'get_rh_flow')
@@ -438,3 +491,86 @@ class TaskflowDriverTestCase(test.TestCase):
         mock_get_atoms_for_flow.assert_called_once()
 
         self.assertObjectList(expected_result, progress_details)
+
+    def _save_logbooks(self, backend, notification_uuids):
+        with contextlib.closing(backend.get_connection()) as conn:
+            for notification_uuid in notification_uuids:
+                book = models.LogBook('test', notification_uuid)
+                fd = models.FlowDetail('test', uuid=notification_uuid)
+                fd.add(models.TaskDetail('StopInstanceTask',
+                                         uuid=uuidutils.generate_uuid()))
+                book.add(fd)
+                conn.save_logbook(book)
+
+    @mock.patch.object(backends, 'fetch')
+    def test_get_recovery_workflow_notification_uuids(self, mock_fetch):
+        backend = impl_memory.MemoryBackend()
+        mock_fetch.return_value = backend
+        self._save_logbooks(backend, [uuidsentinel.fake_notification_1,
+                                      uuidsentinel.fake_notification_2])
+
+        notification_uuids = (
+            self.taskflow_driver.get_recovery_workflow_notification_uuids(
+                self.ctxt))
+
+        self.assertEqual(sorted([uuidsentinel.fake_notification_1,
+                                 uuidsentinel.fake_notification_2]),
+                         sorted(notification_uuids))
+
+    @mock.patch.object(backends, 'fetch')
+    def test_get_recovery_workflow_notification_uuids_by_pages(
+            self, mock_fetch):
+        backend = impl_sqlalchemy.SQLAlchemyBackend(
+            {'connection': 'sqlite://'})
+        self.addCleanup(backend.close)
+        mock_fetch.return_value = backend
+        metadata = sqlalchemy.MetaData()
+        logbooks = tables.fetch(metadata).logbooks
+        metadata.create_all(backend.engine)
+        notification_uuids = sorted(uuidutils.generate_uuid()
+                                    for _ in range(5))
+        backend.engine.execute(logbooks.insert(), [
+            {'uuid': notification_uuid, 'name': 'test'}
+            for notification_uuid in notification_uuids])
+
+        with mock.patch.object(backend.engine, 'connect',
+                               wraps=backend.engine.connect) as mock_connect:
+            result = list(
+                self.taskflow_driver.get_recovery_workflow_notification_uuids(
+                    self.ctxt, batch_size=2))
+
+        self.assertEqual(notification_uuids, result)
+        # the logbooks table is read by pages of two uuids
+        self.assertEqual(3, mock_connect.call_count)
+
+    @mock.patch.object(backends, 'fetch')
+    def test_purge_notification_recovery_workflow_details(self, mock_fetch):
+        backend = impl_memory.MemoryBackend()
+        mock_fetch.return_value = backend
+        self._save_logbooks(backend, [uuidsentinel.fake_notification_1,
+                                      uuidsentinel.fake_notification_2])
+        archive = io.StringIO()
+
+        purged = (
+            self.taskflow_driver.purge_notification_recovery_workflow_details(
+                self.ctxt, [uuidsentinel.fake_notification_1,
+                            uuidsentinel.fake_notification_3],
+                archive=archive))
+
+        # The logbook of fake_notification_3 doesn't exist
+        self.assertEqual(1, purged)
+        with contextlib.closing(backend.get_connection()) as conn:
+            self.assertEqual([uuidsentinel.fake_notification_2],
+                             [book.uuid for book in conn.get_logbooks()])
+
+        archived = [jsonutils.loads(line)
+                    for line in archive.getvalue().splitlines()]
+        self.assertEqual(1, len(archived))
+        self.assertEqual(uuidsentinel.fake_notification_1,
+                         archived[0]['uuid'])
+        self.assertEqual(uuidsentinel.fake_notification_1,
+                         archived[0]['flow_details'][0]['uuid'])
+        self.assertEqual(
+            [{'name': 'StopInstanceTask', 'type': 'TASK_DETAIL'}],
+            [{'name': atom['name'], 'type': atom['type']} for atom in
+             archived[0]['flow_details'][0]['atom_details']])
@@ -16,6 +16,8 @@
 import datetime
 from unittest import mock
 
+import eventlet
+from oslo_service import loopingcall
 from oslo_utils import importutils
 from oslo_utils import timeutils
 
@@ -58,6 +60,20 @@ class EngineManagerUnitTestCase(test.NoDBTestCase):
         rpc.init(CONF)
         self.engine = importutils.import_object(CONF.engine_manager)
         self.context = context.RequestContext()
+        # NOTE: There is no database to hold the notification leases.
+        self.stub_out('masakari.objects.notification.Notification.claim',
+                      lambda *args, **kwargs: True)
+        self.stub_out('masakari.objects.notification.Notification.release',
+                      lambda *args, **kwargs: True)
+
+        def fake_update_status(notification, status, expected_status,
+                               claimed_by=None):
+            notification.status = status
+            return True
+
+        self.stub_out(
+            'masakari.objects.notification.Notification.update_status',
+            fake_update_status)
 
     def _fake_notification_workflow(self, exc=None):
         if exc:
@@ -745,11 +761,15 @@ class EngineManagerUnitTestCase(test.NoDBTestCase):
                       tb=mock.ANY)]
         mock_notify_about_notification_update.assert_has_calls(notify_calls)
 
-    def test_process_notification_stop_from_recovery_failure(self,
-                                                     mock_get_noti):
+    @mock.patch("masakari.engine.drivers.taskflow."
+                "TaskFlowDriver.execute_instance_failure")
+    @mock.patch.object(notification_obj.Notification, "update_status")
+    @mock.patch.object(engine_utils, 'notify_about_notification_update')
+    def test_process_notification_stop_from_recovery_failure(
+            self, mock_notify_about_notification_update, mock_update_status,
+            mock_instance_failure, mock_get_noti):
         noti_new = _get_vm_type_notification()
-        mock_get_noti.return_value = _get_vm_type_notification(
-            status="failed")
+        mock_update_status.return_value = False
 
         with mock.patch("masakari.engine.manager.LOG.warning") as mock_log:
             self.engine.process_notification(self.context,
@@ -759,15 +779,41 @@ class EngineManagerUnitTestCase(test.NoDBTestCase):
             expected_log = ("Processing of notification is skipped to avoid "
                             "recovering from failure twice. "
                             "Notification received is '%(uuid)s' "
-                            "and it's status is '%(new_status)s' and the "
-                            "current status of same notification in db "
-                            "is '%(old_status)s'")
+                            "and it's status '%(status)s' has been changed "
+                            "in db.")
             expected_log_args_1 = {'uuid': noti_new.notification_uuid,
-                                   'new_status': noti_new.status,
-                                   'old_status': "failed"}
+                                   'status': noti_new.status}
 
             self.assertEqual(expected_log, args[0])
             self.assertEqual(expected_log_args_1, args[1])
+        mock_update_status.assert_called_once_with(
+            fields.NotificationStatus.RUNNING, fields.NotificationStatus.NEW,
+            claimed_by=self.engine.engine_id)
+        self.assertFalse(mock_instance_failure.called)
+
+    @mock.patch("masakari.engine.drivers.taskflow."
+                "TaskFlowDriver.execute_instance_failure")
+    @mock.patch.object(notification_obj.Notification, "update_status")
+    @mock.patch.object(engine_utils, 'notify_about_notification_update')
+    def test_process_notification_status_changed_during_recovery(
+            self, mock_notify_about_notification_update, mock_update_status,
+            mock_instance_failure, mock_get_noti):
+        notification = _get_vm_type_notification()
+        mock_update_status.side_effect = [True, False]
+
+        with mock.patch("masakari.engine.manager.LOG.warning") as mock_log:
+            self.engine.process_notification(self.context,
+                                             notification=notification)
+
+        mock_update_status.assert_has_calls([
+            mock.call(fields.NotificationStatus.RUNNING,
+                      fields.NotificationStatus.NEW,
+                      claimed_by=self.engine.engine_id),
+            mock.call(fields.NotificationStatus.FINISHED,
+                      fields.NotificationStatus.RUNNING,
+                      claimed_by=self.engine.engine_id)])
+        mock_log.assert_called_once()
+        self.assertFalse(mock_get_noti.called)
 
     @mock.patch('masakari.compute.nova.novaclient')
     @mock.patch('masakari.engine.drivers.taskflow.host_failure.'
@@ -799,9 +845,8 @@ class EngineManagerUnitTestCase(test.NoDBTestCase):
         # is executed.
         _mock_log.info.assert_called_with(expected_msg_format)
 
-    @mock.patch.object(notification_obj.Notification, "save")
     def test_process_notification_host_failure_with_host_status_unknown(
-            self, mock_get_noti, mock_notification_save):
+            self, mock_get_noti):
         notification = fakes.create_fake_notification(
             type="COMPUTE_HOST", id=1, payload={
                 'event': 'stopped', 'host_status': 'UNKNOWN',
@@ -811,11 +856,6 @@ class EngineManagerUnitTestCase(test.NoDBTestCase):
             generated_time=NOW, status=fields.NotificationStatus.NEW,
             notification_uuid=uuidsentinel.fake_notification)
 
-        mock_get_noti.return_value = notification
-        notification_new = notification.obj_clone()
-        notification_new.status = fields.NotificationStatus.IGNORED
-        mock_notification_save.side_effect = [notification, notification_new]
-
         with mock.patch("masakari.engine.manager.LOG.warning") as mock_log:
             self.engine.process_notification(self.context,
                                              notification=notification)
@@ -832,6 +872,195 @@ class EngineManagerUnitTestCase(test.NoDBTestCase):
             self.assertEqual(
                 fields.NotificationStatus.IGNORED, notification.status)
 
+    @mock.patch.object(notification_obj.Notification, "release")
+    @mock.patch.object(notification_obj.Notification, "update_status")
+    @mock.patch.object(notification_obj.Notification, "claim")
+    @mock.patch.object(engine_utils, 'notify_about_notification_update')
+    def test_process_notification_claimed_by_another_engine(
+            self, mock_notify_about_notification_update, mock_claim,
+            mock_update_status, mock_release, mock_notification_get):
+        mock_claim.return_value = False
+        notification = _get_vm_type_notification()
+
+        self.engine.process_notification(self.context,
+                                         notification=notification)
+
+        mock_claim.assert_called_once_with(self.engine.engine_id,
+                                           CONF.notification_lease_time)
+        self.assertFalse(mock_update_status.called)
+        self.assertFalse(mock_release.called)
+        self.assertEqual("new", notification.status)
+
+    @mock.patch("masakari.engine.drivers.taskflow."
+                "TaskFlowDriver.execute_instance_failure")
+    @mock.patch.object(notification_obj.Notification, "release")
+    @mock.patch.object(notification_obj.Notification, "update_status")
+    @mock.patch.object(engine_utils, 'notify_about_notification_update')
+    def test_process_notification_releases_lease_on_failure(
+            self, mock_notify_about_notification_update, mock_update_status,
+            mock_release, mock_instance_failure, mock_notification_get):
+        notification = _get_vm_type_notification()
+        mock_update_status.side_effect = [True, exception.MasakariException]
+
+        self.assertRaises(exception.MasakariException,
+                          self.engine.process_notification, self.context,
+                          notification=notification)
+        mock_release.assert_called_once_with(self.engine.engine_id)
+
+    @mock.patch.object(notification_obj.Notification, "renew_lease")
+    def test_renew_notification_lease_taken_over(self, mock_renew_lease,
+                                                 mock_notification_get):
+        notification = _get_vm_type_notification()
+        mock_renew_lease.return_value = False
+
+        with mock.patch.object(self.engine.driver,
+                               'stop_workflow') as mock_stop_workflow:
+            self.assertRaises(loopingcall.LoopingCallDone,
+                              self.engine._renew_notification_lease,
+                              notification)
+
+        mock_stop_workflow.assert_called_once_with(
+            uuidsentinel.fake_notification)
+
+    @mock.patch("masakari.engine.drivers.taskflow."
+                "TaskFlowDriver.execute_instance_failure")
+    @mock.patch.object(notification_obj.Notification, "update_status")
+    @mock.patch.object(engine_utils, 'notify_about_notification_update')
+    def test_process_notification_lease_taken_over(
+            self, mock_notify_about_notification_update, mock_update_status,
+            mock_instance_failure, mock_notification_get):
+        notification = _get_vm_type_notification()
+        mock_update_status.return_value = True
+        mock_instance_failure.side_effect = (
+            exception.RecoveryWorkflowStopped(
+                notification_uuid=notification.notification_uuid))
+
+        self.engine.process_notification(self.context,
+                                         notification=notification)
+
+        # the engine which has taken over the lease sets the final status
+        mock_update_status.assert_called_once_with(
+            fields.NotificationStatus.RUNNING, fields.NotificationStatus.NEW,
+            claimed_by=self.engine.engine_id)
+        action = fields.EventNotificationAction.NOTIFICATION_PROCESS
+        self.assertNotIn(
+            mock.call(self.context, notification, action=action,
+                      phase=fields.EventNotificationPhase.ERROR,
+                      exception=mock.ANY, tb=mock.ANY),
+            mock_notify_about_notification_update.mock_calls)
+
+    @mock.patch.object(notification_obj.Notification, "renew_lease")
+    def test_renew_notification_lease_failure_is_logged(
+            self, mock_renew_lease, mock_notification_get):
+        notification = _get_vm_type_notification()
+        mock_renew_lease.side_effect = exception.MasakariException
+
+        with mock.patch.object(manager.LOG, 'exception') as mock_log:
+            self.engine._renew_notification_lease(notification)
+
+        mock_renew_lease.assert_called_once_with(
+            self.engine.engine_id, CONF.notification_lease_time)
+        self.assertTrue(mock_log.called)
+
+    def test_process_notifications(self, mock_notification_get):
+        notifications = [_get_vm_type_notification(),
+                         self._get_process_type_notification()]
+
+        with mock.patch.object(self.engine._notifications_pool,
+                               'spawn_n') as mock_spawn_n:
+            self.engine.process_notifications(self.context,
+                                              notifications=notifications)
+
+        # each notification is processed by its own green thread
+        mock_spawn_n.assert_has_calls([
+            mock.call(self.engine._process_notification, self.context,
+                      notification) for notification in notifications])
+        self.assertEqual(2, mock_spawn_n.call_count)
+
+    def test_process_notifications_limited(self, mock_notification_get):
+        self.flags(notifications_processing_threads=2)
+        engine = importutils.import_object(CONF.engine_manager)
+        notifications = [_get_vm_type_notification() for _ in range(5)]
+        release = eventlet.event.Event()
+        running = []
+        processed = []
+
+        def fake_process_notification(context, notification):
+            running.append(notification)
+            release.wait()
+            processed.append(notification)
+
+        with mock.patch.object(engine, '_process_notification',
+                               side_effect=fake_process_notification):
+            dispatcher = eventlet.spawn(engine.process_notifications,
+                                        self.context,
+                                        notifications=notifications)
+            # let the dispatcher and the processing green threads run
+            for _ in range(10):
+                eventlet.sleep(0)
+
+            # only two notifications are processed, the dispatch of the
+            # other ones waits for them
+            self.assertEqual(notifications[:2], running)
+            self.assertFalse(dispatcher.dead)
+
+            release.send()
+            dispatcher.wait()
+            engine._notifications_pool.waitall()
+
+        self.assertCountEqual(notifications, processed)
+
+    @mock.patch.object(manager.MasakariManager, '_process_notification')
+    @mock.patch('masakari.objects.NotificationList.get_all')
+    def test_process_notifications_with_expired_lease(
+            self, mock_get_all, mock_process_notification,
+            mock_notification_get):
+        notification = _get_vm_type_notification(
+            status=fields.NotificationStatus.RUNNING)
+        mock_get_all.return_value = [notification]
+
+        self.engine._process_notifications_with_expired_lease(self.context)
+
+        filters = mock_get_all.call_args[1]['filters']
+        self.assertEqual(fields.NotificationStatus.RUNNING,
+                         filters['status'])
+        self.assertIn('lease-expired-before', filters)
+        mock_process_notification.assert_called_once_with(self.context,
+                                                          notification)
+
+    @mock.patch.object(manager.utils, 'synchronized')
+    def _test_process_notification_lock_name(self, notification, lock_name,
+                                             mock_synchronized):
+        mock_synchronized.return_value = lambda f: mock.Mock()
+        with mock.patch.object(engine_utils,
+                               'notify_about_notification_update'):
+            self.engine.process_notification(self.context,
+                                             notification=notification)
+        mock_synchronized.assert_called_once_with(lock_name, blocking=True)
+
+    def test_process_notification_type_vm_locks_instance(
+            self, mock_notification_get):
+        self._test_process_notification_lock_name(
+            _get_vm_type_notification(), uuidsentinel.fake_ins)
+
+    def test_process_notification_type_vm_without_instance_locks_host(
+            self, mock_notification_get):
+        notification = _get_vm_type_notification()
+        notification.payload = {'event': 'LIFECYCLE'}
+        self._test_process_notification_lock_name(
+            notification, uuidsentinel.fake_host)
+
+    def test_process_notification_type_process_locks_host(
+            self, mock_notification_get):
+        self._test_process_notification_lock_name(
+            self._get_process_type_notification(), uuidsentinel.fake_host)
+
+    def test_process_notification_type_compute_host_locks_host(
+            self, mock_notification_get):
+        self._test_process_notification_lock_name(
+            self._get_compute_host_type_notification(),
+            uuidsentinel.fake_host)
+
     @mock.patch('masakari.compute.nova.novaclient')
     @mock.patch.object(nova.API, "enable_disable_service")
     @mock.patch('masakari.engine.drivers.taskflow.host_failure.'
@@ -1153,11 +1382,92 @@ class EngineManagerUnitTestCase(test.NoDBTestCase):
         mock_progress_details.assert_called_once_with(
             self.context, notification)
 
-    @mock.patch.object(notification_obj.Notification, "save")
-    @mock.patch.object(notification_obj.NotificationList, "get_all")
-    def test_check_expired_notifications(self, mock_get_all, mock_save,
+    @mock.patch.object(notification_obj.NotificationList,
+                       "update_status_by_filters")
+    def test_check_expired_notifications(self, mock_update_status,
                                          mock_notification_get):
         notification = self._get_compute_host_type_notification(expired=True)
-        mock_get_all.return_value = [notification]
-        self.engine._check_expired_notifications(self.context)
-        self.assertEqual("failed", notification.status)
+        notification.status = fields.NotificationStatus.FAILED
+        mock_update_status.return_value = [notification]
+
+        with mock.patch.object(manager.LOG, 'error') as mock_log, \
+                mock.patch.object(timeutils, 'utcnow', return_value=NOW):
+            self.engine._check_expired_notifications(self.context)
+
+        filters = {
+            'status': [fields.NotificationStatus.RUNNING,
+                       fields.NotificationStatus.ERROR,
+                       fields.NotificationStatus.NEW],
+            'generated-before': NOW - datetime.timedelta(
+                seconds=CONF.notifications_expired_interval)
+        }
+        mock_update_status.assert_called_once_with(
+            self.context, filters, fields.NotificationStatus.FAILED)
+        mock_log.assert_called_once_with(
+            "Periodic task 'check_expired_notifications': "
+            "Notification %(notification_uuid)s is expired.",
+            {'notification_uuid': notification.notification_uuid})
+
+    @mock.patch.object(manager.MasakariManager, '_process_notification')
+    @mock.patch.object(notification_obj.NotificationList,
+                       "update_status_by_filters")
+    @mock.patch.object(notification_obj.NotificationList, "get_all")
+    def test_process_unfinished_notifications(
+            self, mock_get_all, mock_update_status, mock_process_notification,
+            mock_notification_get):
+        notification_error = _get_vm_type_notification(
+            status=fields.NotificationStatus.ERROR)
+        notification_new = self._get_compute_host_type_notification()
+        mock_get_all.return_value = [notification_error, notification_new]
+        mock_update_status.return_value = [notification_error]
+        mock_notification_get.return_value = notification_error
+
+        with mock.patch.object(manager.LOG, 'error') as mock_log, \
+                mock.patch.object(timeutils, 'utcnow', return_value=NOW):
+            self.engine._process_unfinished_notifications(self.context)
+
+        mock_get_all.assert_called_once_with(
+            self.context, filters={
+                'status': [fields.NotificationStatus.ERROR,
+                           fields.NotificationStatus.NEW]},
+            fields=['notification_uuid', 'status', 'generated_time'])
+        # notification in new state is retried only once it is old enough,
+        # the notification to retry is then read entirely
+        mock_notification_get.assert_called_once_with(
+            self.context, notification_error.notification_uuid)
+        mock_process_notification.assert_called_once_with(
+            self.context, notification_error)
+        mock_update_status.assert_called_once_with(
+            self.context,
+            {'notification_uuid': [notification_error.notification_uuid,
+                                   notification_new.notification_uuid],
+             'status': fields.NotificationStatus.ERROR},
+            fields.NotificationStatus.FAILED)
+        mock_log.assert_called_once()
+
+    @mock.patch.object(notification_obj.NotificationList,
+                       "update_status_by_filters")
+    @mock.patch.object(notification_obj.NotificationList, "get_all")
+    def test_process_unfinished_notifications_without_notifications(
+            self, mock_get_all, mock_update_status, mock_notification_get):
+        mock_get_all.return_value = []
+
+        self.engine._process_unfinished_notifications(self.context)
+
+        self.assertFalse(mock_update_status.called)
+
+    @mock.patch.object(notification_obj.NotificationList, "archive")
+    def test_archive_notifications(self, mock_archive,
+                                   mock_notification_get):
+        self.override_config('archive_notifications_age_in_days', 10)
+        self.override_config('archive_notifications_batch_size', 50)
+        mock_archive.return_value = 3
+
+        with mock.patch.object(manager.LOG, 'info') as mock_log:
+            self.engine._archive_notifications(self.context)
+
+        mock_archive.assert_called_once_with(self.context, 10,
+                                             batch_size=50)
+        mock_log.assert_called_once_with(
+            "Periodic task 'archive_notifications': Archived %(rows)d "
+            "notification(s).", {'rows': 3})
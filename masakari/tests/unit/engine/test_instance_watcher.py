@@ -0,0 +1,93 @@
+# Copyright 2016 NTT DATA
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from unittest import mock
+
+from eventlet import timeout as etimeout
+
+from masakari.engine import instance_watcher
+from masakari import test
+from masakari.tests.unit import fakes
+
+
+class InstanceStateWatcherTestCase(test.NoDBTestCase):
+
+    def setUp(self):
+        super(InstanceStateWatcherTestCase, self).setUp()
+        self.override_config("verify_interval", 0)
+        self.novaclient = mock.Mock()
+        self.watcher = instance_watcher.InstanceStateWatcher(
+            novaclient=self.novaclient)
+
+    def _fake_server(self, id, vm_state):
+        return fakes.FakeNovaClient.Server(id=id, vm_state=vm_state)
+
+    def test_wait_until_condition_is_met(self):
+        self.novaclient.get_servers_changed_since.side_effect = [
+            [self._fake_server('1', 'rebuilding')],
+            [self._fake_server('1', 'active')],
+        ]
+
+        with self.watcher.register('1') as waiter:
+            server = waiter.wait(
+                lambda s: getattr(s, 'OS-EXT-STS:vm_state') == 'active', 5)
+
+        self.assertEqual('active', getattr(server, 'OS-EXT-STS:vm_state'))
+
+    def test_single_poll_wakes_all_waiters(self):
+        self.novaclient.get_servers_changed_since.return_value = [
+            self._fake_server('1', 'active'),
+            self._fake_server('2', 'active'),
+            self._fake_server('3', 'active')]
+
+        waiter_1 = self.watcher.register('1')
+        waiter_2 = self.watcher.register('2')
+
+        self.assertEqual('1', waiter_1.wait(lambda s: True, 5).id)
+        self.assertEqual('2', waiter_2.wait(lambda s: True, 5).id)
+        self.assertEqual(
+            1, self.novaclient.get_servers_changed_since.call_count)
+
+        waiter_1.close()
+        waiter_2.close()
+
+    def test_wait_timeout(self):
+        self.novaclient.get_servers_changed_since.return_value = []
+
+        with self.watcher.register('1') as waiter:
+            self.assertRaises(etimeout.Timeout, waiter.wait,
+                              lambda s: True, 0.1)
+
+    def test_poll_failure_does_not_stop_watching(self):
+        self.novaclient.get_servers_changed_since.side_effect = [
+            Exception(), [self._fake_server('1', 'active')]]
+
+        with self.watcher.register('1') as waiter:
+            self.assertEqual('1', waiter.wait(lambda s: True, 5).id)
+
+    def test_poller_stops_without_waiters(self):
+        self.novaclient.get_servers_changed_since.return_value = []
+
+        waiter = self.watcher.register('1')
+        poller = self.watcher._poller
+        waiter.close()
+        poller.wait()
+
+        self.assertIsNone(self.watcher._poller)
+        self.assertEqual({}, self.watcher._waiters)
+
+    def test_get_instance_watcher_is_shared(self):
+        self.assertIs(instance_watcher.get_instance_watcher(),
+                      instance_watcher.get_instance_watcher())
@@ -77,6 +77,11 @@ class EngineRpcAPITestCase(test.TestCase):
                         expected_back = expected_msg[kwarg].obj_to_primitive()
                         backup = value.obj_to_primitive()
                         self.assertEqual(expected_back, backup)
+                    elif isinstance(value, list):
+                        expected_back = [n.obj_to_primitive()
+                                         for n in expected_msg[kwarg]]
+                        backup = [n.obj_to_primitive() for n in value]
+                        self.assertEqual(expected_back, backup)
                     else:
                         self.assertEqual(expected_msg[kwarg], value)
 
@@ -87,6 +92,13 @@ class EngineRpcAPITestCase(test.TestCase):
                               notification=self.fake_notification_obj,
                               version='1.0')
 
+    @mock.patch("masakari.rpc.get_client")
+    def test_process_notifications(self, mock_get_client):
+        self._test_engine_api('process_notifications',
+                              rpc_method='cast',
+                              notifications=[self.fake_notification_obj],
+                              version='1.2')
+
     @mock.patch("masakari.rpc.get_client")
     def test_get_notification_recovery_workflow_details(self,
                                                         mock_get_client):
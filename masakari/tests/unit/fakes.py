@@ -41,7 +41,7 @@ class FakeNovaClient(object):
     class Server(object):
         def __init__(self, id=None, uuid=None, host=None, vm_state=None,
                      task_state=None, power_state=1, ha_enabled=None,
-                     ha_enabled_key='HA_Enabled', locked=False):
+                     ha_enabled_key='HA_Enabled', locked=False, flavor=None):
             self.id = id
             self.uuid = uuid or uuidutils.generate_uuid()
             self.host = host
@@ -51,6 +51,7 @@ class FakeNovaClient(object):
             setattr(self, 'OS-EXT-STS:power_state', power_state)
             self.metadata = {ha_enabled_key: ha_enabled}
             self.locked = locked
+            self.flavor = flavor
 
     class ServerManager(object):
         def __init__(self):
@@ -60,13 +61,14 @@ class FakeNovaClient(object):
 
         def create(self, id, uuid=None, host=None, vm_state='active',
                    task_state=None, power_state=1, ha_enabled=False,
-                   ha_enabled_key='HA_Enabled'):
+                   ha_enabled_key='HA_Enabled', flavor=None):
             server = FakeNovaClient.Server(id=id, uuid=uuid, host=host,
                                            vm_state=vm_state,
                                            task_state=task_state,
                                            power_state=power_state,
                                            ha_enabled=ha_enabled,
-                                           ha_enabled_key=ha_enabled_key)
+                                           ha_enabled_key=ha_enabled_key,
+                                           flavor=flavor)
             self._servers.append(server)
             return server
 
@@ -76,7 +78,8 @@ class FakeNovaClient(object):
                     return s
             return None
 
-        def list(self, detailed=True, search_opts=None):
+        def list(self, detailed=True, search_opts=None, marker=None,
+                 limit=None):
             matching = list(self._servers)
             if search_opts:
                 for opt, val in search_opts.items():
@@ -172,10 +175,34 @@ class FakeNovaClient(object):
                     services.append(service)
             return services
 
+    class Hypervisor(object):
+        def __init__(self, id=None, hypervisor_hostname=None, host=None,
+                     free_ram_mb=0):
+            self.id = id
+            self.hypervisor_hostname = hypervisor_hostname
+            self.service = {'host': host or hypervisor_hostname}
+            self.free_ram_mb = free_ram_mb
+
+    class HypervisorManager(object):
+        def __init__(self):
+            self._hypervisors = []
+
+        def create(self, id, hypervisor_hostname=None, host=None,
+                   free_ram_mb=0):
+            hypervisor = FakeNovaClient.Hypervisor(
+                id=id, hypervisor_hostname=hypervisor_hostname, host=host,
+                free_ram_mb=free_ram_mb)
+            self._hypervisors.append(hypervisor)
+            return hypervisor
+
+        def list(self):
+            return self._hypervisors
+
     def __init__(self):
         self.servers = FakeNovaClient.ServerManager()
         self.services = FakeNovaClient.Services()
         self.aggregates = FakeNovaClient.AggregatesManager()
+        self.hypervisors = FakeNovaClient.HypervisorManager()
 
 
 def create_fake_notification(type="VM", id=1, payload=None,
@@ -16,12 +16,15 @@
 """Tests for the failover segment api."""
 
 import copy
+import datetime
 from unittest import mock
 
 from oslo_utils import timeutils
 
 from masakari.api import utils as api_utils
 from masakari.compute import nova as nova_obj
+import masakari.conf
+from masakari import db
 from masakari.engine import rpcapi as engine_rpcapi
 from masakari import exception
 from masakari.ha import api as ha_api
@@ -35,6 +38,9 @@ from masakari import test
 from masakari.tests.unit.api.openstack import fakes
 from masakari.tests.unit import fakes as fakes_data
 from masakari.tests import uuidsentinel
+from masakari import utils
+
+CONF = masakari.conf.CONF
 
 NOW = timeutils.utcnow().replace(microsecond=0)
 
@@ -111,7 +117,16 @@ class FailoverSegmentAPITestCase(test.NoDBTestCase):
                                  limit=None, marker=None)
         mock_get_all.assert_called_once_with(self.context, filters=filters,
                                              sort_keys=None, sort_dirs=None,
-                                             limit=None, marker=None)
+                                             limit=None, marker=None,
+                                             use_slave=True, with_stats=False)
+
+    @mock.patch.object(segment_obj.FailoverSegmentList, 'get_all')
+    def test_get_all_with_stats(self, mock_get_all):
+        self.segment_api.get_all(self.context, with_stats=True)
+        mock_get_all.assert_called_once_with(self.context, filters=None,
+                                             sort_keys=None, sort_dirs=None,
+                                             limit=None, marker=None,
+                                             use_slave=True, with_stats=True)
 
     @mock.patch.object(segment_obj.FailoverSegmentList, 'get_all')
     def test_get_all_invalid_sort_dir(self, mock_get_all):
@@ -347,7 +362,8 @@ class HostAPITestCase(test.NoDBTestCase):
         mock_get.assert_called_once_with(self.context, filters=filters,
                                          sort_keys='created_at',
                                          sort_dirs='desc',
-                                         limit=None, marker=None)
+                                         limit=None, marker=None,
+                                         use_slave=True)
 
     @mock.patch.object(host_obj.HostList, 'get_all')
     def test_get_all_invalid_sort_dir(self, mock_get):
@@ -479,6 +495,199 @@ class HostAPITestCase(test.NoDBTestCase):
                       phase=phase_end)]
         mock_notify_about_host_api.assert_has_calls(notify_calls)
 
+    def _get_hosts_data(self):
+        return [{"name": "host-%s" % i, "type": "fake-type",
+                 "reserved": False, "on_maintenance": 'On',
+                 "control_attributes": "fake-control_attributes"}
+                for i in (1, 2)]
+
+    @mock.patch.object(host_obj.HostList, 'create')
+    @mock.patch.object(nova_obj.API, 'get_compute_service_hosts')
+    @mock.patch.object(segment_obj.FailoverSegment, 'get_by_uuid')
+    def test_create_hosts(self, mock_get, mock_get_compute_service_hosts,
+                          mock_hosts_create):
+        mock_get.return_value = self.failover_segment
+        mock_get_compute_service_hosts.return_value = {'host-1', 'host-2',
+                                                       'host-3'}
+        mock_hosts_create.return_value = [self.host]
+
+        result = self.host_api.create_hosts(self.context,
+                                            uuidsentinel.fake_segment,
+                                            self._get_hosts_data())
+
+        self.assertEqual([self.host], result)
+        # the compute services are listed once for all the hosts
+        mock_get_compute_service_hosts.assert_called_once_with(self.context)
+        hosts = mock_hosts_create.call_args[0][1]
+        self.assertEqual(['host-1', 'host-2'], [h.name for h in hosts])
+        self.assertEqual([True, True], [h.on_maintenance for h in hosts])
+        self.assertEqual([self.failover_segment] * 2,
+                         [h.failover_segment for h in hosts])
+
+    @mock.patch.object(host_obj.HostList, 'create')
+    @mock.patch.object(nova_obj.API, 'get_compute_service_hosts')
+    @mock.patch.object(segment_obj.FailoverSegment, 'get_by_uuid')
+    def test_create_hosts_non_existing_host(
+            self, mock_get, mock_get_compute_service_hosts,
+            mock_hosts_create):
+        mock_get.return_value = self.failover_segment
+        mock_get_compute_service_hosts.return_value = {'host-1'}
+
+        self.assertRaises(exception.ComputeNotFoundByName,
+                          self.host_api.create_hosts, self.context,
+                          uuidsentinel.fake_segment, self._get_hosts_data())
+        mock_hosts_create.assert_not_called()
+
+    @mock.patch.object(host_obj.HostList, 'create')
+    @mock.patch.object(nova_obj.API, 'get_compute_service_hosts')
+    @mock.patch.object(segment_obj.FailoverSegment, 'get_by_uuid')
+    def test_create_hosts_duplicate_names(
+            self, mock_get, mock_get_compute_service_hosts,
+            mock_hosts_create):
+        mock_get.return_value = self.failover_segment
+        hosts_data = self._get_hosts_data()
+        hosts_data[1]['name'] = 'host-1'
+
+        self.assertRaises(exception.HostExists,
+                          self.host_api.create_hosts, self.context,
+                          uuidsentinel.fake_segment, hosts_data)
+        mock_get_compute_service_hosts.assert_not_called()
+        mock_hosts_create.assert_not_called()
+
+    @mock.patch.object(host_obj.HostList, 'create')
+    @mock.patch.object(api_utils, 'notify_about_host_api')
+    @mock.patch.object(nova_obj.API, 'get_compute_service_hosts')
+    @mock.patch.object(segment_obj.FailoverSegment, 'get_by_uuid')
+    def test_create_hosts_exception(
+            self, mock_get, mock_get_compute_service_hosts,
+            mock_notify_about_host_api, mock_hosts_create):
+        mock_get.return_value = self.failover_segment
+        mock_get_compute_service_hosts.return_value = {'host-1', 'host-2'}
+        e = exception.HostExists(name='host-2')
+        mock_hosts_create.side_effect = e
+
+        self.assertRaises(exception.HostExists,
+                          self.host_api.create_hosts, self.context,
+                          uuidsentinel.fake_segment, self._get_hosts_data())
+        action = fields.EventNotificationAction.HOST_CREATE
+        phase_error = fields.EventNotificationPhase.ERROR
+        notify_calls = [
+            mock.call(self.context, mock.ANY, action=action,
+                      phase=phase_error, exception=e, tb=mock.ANY)] * 2
+        mock_notify_about_host_api.assert_has_calls(notify_calls)
+
+    def _get_hosts(self):
+        return [fakes_data.create_fake_host(
+            name="host-%s" % i, id=i, reserved=False, on_maintenance=False,
+            type="fake", control_attributes="fake-control_attributes",
+            uuid=getattr(uuidsentinel, 'fake_host_%s' % i))
+            for i in (1, 2)]
+
+    @mock.patch.object(host_obj.HostList, 'save_all')
+    @mock.patch.object(host_obj.HostList, 'get_all')
+    @mock.patch.object(nova_obj.API, 'get_compute_service_hosts')
+    @mock.patch.object(segment_obj.FailoverSegment, 'is_under_recovery')
+    @mock.patch.object(segment_obj.FailoverSegment, 'get_by_uuid')
+    def test_update_hosts(self, mock_get, mock_is_under_recovery,
+                          mock_get_compute_service_hosts, mock_get_all,
+                          mock_save_all):
+        mock_get.return_value = self.failover_segment
+        mock_is_under_recovery.return_value = False
+        mock_get_compute_service_hosts.return_value = {'host-3'}
+        hosts = self._get_hosts()
+        mock_get_all.return_value = hosts
+        mock_save_all.return_value = hosts
+
+        result = self.host_api.update_hosts(
+            self.context, uuidsentinel.fake_segment,
+            [{'id': uuidsentinel.fake_host_2, 'on_maintenance': 'yes'},
+             {'id': uuidsentinel.fake_host_1, 'name': 'host-3'}])
+
+        self.assertEqual(hosts, result)
+        # the recovery state of the segment is checked once
+        mock_is_under_recovery.assert_called_once()
+        mock_get_compute_service_hosts.assert_called_once_with(self.context)
+        mock_get_all.assert_called_once_with(self.context, filters={
+            'failover_segment_id': uuidsentinel.fake_segment,
+            'uuid': [uuidsentinel.fake_host_2, uuidsentinel.fake_host_1]})
+        mock_save_all.assert_called_once_with(self.context,
+                                              [hosts[1], hosts[0]])
+        self.assertEqual('host-3', hosts[0].name)
+        self.assertFalse(hosts[0].on_maintenance)
+        self.assertEqual('host-2', hosts[1].name)
+        self.assertTrue(hosts[1].on_maintenance)
+
+    @mock.patch.object(host_obj.HostList, 'get_all')
+    @mock.patch.object(segment_obj.FailoverSegment, 'is_under_recovery')
+    @mock.patch.object(segment_obj.FailoverSegment, 'get_by_uuid')
+    def test_update_hosts_segment_under_recovery(
+            self, mock_get, mock_is_under_recovery, mock_get_all):
+        mock_get.return_value = self.failover_segment
+        mock_is_under_recovery.return_value = True
+
+        self.assertRaises(exception.HostInUse, self.host_api.update_hosts,
+                          self.context, uuidsentinel.fake_segment,
+                          [{'id': uuidsentinel.fake_host_1,
+                            'on_maintenance': True}])
+        mock_get_all.assert_not_called()
+
+    @mock.patch.object(host_obj.HostList, 'save_all')
+    @mock.patch.object(host_obj.HostList, 'get_all')
+    @mock.patch.object(segment_obj.FailoverSegment, 'is_under_recovery')
+    @mock.patch.object(segment_obj.FailoverSegment, 'get_by_uuid')
+    def test_update_hosts_not_found(self, mock_get, mock_is_under_recovery,
+                                    mock_get_all, mock_save_all):
+        mock_get.return_value = self.failover_segment
+        mock_is_under_recovery.return_value = False
+        mock_get_all.return_value = self._get_hosts()[:1]
+
+        self.assertRaises(exception.HostNotFoundUnderFailoverSegment,
+                          self.host_api.update_hosts, self.context,
+                          uuidsentinel.fake_segment,
+                          [{'id': uuidsentinel.fake_host_1,
+                            'on_maintenance': True},
+                           {'id': uuidsentinel.fake_host_2,
+                            'on_maintenance': True}])
+        mock_save_all.assert_not_called()
+
+    @mock.patch.object(segment_obj.FailoverSegment, 'get_by_uuid')
+    def test_update_hosts_duplicate_ids(self, mock_get):
+        mock_get.return_value = self.failover_segment
+
+        self.assertRaises(exception.InvalidInput, self.host_api.update_hosts,
+                          self.context, uuidsentinel.fake_segment,
+                          [{'id': uuidsentinel.fake_host_1,
+                            'on_maintenance': True},
+                           {'id': uuidsentinel.fake_host_1,
+                            'reserved': True}])
+
+    @mock.patch.object(host_obj.HostList, 'save_all')
+    @mock.patch.object(api_utils, 'notify_about_host_api')
+    @mock.patch.object(host_obj.HostList, 'get_all')
+    @mock.patch.object(segment_obj.FailoverSegment, 'is_under_recovery')
+    @mock.patch.object(segment_obj.FailoverSegment, 'get_by_uuid')
+    def test_update_hosts_exception(
+            self, mock_get, mock_is_under_recovery, mock_get_all,
+            mock_notify_about_host_api, mock_save_all):
+        mock_get.return_value = self.failover_segment
+        mock_is_under_recovery.return_value = False
+        hosts = self._get_hosts()
+        mock_get_all.return_value = hosts
+        e = exception.HostNotFound(id=uuidsentinel.fake_host_2)
+        mock_save_all.side_effect = e
+
+        self.assertRaises(exception.HostNotFound,
+                          self.host_api.update_hosts, self.context,
+                          uuidsentinel.fake_segment,
+                          [{'id': host.uuid, 'reserved': True}
+                           for host in hosts])
+        action = fields.EventNotificationAction.HOST_UPDATE
+        phase_error = fields.EventNotificationPhase.ERROR
+        notify_calls = [
+            mock.call(self.context, host, action=action, phase=phase_error,
+                      exception=e, tb=mock.ANY) for host in hosts]
+        mock_notify_about_host_api.assert_has_calls(notify_calls)
+
     @mock.patch.object(host_obj.Host, 'get_by_uuid')
     @mock.patch.object(segment_obj.FailoverSegment, 'get_by_uuid')
     def test_get_host(self, mock_get, mock_get_host):
@@ -725,23 +934,13 @@ class NotificationAPITestCase(test.NoDBTestCase):
         self.assertTrue(obj_base.obj_equal_prims(expected, actual),
                         "The notification objects were not equal")
 
-    @mock.patch.object(notification_obj.NotificationList, 'get_all')
+    @mock.patch.object(notification_obj.Notification, 'is_duplicate')
     @mock.patch.object(notification_obj, 'Notification')
     @mock.patch.object(notification_obj.Notification, 'create')
     @mock.patch.object(host_obj.Host, 'get_by_name')
     def test_create(self, mock_host_obj, mock_create, mock_notification_obj,
-                    mock_get_all):
-        fake_notification = fakes_data.create_fake_notification(
-            type="COMPUTE_HOST", id=2, payload={
-                'event': 'STARTED', 'host_status': 'NORMAL',
-                'cluster_status': 'ONLINE'
-            },
-            source_host_uuid=uuidsentinel.fake_host, generated_time=NOW,
-            status="running",
-            notification_uuid=uuidsentinel.fake_notification_2
-        )
-        fake_notification_list = [self.notification, fake_notification]
-        mock_get_all.return_value = fake_notification_list
+                    mock_is_duplicate):
+        mock_is_duplicate.return_value = False
         notification_data = {"hostname": "fake_host",
                              "payload": {"event": "STARTED",
                                          "host_status": "NORMAL",
@@ -758,23 +957,14 @@ class NotificationAPITestCase(test.NoDBTestCase):
             self.notification, _make_notification_obj(result))
 
     @mock.patch.object(api_utils, 'notify_about_notification_api')
-    @mock.patch.object(notification_obj.NotificationList, 'get_all')
+    @mock.patch.object(notification_obj.Notification, 'is_duplicate')
     @mock.patch.object(notification_obj.Notification, 'create')
     @mock.patch.object(host_obj.Host, 'get_by_name')
     def test_create_notification_exception(self, mock_host_obj,
-                                           mock_notification_obj, mock_get_all,
+                                           mock_notification_obj,
+                                           mock_is_duplicate,
                                            mock_notify_about_notification_api):
-        fake_notification = fakes_data.create_fake_notification(
-            type="COMPUTE_HOST", id=2, payload={
-                'event': 'STARTED', 'host_status': 'NORMAL',
-                'cluster_status': 'ONLINE'
-            },
-            source_host_uuid=uuidsentinel.fake_host, generated_time=NOW,
-            status="running",
-            notification_uuid=uuidsentinel.fake_notification_2
-        )
-        fake_notification_list = [self.notification, fake_notification]
-        mock_get_all.return_value = fake_notification_list
+        mock_is_duplicate.return_value = False
         notification_data = {"hostname": "fake_host",
                              "payload": {"event": "STARTED",
                                          "host_status": "NORMAL",
@@ -814,6 +1004,100 @@ class NotificationAPITestCase(test.NoDBTestCase):
                           self.notification_api.create_notification,
                           self.context, notification_data)
 
+    def _get_notifications_data(self, host_names):
+        return [{"hostname": host_name,
+                 "payload": {"event": "STOPPED",
+                             "host_status": "NORMAL",
+                             "cluster_status": "ONLINE"},
+                 "type": "COMPUTE_HOST",
+                 "generated_time": str(NOW)}
+                for host_name in host_names]
+
+    @mock.patch.object(notification_obj.NotificationList, 'create')
+    @mock.patch.object(notification_obj.NotificationList, 'check_duplicates')
+    @mock.patch.object(host_obj.HostList, 'get_all')
+    def test_create_notifications(self, mock_get_all, mock_check_duplicates,
+                                  mock_create):
+        host_2 = fakes_data.create_fake_host(
+            name="host_2", id=2, reserved=False, on_maintenance=True,
+            type="fake", control_attributes="fake-control_attributes",
+            uuid=uuidsentinel.fake_host_2)
+        mock_get_all.return_value = [self.host, host_2]
+        mock_check_duplicates.return_value = [False, True, False]
+        created = [mock.sentinel.notification_1,
+                   mock.sentinel.notification_4]
+        mock_create.return_value = created
+        notifications_data = self._get_notifications_data(
+            ["host_1", "host_1", "host_2", "host_1", "host_3"])
+
+        results = self.notification_api.create_notifications(
+            self.context, notifications_data)
+
+        self.assertEqual(5, len(results))
+        self.assertEqual(mock.sentinel.notification_1, results[0])
+        self.assertIsInstance(results[1], exception.DuplicateNotification)
+        self.assertIsInstance(results[2], exception.HostOnMaintenanceError)
+        self.assertEqual(mock.sentinel.notification_4, results[3])
+        self.assertIsInstance(results[4], exception.HostNotFoundByName)
+        mock_get_all.assert_called_once_with(
+            self.context, filters={'name': ['host_1', 'host_2', 'host_3']})
+        candidates = mock_check_duplicates.call_args[0][1]
+        self.assertEqual(3, len(candidates))
+        self.assertEqual({uuidsentinel.fake_host_1},
+                         {n.source_host_uuid for n in candidates})
+        mock_check_duplicates.assert_called_once_with(
+            self.context, candidates,
+            CONF.duplicate_notification_detection_interval, use_slave=True)
+        mock_create.assert_called_once_with(
+            self.context, [candidates[0], candidates[2]])
+        # the created notifications are sent to the engine together
+        engine_rpcapi = self.notification_api.engine_rpcapi
+        engine_rpcapi.process_notifications.assert_called_once_with(
+            self.context, created)
+
+    @mock.patch.object(notification_obj.NotificationList, 'create')
+    @mock.patch.object(notification_obj.NotificationList, 'check_duplicates')
+    @mock.patch.object(host_obj.HostList, 'get_all')
+    def test_create_notifications_all_rejected(self, mock_get_all,
+                                               mock_check_duplicates,
+                                               mock_create):
+        mock_get_all.return_value = []
+        mock_check_duplicates.return_value = []
+
+        results = self.notification_api.create_notifications(
+            self.context, self._get_notifications_data(["host_3"]))
+
+        self.assertEqual(1, len(results))
+        self.assertIsInstance(results[0], exception.HostNotFoundByName)
+        self.assertFalse(mock_create.called)
+        self.assertFalse(
+            self.notification_api.engine_rpcapi.process_notifications.called)
+
+    @mock.patch.object(api_utils, 'notify_about_notification_api')
+    @mock.patch.object(notification_obj.NotificationList, 'create')
+    @mock.patch.object(notification_obj.NotificationList, 'check_duplicates')
+    @mock.patch.object(host_obj.HostList, 'get_all')
+    def test_create_notifications_exception(
+            self, mock_get_all, mock_check_duplicates, mock_create,
+            mock_notify_about_notification_api):
+        mock_get_all.return_value = [self.host]
+        mock_check_duplicates.return_value = [False, False]
+        e = exception.InvalidInput(reason="TEST")
+        mock_create.side_effect = e
+
+        self.assertRaises(exception.InvalidInput,
+                          self.notification_api.create_notifications,
+                          self.context,
+                          self._get_notifications_data(["host_1", "host_1"]))
+
+        action = fields.EventNotificationAction.NOTIFICATION_CREATE
+        phase_error = fields.EventNotificationPhase.ERROR
+        notify_call = mock.call(self.context, mock.ANY, action=action,
+                                phase=phase_error, exception=e,
+                                tb=mock.ANY)
+        mock_notify_about_notification_api.assert_has_calls(
+            [notify_call, notify_call])
+
     @mock.patch.object(exception, 'DuplicateNotification')
     @mock.patch.object(objects, 'Notification')
     @mock.patch.object(host_obj.Host, 'get_by_name')
@@ -841,33 +1125,51 @@ class NotificationAPITestCase(test.NoDBTestCase):
                           self.notification_api.create_notification,
                           self.context, notification_data)
 
-    @mock.patch.object(notification_obj.NotificationList, 'get_all')
-    def test_create_is_duplicate_true(self, mock_get_all):
-        mock_get_all.return_value = [self.notification, ]
+    @mock.patch.object(db, 'notification_duplicate_exists')
+    def test_create_is_duplicate_true(self, mock_duplicate_exists):
+        mock_duplicate_exists.return_value = True
+        self.notification._context = self.context
 
         self.assertTrue(self.notification_api._is_duplicate_notification(
             self.context, self.notification))
-
-    @mock.patch.object(notification_obj.NotificationList, 'get_all')
+        mock_duplicate_exists.assert_called_once_with(
+            self.context, self.notification.source_host_uuid,
+            self.notification.type,
+            utils.get_payload_hash(self.notification.payload),
+            self.notification.generated_time - datetime.timedelta(
+                seconds=CONF.duplicate_notification_detection_interval),
+            use_slave=True)
+
+    @mock.patch.object(db, 'notification_duplicate_exists')
     def test_is_duplicate_true_for_any_notification_status(
-            self, mock_get_all):
-        FAKE_NOTIFICATION_FINISHED = copy.deepcopy(self.notification)
-        FAKE_NOTIFICATION_FINISHED.status = fields.NotificationStatus.FINISHED
-        mock_get_all.return_value = [FAKE_NOTIFICATION_FINISHED]
+            self, mock_duplicate_exists):
+        mock_duplicate_exists.return_value = True
+        self.notification._context = self.context
         FAKE_NOTIFICATION_NEW = copy.deepcopy(self.notification)
         FAKE_NOTIFICATION_NEW.status = fields.NotificationStatus.NEW
+        FAKE_NOTIFICATION_FINISHED = copy.deepcopy(self.notification)
+        FAKE_NOTIFICATION_FINISHED.status = fields.NotificationStatus.FINISHED
+
         self.assertTrue(self.notification_api._is_duplicate_notification(
             self.context, FAKE_NOTIFICATION_NEW))
-
-    @mock.patch.object(notification_obj.NotificationList, 'get_all')
-    def test_create_is_duplicate_false(self, mock_get_all):
-        mock_get_all.return_value = [self.notification, ]
+        self.assertTrue(self.notification_api._is_duplicate_notification(
+            self.context, FAKE_NOTIFICATION_FINISHED))
+        # the status of the notification is not part of the lookup
+        self.assertEqual(mock_duplicate_exists.call_args_list[0],
+                         mock_duplicate_exists.call_args_list[1])
+
+    @mock.patch.object(db, 'notification_duplicate_exists')
+    def test_create_is_duplicate_false(self, mock_duplicate_exists):
+        mock_duplicate_exists.return_value = False
+        self.notification._context = self.context
         FAKE_NOTIFICATION = copy.deepcopy(self.notification)
         FAKE_NOTIFICATION.payload = {'event': 'STOPPED',
                                      'host_status': 'UNKNOWN',
                                      'cluster_status': 'OFFLINE'}
         self.assertFalse(self.notification_api._is_duplicate_notification(
             self.context, FAKE_NOTIFICATION))
+        self.assertEqual(utils.get_payload_hash(FAKE_NOTIFICATION.payload),
+                         mock_duplicate_exists.call_args[0][3])
 
     @mock.patch.object(notification_obj.Notification, 'get_by_uuid')
     def test_get_notification(self, mock_get_notification):
@@ -924,7 +1226,8 @@ class NotificationAPITestCase(test.NoDBTestCase):
                                       sort_dirs='asc', limit=1000, marker=None)
         mock_get_all.assert_called_once_with(self.context, {'status': 'new'},
                                              'generated_time', 'asc',
-                                             1000, None)
+                                             1000, None, use_slave=True,
+                                             fields=None)
 
     @mock.patch.object(notification_obj.NotificationList, 'get_all')
     def test_get_all_invalid_sort_dir(self, mock_get_all):
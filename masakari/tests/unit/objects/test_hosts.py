@@ -23,6 +23,7 @@ from masakari import db
 from masakari import exception
 from masakari.objects import fields
 from masakari.objects import host
+from masakari.objects import segment
 from masakari.tests.unit import fakes as fakes_data
 from masakari.tests.unit.objects import test_objects
 from masakari.tests import uuidsentinel
@@ -69,7 +70,8 @@ class TestHostObject(test_objects._LocalTest):
 
     def _compare_segment_and_host_data(self, obj):
 
-        self.compare_obj(obj.failover_segment, fake_segment_dict)
+        self.compare_obj(obj.failover_segment, fake_segment_dict,
+                         allow_missing=segment.SEGMENT_STATISTICS_FIELDS)
         self.assertEqual(obj.name, fake_host.get('name'))
         self.assertEqual(obj.reserved, fake_host.get('reserved'))
         self.assertEqual(obj.on_maintenance, fake_host.get('on_maintenance'))
@@ -218,7 +220,28 @@ class TestHostObject(test_objects._LocalTest):
         self.assertEqual(2, len(host_result))
         mock_api_get.assert_called_once_with(self.context, filters={
             'reserved': False
-        }, limit=None, marker=None, sort_dirs=None, sort_keys=None)
+        }, limit=None, marker=None, sort_dirs=None, sort_keys=None,
+            use_slave=False)
+
+    @mock.patch.object(db, 'host_get_all_by_filters')
+    def test_get_host_by_filters_shares_segments(self, mock_api_get):
+        fake_host2 = copy.deepcopy(fake_host)
+        fake_host2['name'] = 'fake_host22'
+        fake_host3 = copy.deepcopy(fake_host)
+        fake_host3['name'] = 'fake_host33'
+        fake_host3['failover_segment']['uuid'] = uuidsentinel.fake_segment2
+
+        mock_api_get.return_value = [fake_host, fake_host2, fake_host3]
+
+        host_result = host.HostList.get_all(self.context)
+
+        self.assertIs(host_result[0].failover_segment,
+                      host_result[1].failover_segment)
+        self.assertIsNot(host_result[0].failover_segment,
+                         host_result[2].failover_segment)
+        self.assertEqual(uuidsentinel.fake_segment2,
+                         host_result[2].failover_segment.uuid)
+        self.assertFalse(host_result.obj_what_changed())
 
     @mock.patch.object(db, 'host_get_all_by_filters')
     def test_get_limit_and_marker_invalid_marker(self, mock_api_get):
@@ -229,6 +252,91 @@ class TestHostObject(test_objects._LocalTest):
                           host.HostList.get_all,
                           self.context, limit=5, marker=host_name)
 
+    @mock.patch.object(api_utils, 'notify_about_host_api')
+    @mock.patch.object(db, 'hosts_create')
+    def test_create_list(self, mock_db_create, mock_notify_about_host_api):
+        fake_host2 = _fake_host(id=124, uuid=uuidsentinel.fake_host2,
+                                name='fake-host2')
+        mock_db_create.return_value = [fake_host, fake_host2]
+        host_obj = self._host_create_attributes()
+        host_obj2 = self._host_create_attributes()
+        host_obj2.name = 'foo-host2'
+        host_obj2.uuid = uuidsentinel.fake_host2
+
+        host_result = host.HostList.create(self.context,
+                                           [host_obj, host_obj2])
+
+        self.assertEqual([uuidsentinel.fake_host, uuidsentinel.fake_host2],
+                         [h.uuid for h in host_result])
+        self.assertIs(host_result[0].failover_segment,
+                      host_result[1].failover_segment)
+        mock_db_create.assert_called_once_with(self.context, [
+            {'failover_segment_id': uuidsentinel.fake_segment,
+             'on_maintenance': False, 'uuid': uuidsentinel.fake_host,
+             'reserved': False, 'name': u'foo-host',
+             'control_attributes': u'fake_attributes',
+             'type': u'fake-type'},
+            {'failover_segment_id': uuidsentinel.fake_segment,
+             'on_maintenance': False, 'uuid': uuidsentinel.fake_host2,
+             'reserved': False, 'name': u'foo-host2',
+             'control_attributes': u'fake_attributes',
+             'type': u'fake-type'}])
+        action = fields.EventNotificationAction.HOST_CREATE
+        phase_start = fields.EventNotificationPhase.START
+        phase_end = fields.EventNotificationPhase.END
+        notify_calls = [
+            mock.call(self.context, host_obj, action=action,
+                      phase=phase_start),
+            mock.call(self.context, host_obj2, action=action,
+                      phase=phase_start),
+            mock.call(self.context, host_result[0], action=action,
+                      phase=phase_end),
+            mock.call(self.context, host_result[1], action=action,
+                      phase=phase_end)]
+        mock_notify_about_host_api.assert_has_calls(notify_calls)
+
+    @mock.patch.object(api_utils, 'notify_about_host_api')
+    @mock.patch.object(db, 'hosts_update')
+    def test_save_all(self, mock_hosts_update, mock_notify_about_host_api):
+        fake_host2 = _fake_host(id=124, uuid=uuidsentinel.fake_host2,
+                                name='fake-host2')
+        host_obj = host.Host._from_db_object(self.context, host.Host(),
+                                             fake_host)
+        host_obj2 = host.Host._from_db_object(self.context, host.Host(),
+                                              fake_host2)
+        host_obj2.on_maintenance = True
+        mock_hosts_update.return_value = [
+            fake_host, dict(fake_host2, on_maintenance=True)]
+
+        host_result = host.HostList.save_all(self.context,
+                                             [host_obj, host_obj2])
+
+        self.assertEqual([False, True],
+                         [h.on_maintenance for h in host_result])
+        mock_hosts_update.assert_called_once_with(self.context, {
+            uuidsentinel.fake_host: {},
+            uuidsentinel.fake_host2: {'on_maintenance': True}})
+        action = fields.EventNotificationAction.HOST_UPDATE
+        phase_start = fields.EventNotificationPhase.START
+        phase_end = fields.EventNotificationPhase.END
+        notify_calls = [
+            mock.call(self.context, host_obj, action=action,
+                      phase=phase_start),
+            mock.call(self.context, host_obj2, action=action,
+                      phase=phase_start),
+            mock.call(self.context, host_result[0], action=action,
+                      phase=phase_end),
+            mock.call(self.context, host_result[1], action=action,
+                      phase=phase_end)]
+        mock_notify_about_host_api.assert_has_calls(notify_calls)
+
+    def test_save_all_segment_changed(self):
+        host_obj = self._host_create_attributes()
+        host_obj.id = 123
+
+        self.assertRaises(exception.ObjectActionError,
+                          host.HostList.save_all, self.context, [host_obj])
+
     @mock.patch.object(api_utils, 'notify_about_host_api')
     @mock.patch('masakari.objects.base.MasakariObject'
                 '.masakari_obj_get_changes')
@@ -14,6 +14,7 @@
 #    under the License.
 
 import copy
+import datetime
 from unittest import mock
 
 from oslo_utils import timeutils
@@ -26,6 +27,7 @@ from masakari.objects import fields
 from masakari.objects import notification
 from masakari.tests.unit.objects import test_objects
 from masakari.tests import uuidsentinel
+from masakari import utils
 
 NOW = timeutils.utcnow().replace(microsecond=0)
 OPTIONAL = ['recovery_workflow_details']
@@ -125,7 +127,9 @@ class TestNotificationObject(test_objects._LocalTest):
             'source_host_uuid': uuidsentinel.fake_host,
             'notification_uuid': uuidsentinel.fake_notification,
             'generated_time': NOW, 'status': 'new',
-            'type': 'COMPUTE_HOST', 'payload': '{"fake_key": "fake_value"}'})
+            'type': 'COMPUTE_HOST', 'payload': '{"fake_key": "fake_value"}',
+            'payload_hash': utils.get_payload_hash(
+                {'fake_key': 'fake_value'})})
         action = fields.EventNotificationAction.NOTIFICATION_CREATE
         phase_start = fields.EventNotificationPhase.START
         phase_end = fields.EventNotificationPhase.END
@@ -150,7 +154,9 @@ class TestNotificationObject(test_objects._LocalTest):
             'source_host_uuid': uuidsentinel.fake_host,
             'notification_uuid': uuidsentinel.fake_notification,
             'generated_time': NOW, 'status': 'new',
-            'type': 'COMPUTE_HOST', 'payload': '{"fake_key": "fake_value"}'})
+            'type': 'COMPUTE_HOST', 'payload': '{"fake_key": "fake_value"}',
+            'payload_hash': utils.get_payload_hash(
+                {'fake_key': 'fake_value'})})
         action = fields.EventNotificationAction.NOTIFICATION_CREATE
         phase_start = fields.EventNotificationPhase.START
         phase_end = fields.EventNotificationPhase.END
@@ -179,7 +185,9 @@ class TestNotificationObject(test_objects._LocalTest):
             'source_host_uuid': uuidsentinel.fake_host,
             'notification_uuid': uuidsentinel.fake_notification,
             'generated_time': NOW, 'status': 'new',
-            'type': 'COMPUTE_HOST', 'payload': '{"fake_key": "fake_value"}'})
+            'type': 'COMPUTE_HOST', 'payload': '{"fake_key": "fake_value"}',
+            'payload_hash': utils.get_payload_hash(
+                {'fake_key': 'fake_value'})})
         self.assertTrue(mock_generate_uuid.called)
         action = fields.EventNotificationAction.NOTIFICATION_CREATE
         phase_start = fields.EventNotificationPhase.START
@@ -214,6 +222,64 @@ class TestNotificationObject(test_objects._LocalTest):
                           notification_obj.destroy)
         self.assertFalse(mock_destroy.called)
 
+    @mock.patch.object(db, 'notification_duplicate_exists')
+    def test_is_duplicate(self, mock_duplicate_exists):
+        mock_duplicate_exists.return_value = True
+        notification_obj = self._notification_create_attributes()
+
+        self.assertTrue(notification_obj.is_duplicate(NOW, use_slave=True))
+        mock_duplicate_exists.assert_called_once_with(
+            self.context, uuidsentinel.fake_host, 'COMPUTE_HOST',
+            utils.get_payload_hash({'fake_key': 'fake_value'}), NOW,
+            use_slave=True)
+
+    @mock.patch.object(db, 'notification_update_status')
+    def test_update_status(self, mock_notification_update_status):
+        mock_notification_update_status.return_value = True
+        notification_obj = self._notification_create_attributes()
+
+        self.assertTrue(notification_obj.update_status(
+            'running', 'new', claimed_by='fake-engine'))
+        self.assertEqual('running', notification_obj.status)
+        self.assertNotIn('status', notification_obj.obj_what_changed())
+        mock_notification_update_status.assert_called_once_with(
+            self.context, uuidsentinel.fake_notification, 'running', 'new',
+            claimed_by='fake-engine')
+
+    @mock.patch.object(db, 'notification_update_status')
+    def test_update_status_lost(self, mock_notification_update_status):
+        mock_notification_update_status.return_value = False
+        notification_obj = self._notification_create_attributes()
+
+        self.assertFalse(notification_obj.update_status('running', 'new'))
+        self.assertEqual('new', notification_obj.status)
+
+    @mock.patch.object(db, 'notification_claim')
+    def test_claim(self, mock_notification_claim):
+        mock_notification_claim.return_value = True
+        notification_obj = self._notification_create_attributes()
+
+        self.assertTrue(notification_obj.claim('fake-engine', 60))
+        mock_notification_claim.assert_called_once_with(
+            self.context, uuidsentinel.fake_notification, 'fake-engine', 60)
+
+    @mock.patch.object(db, 'notification_renew_lease')
+    def test_renew_lease(self, mock_notification_renew_lease):
+        mock_notification_renew_lease.return_value = False
+        notification_obj = self._notification_create_attributes()
+
+        self.assertFalse(notification_obj.renew_lease('fake-engine', 60))
+        mock_notification_renew_lease.assert_called_once_with(
+            self.context, uuidsentinel.fake_notification, 'fake-engine', 60)
+
+    @mock.patch.object(db, 'notification_release')
+    def test_release(self, mock_notification_release):
+        notification_obj = self._notification_create_attributes()
+
+        notification_obj.release('fake-engine')
+        mock_notification_release.assert_called_once_with(
+            self.context, uuidsentinel.fake_notification, 'fake-engine')
+
     @mock.patch.object(db, 'notifications_get_all_by_filters')
     def test_get_notification_by_filters(self, mock_api_get):
         fake_db_notification2 = copy.deepcopy(fake_db_notification)
@@ -231,7 +297,148 @@ class TestNotificationObject(test_objects._LocalTest):
         self.assertEqual(2, len(notification_result))
         mock_api_get.assert_called_once_with(self.context, filters={
             'status': 'new'
-        }, limit=None, marker=None, sort_dirs=None, sort_keys=None)
+        }, limit=None, marker=None, sort_dirs=None, sort_keys=None,
+            use_slave=False, columns=None)
+
+    @mock.patch.object(db, 'notifications_get_all_by_filters')
+    def test_get_notification_by_filters_with_fields(self, mock_api_get):
+        mock_api_get.return_value = [fake_db_notification]
+
+        notification_result = notification.NotificationList.get_all(
+            self.context, fields=['notification_uuid', 'status',
+                                  'recovery_workflow_details'])
+
+        mock_api_get.assert_called_once_with(
+            self.context, filters=None, limit=None, marker=None,
+            sort_dirs=None, sort_keys=None, use_slave=False,
+            columns=['notification_uuid', 'status'])
+        self.assertEqual(1, len(notification_result))
+        self.assertEqual({'notification_uuid', 'status'},
+                         set(notification_result[0]))
+
+    def test_payload_decoded_on_access(self):
+        with mock.patch.object(db, 'notification_get_by_uuid',
+                               return_value=fake_db_notification):
+            notification_obj = notification.Notification.get_by_uuid(
+                self.context, uuidsentinel.fake_notification)
+
+        self.assertTrue(notification_obj.obj_attr_is_set('payload'))
+        with mock.patch.object(notification.jsonutils, 'loads',
+                               wraps=notification.jsonutils.loads) as loads:
+            self.assertEqual({"fake_key": "fake_value"},
+                             notification_obj.payload)
+            self.assertEqual({"fake_key": "fake_value"},
+                             notification_obj.payload)
+        loads.assert_called_once_with('{"fake_key": "fake_value"}')
+        self.assertEqual(set(), notification_obj.obj_what_changed())
+
+    @mock.patch.object(db, 'notifications_update_status_by_filters')
+    def test_update_status_by_filters(self, mock_update_status):
+        fake_db_notification2 = copy.deepcopy(fake_db_notification)
+        fake_db_notification2['status'] = 'failed'
+        mock_update_status.return_value = [fake_db_notification2]
+
+        filters = {'status': ['new', 'running', 'error']}
+        notification_result = (notification.NotificationList.
+                               update_status_by_filters(self.context,
+                                                        filters, 'failed'))
+
+        self.assertEqual(1, len(notification_result))
+        self.assertEqual('failed', notification_result[0].status)
+        mock_update_status.assert_called_once_with(self.context, filters,
+                                                   'failed')
+
+    @mock.patch.object(db, 'archive_notifications')
+    def test_archive(self, mock_archive):
+        mock_archive.return_value = 2
+
+        rows = notification.NotificationList.archive(self.context, 30,
+                                                     batch_size=100)
+
+        self.assertEqual(2, rows)
+        mock_archive.assert_called_once_with(self.context, 30,
+                                             batch_size=100)
+
+    @mock.patch.object(db, 'notifications_get_generated_since')
+    def test_check_duplicates(self, mock_generated_since):
+        payload_hash = utils.get_payload_hash({'fake_key': 'fake_value'})
+        mock_generated_since.return_value = [
+            (uuidsentinel.fake_host, 'COMPUTE_HOST', payload_hash,
+             NOW - datetime.timedelta(seconds=150))]
+
+        notifications = []
+        for seconds, host_uuid in ((0, uuidsentinel.fake_host),
+                                   (0, uuidsentinel.other_host),
+                                   (300, uuidsentinel.fake_host),
+                                   (310, uuidsentinel.fake_host)):
+            notification_obj = self._notification_create_attributes(
+                skip_uuid=True)
+            notification_obj.generated_time = (
+                NOW + datetime.timedelta(seconds=seconds))
+            notification_obj.source_host_uuid = host_uuid
+            notifications.append(notification_obj)
+
+        duplicates = notification.NotificationList.check_duplicates(
+            self.context, notifications, 180, use_slave=True)
+
+        # the first notification duplicates the stored one and the fourth
+        # one duplicates the third one, accepted in the same batch.
+        self.assertEqual([True, False, False, True], duplicates)
+        mock_generated_since.assert_called_once_with(
+            self.context, {uuidsentinel.fake_host, uuidsentinel.other_host},
+            {payload_hash}, NOW - datetime.timedelta(seconds=180),
+            use_slave=True)
+
+    @mock.patch.object(db, 'notifications_get_generated_since')
+    def test_check_duplicates_no_notifications(self, mock_generated_since):
+        self.assertEqual([], notification.NotificationList.check_duplicates(
+            self.context, [], 180))
+        self.assertFalse(mock_generated_since.called)
+
+    @mock.patch.object(api_utils, 'notify_about_notification_api')
+    @mock.patch.object(db, 'notifications_create')
+    def test_create_list(self, mock_db_create,
+                         mock_notify_about_notification_api):
+        fake_db_notification2 = _fake_db_notification(
+            id=124, notification_uuid=uuidsentinel.fake_notification2)
+        mock_db_create.return_value = [fake_db_notification,
+                                       fake_db_notification2]
+        notifications = [self._notification_create_attributes(),
+                         self._notification_create_attributes()]
+        notifications[1].notification_uuid = uuidsentinel.fake_notification2
+
+        created = notification.NotificationList.create(self.context,
+                                                       notifications)
+
+        self.assertEqual(2, len(created))
+        self.compare_obj(created[0], fake_object_notification,
+                         allow_missing=OPTIONAL)
+        self.compare_obj(created[1], _fake_object_notification(
+            id=124, notification_uuid=uuidsentinel.fake_notification2),
+            allow_missing=OPTIONAL)
+        values = {
+            'source_host_uuid': uuidsentinel.fake_host,
+            'notification_uuid': uuidsentinel.fake_notification,
+            'generated_time': NOW, 'status': 'new',
+            'type': 'COMPUTE_HOST', 'payload': '{"fake_key": "fake_value"}',
+            'payload_hash': utils.get_payload_hash(
+                {'fake_key': 'fake_value'})}
+        values2 = dict(values,
+                       notification_uuid=uuidsentinel.fake_notification2)
+        mock_db_create.assert_called_once_with(self.context,
+                                               [values, values2])
+        action = fields.EventNotificationAction.NOTIFICATION_CREATE
+        phase_start = fields.EventNotificationPhase.START
+        phase_end = fields.EventNotificationPhase.END
+        mock_notify_about_notification_api.assert_has_calls([
+            mock.call(self.context, notifications[0], action=action,
+                      phase=phase_start),
+            mock.call(self.context, notifications[1], action=action,
+                      phase=phase_start),
+            mock.call(self.context, created[0], action=action,
+                      phase=phase_end),
+            mock.call(self.context, created[1], action=action,
+                      phase=phase_end)])
 
     @mock.patch.object(db, 'notifications_get_all_by_filters')
     def test_get_limit_and_marker_invalid_marker(self, mock_api_get):
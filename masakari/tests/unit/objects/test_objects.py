@@ -653,13 +653,13 @@ class TestRegistry(test.NoDBTestCase):
 # they come with a corresponding version bump in the affected
 # objects
 object_data = {
-    'FailoverSegment': '1.0-5e8b8bc8840b35439b5f2b621482d15d',
-    'FailoverSegmentList': '1.0-dfc5c6f5704d24dcaa37b0bbb03cbe60',
-    'Host': '1.2-f05735b156b687bc916d46b551bc45e3',
-    'HostList': '1.0-25ebe1b17fbd9f114fae8b6a10d198c0',
-    'Notification': '1.1-91e3a051078e35300e325a3e2ae5fde5',
+    'FailoverSegment': '1.1-8ecc2b649c98e82847f65d0359a6ba0b',
+    'FailoverSegmentList': '1.2-9cd35237a64b3396b7929a12928ca895',
+    'Host': '1.3-d0ffdc7f7c6dcbd61e4b699b601ec654',
+    'HostList': '1.2-d506ca3f03738434eaf50bf336b8e446',
+    'Notification': '1.6-9193562fbe36b6b47e3d66a34bbafd75',
     'NotificationProgressDetails': '1.0-fc611ac932b719fbc154dbe34bb8edee',
-    'NotificationList': '1.0-25ebe1b17fbd9f114fae8b6a10d198c0',
+    'NotificationList': '1.5-1d4cfa73caf24519e457a03a1b8cd437',
     'EventType': '1.0-d1d2010a7391fa109f0868d964152607',
     'ExceptionNotification': '1.0-1187e93f564c5cca692db76a66cda2a6',
     'ExceptionPayload': '1.0-96f178a12691e3ef0d8e3188fc481b90',
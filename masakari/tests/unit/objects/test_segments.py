@@ -27,6 +27,7 @@ from masakari.tests import uuidsentinel
 
 
 NOW = timeutils.utcnow().replace(microsecond=0)
+OPTIONAL = segment.SEGMENT_STATISTICS_FIELDS
 
 fake_segment = {
     'created_at': NOW,
@@ -51,7 +52,7 @@ class TestFailoverSegmentObject(test_objects._LocalTest):
 
         segment_obj = segment.FailoverSegment.get_by_name(self.context,
                                                           'foo-segment')
-        self.compare_obj(segment_obj, fake_segment)
+        self.compare_obj(segment_obj, fake_segment, allow_missing=OPTIONAL)
 
         mock_api_get.assert_called_once_with(self.context, 'foo-segment')
 
@@ -62,7 +63,7 @@ class TestFailoverSegmentObject(test_objects._LocalTest):
 
         segment_obj = (segment.FailoverSegment.
                        get_by_uuid(self.context, uuidsentinel.fake_segment))
-        self.compare_obj(segment_obj, fake_segment)
+        self.compare_obj(segment_obj, fake_segment, allow_missing=OPTIONAL)
 
         mock_api_get.assert_called_once_with(self.context,
                                              uuidsentinel.fake_segment)
@@ -73,7 +74,7 @@ class TestFailoverSegmentObject(test_objects._LocalTest):
         mock_api_get.return_value = fake_segment
         fake_id = 123
         segment_obj = segment.FailoverSegment.get_by_id(self.context, fake_id)
-        self.compare_obj(segment_obj, fake_segment)
+        self.compare_obj(segment_obj, fake_segment, allow_missing=OPTIONAL)
 
         mock_api_get.assert_called_once_with(self.context, fake_id)
 
@@ -95,7 +96,7 @@ class TestFailoverSegmentObject(test_objects._LocalTest):
 
         segment_obj = self._segment_create_attribute()
         segment_obj.create()
-        self.compare_obj(segment_obj, fake_segment)
+        self.compare_obj(segment_obj, fake_segment, allow_missing=OPTIONAL)
 
         mock_segment_create.assert_called_once_with(self.context, {
             'uuid': uuidsentinel.fake_segment, 'name': 'foo-segment',
@@ -183,11 +184,14 @@ class TestFailoverSegmentObject(test_objects._LocalTest):
                           get_all(self.context,
                                   filters={'recovery_method': 'auto'}))
         self.assertEqual(2, len(segment_result))
-        self.compare_obj(segment_result[0], fake_segment2)
-        self.compare_obj(segment_result[1], fake_segment)
+        self.compare_obj(segment_result[0], fake_segment2,
+                         allow_missing=OPTIONAL)
+        self.compare_obj(segment_result[1], fake_segment,
+                         allow_missing=OPTIONAL)
         mock_api_get.assert_called_once_with(self.context, filters={
             'recovery_method': 'auto'
-        }, limit=None, marker=None, sort_dirs=None, sort_keys=None)
+        }, limit=None, marker=None, sort_dirs=None, sort_keys=None,
+            use_slave=False, with_stats=False)
 
     @mock.patch('masakari.db.failover_segment_get_all_by_filters')
     def test_get_segment_by_service_type(self, mock_api_get):
@@ -200,11 +204,41 @@ class TestFailoverSegmentObject(test_objects._LocalTest):
                           get_all(self.context,
                                   filters={'service_type': 'COMPUTE'}))
         self.assertEqual(2, len(segment_result))
-        self.compare_obj(segment_result[0], fake_segment2)
-        self.compare_obj(segment_result[1], fake_segment)
+        self.compare_obj(segment_result[0], fake_segment2,
+                         allow_missing=OPTIONAL)
+        self.compare_obj(segment_result[1], fake_segment,
+                         allow_missing=OPTIONAL)
         mock_api_get.assert_called_once_with(self.context, filters={
             'service_type': 'COMPUTE'
-        }, limit=None, marker=None, sort_dirs=None, sort_keys=None)
+        }, limit=None, marker=None, sort_dirs=None, sort_keys=None,
+            use_slave=False, with_stats=False)
+
+    @mock.patch('masakari.db.failover_segment_get_all_by_filters')
+    def test_get_segment_with_stats(self, mock_api_get):
+        fake_segment_stats = copy.deepcopy(fake_segment)
+        fake_segment_stats.update({'host_count': 3,
+                                   'reserved_host_count': 1,
+                                   'on_maintenance_host_count': 2,
+                                   'active_notification_count': 4})
+        mock_api_get.return_value = [fake_segment_stats]
+
+        segment_result = segment.FailoverSegmentList.get_all(
+            self.context, with_stats=True)
+
+        self.compare_obj(segment_result[0], fake_segment_stats)
+        mock_api_get.assert_called_once_with(
+            self.context, filters=None, limit=None, marker=None,
+            sort_dirs=None, sort_keys=None, use_slave=False, with_stats=True)
+
+    def test_obj_make_compatible(self):
+        segment_obj = segment.FailoverSegment(
+            name='foo', host_count=3, reserved_host_count=1,
+            on_maintenance_host_count=2, active_notification_count=4)
+
+        primitive = segment_obj.obj_to_primitive(target_version='1.0')
+
+        self.assertEqual({'name': 'foo'},
+                         primitive['masakari_object.data'])
 
     @mock.patch('masakari.db.failover_segment_get_all_by_filters')
     def test_get_limit_and_marker_invalid_marker(self, mock_api_get):
@@ -228,7 +262,7 @@ class TestFailoverSegmentObject(test_objects._LocalTest):
         segment_object.uuid = uuidsentinel.fake_segment
         segment_object.save()
 
-        self.compare_obj(segment_object, fake_segment)
+        self.compare_obj(segment_object, fake_segment, allow_missing=OPTIONAL)
         self.assertTrue(mock_segment_update.called)
         action = fields.EventNotificationAction.SEGMENT_UPDATE
         phase_start = fields.EventNotificationPhase.START
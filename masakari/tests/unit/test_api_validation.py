@@ -15,6 +15,7 @@
 
 from http import client as http
 import re
+from unittest import mock
 
 import fixtures
 from jsonschema import exceptions as jsonschema_exc
@@ -136,6 +137,43 @@ class FormatCheckerTestCase(test.NoDBTestCase):
                              exc.cause.format_message())
 
 
+class SchemaDecoratorTestCase(test.NoDBTestCase):
+
+    @mock.patch.object(validators, '_SchemaValidator')
+    def test_validator_built_once(self, mock_validator):
+        schema = {'type': 'object'}
+
+        @validation.schema(request_body_schema=schema)
+        def post(req, body):
+            return 'Validation succeeded.'
+
+        mock_validator.assert_called_once_with(schema)
+        post(body={'foo': 1}, req=FakeRequest())
+        post(body={'foo': 2}, req=FakeRequest())
+
+        mock_validator.assert_called_once_with(schema)
+        self.assertEqual([mock.call({'foo': 1}), mock.call({'foo': 2})],
+                         mock_validator.return_value.validate.call_args_list)
+
+    def test_schema_version_range(self):
+        schema = {
+            'type': 'object',
+            'properties': {'foo': {'type': 'integer'}},
+            'additionalProperties': False,
+        }
+
+        @validation.schema(request_body_schema=schema, min_version='1.1')
+        def post(req, body):
+            return 'Validation succeeded.'
+
+        req = FakeRequest()
+        self.assertEqual('Validation succeeded.',
+                         post(body={'bar': 1}, req=req))
+        req.api_version_request = api_version.APIVersionRequest("1.1")
+        self.assertRaises(exception.ValidationError, post,
+                          body={'bar': 1}, req=req)
+
+
 class RequiredDisableTestCase(APIValidationTestCase):
 
     def setUp(self):
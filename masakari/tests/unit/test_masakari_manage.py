@@ -18,6 +18,7 @@ from unittest import mock
 from masakari.cmd import manage
 from masakari import context
 from masakari.db import api as db_api
+from masakari.engine import driver
 from masakari import test
 
 
@@ -34,7 +35,36 @@ class DBCommandsTestCase(test.TestCase):
     def test_purge_command(self, mock_context, mock_db_purge):
         mock_context.return_value = self.context
         self.commands.purge(0, 100)
-        mock_db_purge.assert_called_once_with(self.context, 0, 100)
+        mock_db_purge.assert_called_once_with(self.context, 0, 100,
+                                              batch_size=1000, sleep_time=0,
+                                              dry_run=False)
+
+    @mock.patch('builtins.print')
+    @mock.patch.object(db_api, 'purge_deleted_rows')
+    @mock.patch.object(context, 'get_admin_context')
+    def test_purge_command_dry_run(self, mock_context, mock_db_purge,
+                                   mock_print):
+        mock_context.return_value = self.context
+        mock_db_purge.return_value = {'notifications': 5, 'hosts': 0}
+        self.commands.purge(30, -1, batch_size=10, sleep=0.5, dry_run=True)
+        mock_db_purge.assert_called_once_with(self.context, 30, -1,
+                                              batch_size=10, sleep_time=0.5,
+                                              dry_run=True)
+        mock_print.assert_has_calls([
+            mock.call('5 row(s) would be deleted from table notifications'),
+            mock.call('0 row(s) would be deleted from table hosts')])
+
+    def test_purge_invalid_batch_size(self):
+        ex = self.assertRaises(SystemExit, self.commands.purge, 0, 100,
+                               batch_size=0)
+        self.assertEqual("Invalid input received: batch_size must be >= 1",
+                         ex.code)
+
+    def test_purge_negative_sleep(self):
+        ex = self.assertRaises(SystemExit, self.commands.purge, 0, 100,
+                               sleep=-1)
+        self.assertEqual("Must supply a non-negative value for sleep.",
+                         ex.code)
 
     def test_purge_negative_age_in_days(self):
         ex = self.assertRaises(SystemExit, self.commands.purge, -1, 100)
@@ -64,7 +94,9 @@ class DBCommandsTestCase(test.TestCase):
         mock_context.return_value = self.context
         value = (2 ** 31) - 1
         self.commands.purge(age_in_days=1, max_rows=value)
-        mock_db_purge.assert_called_once_with(self.context, 1, value)
+        mock_db_purge.assert_called_once_with(self.context, 1, value,
+                                              batch_size=1000, sleep_time=0,
+                                              dry_run=False)
 
     def test_purge_command_exceeded_maximum_rows(self):
         # value(2 ** 31) is greater than max_rows(2147483647) by 1.
@@ -73,3 +105,82 @@ class DBCommandsTestCase(test.TestCase):
                                max_rows=value)
         expected = "Invalid input received: max_rows must be <= 2147483647"
         self.assertEqual(expected, ex.code)
+
+    @mock.patch.object(db_api, 'archive_notifications')
+    @mock.patch.object(context, 'get_admin_context')
+    def test_archive_command(self, mock_context, mock_db_archive):
+        mock_context.return_value = self.context
+        mock_db_archive.return_value = 5
+        self.commands.archive(30, -1, batch_size=10, sleep=0.5)
+        mock_db_archive.assert_called_once_with(self.context, 30,
+                                                max_rows=-1, batch_size=10,
+                                                sleep_time=0.5,
+                                                dry_run=False)
+
+    def test_archive_invalid_max_rows(self):
+        ex = self.assertRaises(SystemExit, self.commands.archive, 30, 0)
+        self.assertEqual("Must supply value greater than 0 for max_rows.",
+                         ex.code)
+
+    def test_archive_negative_sleep(self):
+        ex = self.assertRaises(SystemExit, self.commands.archive, 30, -1,
+                               sleep=-1)
+        self.assertEqual("Must supply a non-negative value for sleep.",
+                         ex.code)
+
+    @mock.patch('time.sleep')
+    @mock.patch.object(db_api, 'notifications_get_purgeable_uuids')
+    @mock.patch.object(driver, 'load_masakari_driver')
+    @mock.patch.object(context, 'get_admin_context')
+    def test_purge_taskflow_command(self, mock_context, mock_load_driver,
+                                    mock_get_purgeable, mock_sleep):
+        mock_context.return_value = self.context
+        notification_driver = mock_load_driver.return_value
+        notification_driver.get_recovery_workflow_notification_uuids.\
+            return_value = iter(['uuid1', 'uuid2', 'uuid3'])
+        notification_driver.purge_notification_recovery_workflow_details.\
+            side_effect = lambda ctx, uuids, archive: len(uuids)
+        mock_get_purgeable.side_effect = [['uuid1', 'uuid2'], ['uuid3']]
+
+        self.commands.purge_taskflow(30, batch_size=2, sleep=0.5)
+
+        notification_driver.get_recovery_workflow_notification_uuids.\
+            assert_called_once_with(self.context, batch_size=2)
+        mock_get_purgeable.assert_has_calls([
+            mock.call(self.context, ['uuid1', 'uuid2'], 30),
+            mock.call(self.context, ['uuid3'], 30)])
+        notification_driver.purge_notification_recovery_workflow_details.\
+            assert_has_calls([
+                mock.call(self.context, ['uuid1', 'uuid2'], archive=None),
+                mock.call(self.context, ['uuid3'], archive=None)])
+        self.assertEqual(2, mock_sleep.call_args_list.count(mock.call(0.5)))
+
+    @mock.patch.object(db_api, 'notifications_get_purgeable_uuids')
+    @mock.patch.object(driver, 'load_masakari_driver')
+    @mock.patch.object(context, 'get_admin_context')
+    def test_purge_taskflow_command_dry_run(self, mock_context,
+                                            mock_load_driver,
+                                            mock_get_purgeable):
+        mock_context.return_value = self.context
+        notification_driver = mock_load_driver.return_value
+        notification_driver.get_recovery_workflow_notification_uuids.\
+            return_value = iter(['uuid1', 'uuid2'])
+        mock_get_purgeable.return_value = ['uuid2']
+
+        self.commands.purge_taskflow(30, archive='/nonexistent/archive',
+                                     dry_run=True)
+
+        mock_get_purgeable.assert_called_once_with(
+            self.context, ['uuid1', 'uuid2'], 30)
+        self.assertFalse(notification_driver.
+                         purge_notification_recovery_workflow_details.called)
+
+    def test_purge_taskflow_invalid_batch_size(self):
+        ex = self.assertRaises(SystemExit, self.commands.purge_taskflow, 30,
+                               batch_size=0)
+        expected = "Invalid input received: batch_size must be >= 1"
+        self.assertEqual(expected, ex.code)
+
+    def test_purge_taskflow_negative_age_in_days(self):
+        ex = self.assertRaises(SystemExit, self.commands.purge_taskflow, -1)
+        self.assertEqual("Must supply a non-negative value for age.", ex.code)
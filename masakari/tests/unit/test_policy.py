@@ -17,6 +17,7 @@
 
 import os.path
 
+import fixtures
 from oslo_policy import policy as oslo_policy
 from oslo_serialization import jsonutils
 import requests_mock
@@ -155,6 +156,102 @@ class PolicyTestCase(test.NoDBTestCase):
         policy.authorize(admin_context, uppercase_action, self.target)
 
 
+class PolicyCacheTestCase(test.NoDBTestCase):
+    def setUp(self):
+        super(PolicyCacheTestCase, self).setUp()
+        rules = [
+            oslo_policy.RuleDefault("example:allowed", '@'),
+            oslo_policy.RuleDefault("example:my_file",
+                                    "role:compute_admin or "
+                                    "project_id:%(project_id)s"),
+            oslo_policy.RuleDefault("example:get_http",
+                                    "http://www.example.com"),
+        ]
+        policy.reset()
+        policy.init(suppress_deprecation_warnings=True)
+        policy._ENFORCER.register_defaults(rules)
+        self.context = context.RequestContext('fake', 'fake', roles=['member'])
+        self.admin_context = context.RequestContext('fake', 'other',
+                                                    roles=['compute_admin'])
+        self.enforce = self.useFixture(fixtures.MockPatchObject(
+            policy._ENFORCER, 'enforce',
+            side_effect=policy._ENFORCER.enforce)).mock
+
+    def test_granted_decision_cached(self):
+        target = {'project_id': 'fake'}
+        policy.authorize(self.context, "example:my_file", target)
+        policy.authorize(self.context, "example:my_file", dict(target))
+
+        self.assertEqual(1, self.enforce.call_count)
+
+    def test_rules_loaded_once(self):
+        load_rules = self.useFixture(fixtures.MockPatchObject(
+            oslo_policy.Enforcer, 'load_rules', autospec=True,
+            side_effect=oslo_policy.Enforcer.load_rules)).mock
+        target = {'project_id': 'fake'}
+
+        # the rules are loaded once whether the decision is cached or not
+        policy.authorize(self.context, "example:my_file", target)
+        self.assertEqual(1, load_rules.call_count)
+        policy.authorize(self.context, "example:my_file", target)
+        self.assertEqual(2, load_rules.call_count)
+        self.assertEqual(1, self.enforce.call_count)
+
+    def test_decision_keyed_by_fields(self):
+        policy.authorize(self.context, "example:my_file",
+                         {'project_id': 'fake'})
+        policy.authorize(self.admin_context, "example:my_file",
+                         {'project_id': 'fake'})
+        self.assertRaises(exception.PolicyNotAuthorized, policy.authorize,
+                          self.context, "example:my_file",
+                          {'project_id': 'other'})
+
+        self.assertEqual(3, self.enforce.call_count)
+
+    def test_denied_decision_not_cached(self):
+        target = {'project_id': 'other'}
+        for _ in range(2):
+            self.assertRaises(exception.PolicyNotAuthorized,
+                              policy.authorize, self.context,
+                              "example:my_file", target)
+
+        self.assertEqual(2, self.enforce.call_count)
+
+    @requests_mock.mock()
+    def test_http_check_not_cached(self, req_mock):
+        req_mock.post('http://www.example.com/', text='True')
+        policy.authorize(self.context, "example:get_http", {})
+        policy.authorize(self.context, "example:get_http", {})
+
+        self.assertEqual(2, self.enforce.call_count)
+
+    def test_cache_cleared_on_set_rules(self):
+        policy.authorize(self.context, "example:allowed", {})
+        policy.set_rules(oslo_policy.Rules.from_dict(
+            {"example:allowed": "!"}), overwrite=False)
+
+        self.assertRaises(exception.PolicyNotAuthorized, policy.authorize,
+                          self.context, "example:allowed", {})
+
+    def test_cache_size(self):
+        self.flags(policy_cache_size=1)
+        policy.authorize(self.context, "example:allowed", {})
+        policy.authorize(self.context, "example:my_file",
+                         {'project_id': 'fake'})
+        policy.authorize(self.context, "example:allowed", {})
+
+        self.assertEqual(3, self.enforce.call_count)
+        self.assertEqual(1, len(policy._ENFORCER._decisions))
+
+    def test_cache_disabled(self):
+        self.flags(policy_cache_size=0)
+        policy.authorize(self.context, "example:allowed", {})
+        policy.authorize(self.context, "example:allowed", {})
+
+        self.assertEqual(2, self.enforce.call_count)
+        self.assertEqual(0, len(policy._ENFORCER._decisions))
+
+
 class IsAdminCheckTestCase(test.NoDBTestCase):
     def setUp(self):
         super(IsAdminCheckTestCase, self).setUp()
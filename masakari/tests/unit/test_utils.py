@@ -12,6 +12,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import datetime
 import importlib
 from unittest import mock
 
@@ -255,3 +256,30 @@ class ValidateIntegerTestCase(test.NoDBTestCase):
                           utils.validate_integer,
                           chr(129), "UnicodeError",
                           max_value=1000)
+
+
+class GetPayloadHashTestCase(test.NoDBTestCase):
+
+    def test_same_payload_same_hash(self):
+        self.assertEqual(
+            utils.get_payload_hash({'event': 'STOPPED', 'host_status': 'OK'}),
+            utils.get_payload_hash({'host_status': 'OK', 'event': 'STOPPED'}))
+
+    def test_different_payload_different_hash(self):
+        self.assertNotEqual(
+            utils.get_payload_hash({'event': 'STOPPED'}),
+            utils.get_payload_hash({'event': 'STARTED'}))
+
+
+class CursorTestCase(test.NoDBTestCase):
+
+    def test_encode_decode_cursor(self):
+        cursor = utils.encode_cursor(
+            {'created_at': datetime.datetime(2016, 10, 13, 9, 11, 21),
+             'id': 5})
+        self.assertEqual({'created_at': '2016-10-13T09:11:21', 'id': 5},
+                         utils.decode_cursor(cursor))
+
+    def test_decode_cursor_with_id(self):
+        for marker in ('5', '1234', '263abb28-1de6-412f-b00b-f0ee0c4333c2'):
+            self.assertRaises(ValueError, utils.decode_cursor, marker)
@@ -15,8 +15,11 @@
 
 """Utilities and helper functions."""
 
+import base64
 import contextlib
+import datetime
 import functools
+import hashlib
 import inspect
 import pyclbr
 import shutil
@@ -27,6 +30,7 @@ import eventlet
 from oslo_concurrency import lockutils
 from oslo_context import context as common_context
 from oslo_log import log as logging
+from oslo_serialization import jsonutils
 from oslo_utils import importutils
 from oslo_utils import strutils
 from oslo_utils import timeutils
@@ -260,6 +264,49 @@ def validate_integer(value, name, min_value=None, max_value=None):
         raise exception.InvalidInput(reason=e)
 
 
+def get_payload_hash(payload):
+    """Returns the sha256 hex digest of the canonical JSON of a payload.
+
+    Payloads holding the same keys and values have the same hash, whatever
+    the order of their keys.
+    """
+    canonical_payload = jsonutils.dumps(payload, sort_keys=True,
+                                        separators=(',', ':'))
+    return hashlib.sha256(canonical_payload.encode('utf-8')).hexdigest()
+
+
+def encode_cursor(values):
+    """Returns an opaque pagination marker holding the given values.
+
+    :param values: dict of the sort key values of the last item of a page
+    """
+    values = {key: (timeutils.normalize_time(value).isoformat()
+                    if isinstance(value, datetime.datetime) else value)
+              for key, value in values.items()}
+    cursor = base64.urlsafe_b64encode(
+        jsonutils.dump_as_bytes(values, sort_keys=True))
+    return cursor.decode('ascii').rstrip('=')
+
+
+def decode_cursor(marker):
+    """Returns the values held by a marker built by encode_cursor.
+
+    Datetime values are returned as ISO 8601 strings.
+
+    :raises ValueError: if marker is not a cursor, e.g. the id of an item
+    """
+    try:
+        cursor = base64.urlsafe_b64decode(
+            str(marker) + '=' * (-len(str(marker)) % 4))
+        values = jsonutils.loads(cursor)
+    except (TypeError, ValueError):
+        raise ValueError(_('%s is not a pagination cursor') % marker)
+
+    if not isinstance(values, dict):
+        raise ValueError(_('%s is not a pagination cursor') % marker)
+    return values
+
+
 def synchronized(name, semaphores=None, blocking=False):
     def wrap(f):
         @functools.wraps(f)